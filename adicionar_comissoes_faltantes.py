@@ -13,6 +13,7 @@ if sys.platform == 'win32':
 load_dotenv()
 
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 from sienge_client import sienge_client
 
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
@@ -29,11 +30,11 @@ def main():
     
     # 2. Buscar comissões existentes no Supabase
     print("\n[2/3] Verificando comissões existentes no Supabase...")
-    result = supabase.table('comissoes_sienge_comissoes').select('sienge_id, broker_id').execute()
+    result_data = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', 'sienge_id, broker_id')
     
     # Criar set de chaves existentes (sienge_id + broker_id)
     existentes = set()
-    for item in (result.data or []):
+    for item in result_data:
         sienge_id = item.get('sienge_id')
         broker_id = item.get('broker_id')
         if sienge_id and broker_id:
@@ -4,10 +4,13 @@ Aplicação Flask principal com todas as rotas e funcionalidades
 """
 
 import os
-import re
+import json
+import base64
+import time
 import logging
-from datetime import datetime
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, session
+import threading
+from datetime import datetime, timedelta
+from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, session, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -18,6 +21,11 @@ from auth_manager import AuthManager, traduzir_status, Usuario, CorretorUser
 from sienge_client import sienge_client
 from sync_sienge_supabase import SiengeSupabaseSync
 from aprovacao_comissoes import AprovacaoComissoes
+from supabase_client import fetch_all_paginated, CHAVE_CONTRATO
+from cache import TOPICOS, barramento, cache_referencias
+from gatilho import gatilho_foi_atingido, enriquecer_gatilhos, resolver_regra, chave_contrato
+from gatilho_estado import aplicar_estado, buscar_por_contratos, recalcular_estado
+from jobs import enfileirar_job, obter_job, executar_sincronizacao, STATUS_ATIVOS
 
 load_dotenv()
 
@@ -121,94 +129,79 @@ SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY', 'sb_publishable_VRzI66cuw15hn
 DOMINIO_GOOGLE = '@youngempreendimentos.com.br'
 
 
-def fetch_all_paginated(supabase_client, table_name: str, columns: str = '*', batch_size: int = 1000) -> list:
-    """Busca todos os registros de uma tabela com paginação automática.
-    O Supabase tem limite de 1000 registros por query, então precisamos paginar.
-    Usa offset+limit que funciona melhor que range().
-    """
-    all_records = []
-    offset = 0
-    
-    while True:
-        result = supabase_client.table(table_name).select(columns).limit(batch_size).offset(offset).execute()
-        if not result.data:
-            break
-        all_records.extend(result.data)
-        if len(result.data) < batch_size:
-            break
-        offset += batch_size
-    
-    return all_records
+# ==================== MAPAS DE REFERÊNCIA (cache) ====================
+# Contratos, ITBI, valor pago e regras mudam pouco e eram recarregados inteiros a cada
+# request das telas de comissões. Ficam em cache_referencias (cache.py) por
+# CACHE_TTL_SEGUNDOS; quem grava nessas tabelas chama publicar_alteracao(), que
+# invalida o cache em todos os workers (barramento em cache.py).
+# Os mapas são compartilhados entre requests: só leitura.
 
+def _referencia(supabase_client, nome: str, carregar):
+    # Antes de ler, descarta o que outros processos alteraram (consulta barata, no máximo a cada poucos segundos)
+    barramento.verificar(supabase_client)
+    return cache_referencias.obter(nome, carregar)
 
-def extrair_meta_manual(comissao: dict) -> dict:
-    """Extrai valor_gatilho e valor_pago dos metadados armazenados em observacoes/regra_gatilho de comissões manuais.
-    Formato esperado: [GATILHO:XXX][VALOR_PAGO:YYY] texto livre
-    """
-    import re
-    meta = {'valor_gatilho': None, 'valor_pago': None, 'observacoes': ''}
-    texto = (comissao.get('observacoes') or '') or (comissao.get('regra_gatilho') or '')
-    if not texto:
-        return meta
-    m_gat = re.search(r'\[GATILHO:([0-9.]+)\]', texto)
-    m_pag = re.search(r'\[VALOR_PAGO:([0-9.]+)\]', texto)
-    if m_gat:
-        try:
-            meta['valor_gatilho'] = float(m_gat.group(1))
-        except ValueError:
-            pass
-    if m_pag:
-        try:
-            meta['valor_pago'] = float(m_pag.group(1))
-        except ValueError:
-            pass
-    obs_limpo = re.sub(r'\[GATILHO:[0-9.]+\]', '', texto)
-    obs_limpo = re.sub(r'\[VALOR_PAGO:[0-9.]+\]', '', obs_limpo).strip()
-    meta['observacoes'] = obs_limpo
-    return meta
-
-
-# Função para calcular o valor do gatilho a partir da string de regra
-def calcular_valor_gatilho(valor_a_vista: float, valor_itbi: float, regra: str) -> float:
-    if not regra:
-        regra = '10% + ITBI'
-    
-    regra_lower = regra.lower().strip()
+
+def mapa_contratos(supabase_client) -> dict:
+    """(numero_contrato, building_id) -> contrato (todas as colunas da view)"""
+    return _referencia(supabase_client, 'contratos', lambda: {
+        chave_contrato(ct): ct
+        for ct in fetch_all_paginated(supabase_client, 'comissoes_sienge_contratos', '*', order_by=CHAVE_CONTRATO)
+    })
+
+
+def mapa_itbi(supabase_client) -> dict:
+    """(numero_contrato, building_id) -> valor_itbi"""
+    return _referencia(supabase_client, 'itbi', lambda: {
+        chave_contrato(it): float(it.get('valor_itbi') or 0)
+        for it in fetch_all_paginated(supabase_client, 'comissoes_sienge_itbi',
+                                      'numero_contrato,building_id,valor_itbi', order_by=CHAVE_CONTRATO)
+    })
+
+
+def mapa_valor_pago(supabase_client) -> dict:
+    """(numero_contrato, building_id) -> valor_pago"""
+    return _referencia(supabase_client, 'valor_pago', lambda: {
+        chave_contrato(pg): float(pg.get('valor_pago') or 0)
+        for pg in fetch_all_paginated(supabase_client, 'comissoes_sienge_valor_pago',
+                                      'numero_contrato,building_id,valor_pago', order_by=CHAVE_CONTRATO)
+    })
+
+
+def mapa_regras(supabase_client) -> dict:
+    """id -> regra de gatilho (todas as colunas, ativas e inativas)"""
+    return _referencia(supabase_client, 'regras', lambda: {
+        rg['id']: rg for rg in fetch_all_paginated(supabase_client, 'comissoes_regras_gatilho', '*')
+    })
+
+
+def mapa_nomes_corretores(supabase_client) -> dict:
+    """nome do corretor (sem espaços nas pontas) -> grafias de broker_nome gravadas nas comissões"""
+    def carregar():
+        nomes = {}
+        for c in fetch_all_paginated(supabase_client, 'comissoes_sienge_comissoes', 'broker_nome'):
+            nome = c.get('broker_nome')
+            if nome and nome.strip():
+                nomes.setdefault(nome.strip(), set()).add(nome)
+        return {nome: sorted(grafias) for nome, grafias in nomes.items()}
+    return _referencia(supabase_client, 'corretores', carregar)
+
+
+def publicar_alteracao(supabase_client, *topicos):
+    """Avisa todos os processos que os dados dos tópicos (cache.TOPICOS) mudaram"""
+    barramento.publicar(supabase_client, *topicos)
+
+
+def atualizar_estado_gatilho(supabase_client, **alvos):
+    """Recalcula o estado materializado do gatilho (gatilho_estado.py) das comissões afetadas.
     
-    if '10%' in regra_lower and 'itbi' in regra_lower:
-        return (valor_a_vista * 0.10) + valor_itbi
-    elif '10%' in regra_lower:
-        return valor_a_vista * 0.10
-    elif '5%' in regra_lower:
-        return valor_a_vista * 0.05
-    elif '6%' in regra_lower:
-        return valor_a_vista * 0.06
-    else:
-        match = re.search(r'(\d+[,.]?\d*)\s*%', regra)
-        if match:
-            percentual = float(match.group(1).replace(',', '.')) / 100
-            if 'itbi' in regra_lower:
-                return (valor_a_vista * percentual) + valor_itbi
-            return valor_a_vista * percentual
-        return (valor_a_vista * 0.10) + valor_itbi
-
-
-# Tolerância de arredondamento do gatilho.
-# Aceita o gatilho como ATINGIDO quando o valor pago chega a (1 - TOLERANCIA) do valor
-# do gatilho. Com 1%, uma regra de 10% passa a valer ~9,9% — evita reprovar contratos
-# que ficam a centavos/arredondamento do alvo (ex.: cliente pagou 9,9% em vez de 10%).
-TOLERANCIA_GATILHO = 0.01
-
-
-def gatilho_foi_atingido(valor_pago, valor_gatilho) -> bool:
-    """True se o valor pago atingiu o gatilho, com folga de arredondamento (TOLERANCIA_GATILHO)."""
+    alvos: numeros_contrato, comissao_ids e/ou regra_ids. Falha não derruba a escrita:
+    a próxima sincronização recalcula tudo.
+    """
     try:
-        vg = float(valor_gatilho)
-        if vg <= 0:
-            return False
-        return float(valor_pago) >= vg * (1 - TOLERANCIA_GATILHO)
-    except (TypeError, ValueError):
-        return False
+        recalcular_estado(supabase_client, **alvos)
+    except Exception as e:
+        print(f"[GatilhoEstado] Erro ao recalcular {alvos}: {str(e)}")
 
 
 def obter_gatilho_contrato(sync, numero_contrato, building_id, comissao_record=None):
@@ -276,13 +269,9 @@ def obter_gatilho_contrato(sync, numero_contrato, building_id, comissao_record=N
                 pass
         
         # 4. Determinar a regra do gatilho
-        # Prioridade: regra_gatilho_id -> regras_gatilho table (dados estruturados)
+        # Prioridade: regra_gatilho_id -> regras_gatilho table (dados estruturados, em cache)
         #             regra_gatilho text field (campo texto legacy)
         #             Default: 10% + ITBI
-        regra_gatilho_texto = '10% + ITBI'
-        percentual = None
-        inclui_itbi = None
-        
         # Se temos o registro da comissão, usar dele
         if not comissao_record:
             try:
@@ -297,48 +286,17 @@ def obter_gatilho_contrato(sync, numero_contrato, building_id, comissao_record=N
             except Exception:
                 pass
         
-        if comissao_record:
-            # Tentar buscar a regra estruturada pela regra_gatilho_id
-            regra_id = comissao_record.get('regra_gatilho_id')
-            if regra_id:
-                try:
-                    regra_result = sync.supabase.table('comissoes_regras_gatilho')\
-                        .select('percentual, inclui_itbi, nome, tipo_regra')\
-                        .eq('id', regra_id)\
-                        .limit(1)\
-                        .execute()
-                    if regra_result.data:
-                        regra_data = regra_result.data[0]
-                        percentual = regra_data.get('percentual')
-                        inclui_itbi = regra_data.get('inclui_itbi')
-                        nome = regra_data.get('nome', '')
-                        tipo_regra = regra_data.get('tipo_regra', 'gatilho')
-                        
-                        if percentual is not None:
-                            if inclui_itbi:
-                                regra_gatilho_texto = f"{percentual}% + ITBI"
-                            else:
-                                regra_gatilho_texto = f"{percentual}%"
-                except Exception as e:
-                    print(f"[obter_gatilho] Erro ao buscar regra {regra_id}: {str(e)}")
-            
-            # Se não encontrou pela ID, usar o campo texto
-            if percentual is None:
-                regra_texto = comissao_record.get('regra_gatilho')
-                if regra_texto:
-                    regra_gatilho_texto = regra_texto
+        regra_id = (comissao_record or {}).get('regra_gatilho_id')
+        regras_map = {}
+        if regra_id:
+            try:
+                regras_map = mapa_regras(sync.supabase)
+            except Exception as e:
+                print(f"[obter_gatilho] Erro ao buscar regra {regra_id}: {str(e)}")
+        regra = resolver_regra(regra_id, (comissao_record or {}).get('regra_gatilho'), regras_map)
         
         # 5. Calcular valor do gatilho
-        if percentual is not None:
-            # Usar dados estruturados (mais confiável)
-            perc = float(percentual) / 100.0
-            if inclui_itbi:
-                valor_gatilho = (valor_a_vista * perc) + float(valor_itbi)
-            else:
-                valor_gatilho = valor_a_vista * perc
-        else:
-            # Fallback: usar a função de parse de texto
-            valor_gatilho = calcular_valor_gatilho(valor_a_vista, float(valor_itbi), regra_gatilho_texto)
+        valor_gatilho = regra.valor_gatilho(valor_a_vista, float(valor_itbi))
         
         # 6. Verificar se atingiu (valor pago >= valor gatilho)
         atingiu_gatilho = gatilho_foi_atingido(valor_pago, valor_gatilho)
@@ -347,13 +305,13 @@ def obter_gatilho_contrato(sync, numero_contrato, building_id, comissao_record=N
             'valor_gatilho': valor_gatilho,
             'atingiu_gatilho': atingiu_gatilho,
             'valor_pago': float(valor_pago),
-            'regra_gatilho': regra_gatilho_texto,
+            'regra_gatilho': regra.texto,
             'valor_a_vista': valor_a_vista,
             'valor_itbi': float(valor_itbi)
         }
         
         print(f"[obter_gatilho] Resultado: valor_a_vista={valor_a_vista}, valor_itbi={valor_itbi}, valor_pago={valor_pago}")
-        print(f"[obter_gatilho] Regra: {regra_gatilho_texto}, percentual={percentual}, inclui_itbi={inclui_itbi}")
+        print(f"[obter_gatilho] Regra: {regra.texto} ({regra.tipo}), percentual={regra.percentual}, inclui_itbi={regra.inclui_itbi}")
         print(f"[obter_gatilho] valor_gatilho={valor_gatilho}, atingiu={atingiu_gatilho}")
         
     except Exception as e:
@@ -362,6 +320,65 @@ def obter_gatilho_contrato(sync, numero_contrato, building_id, comissao_record=N
     return resultado
 
 
+def obter_gatilhos(supabase_client, comissoes: list) -> list:
+    """Versão em lote de obter_gatilho_contrato: um resultado por comissão, na mesma ordem.
+    
+    ITBI, valor pago e regras de todas as comissões vêm de uma consulta in_ por tabela
+    (em vez de até 7 consultas por comissão); o cálculo é o mesmo de obter_gatilho_contrato.
+    """
+    chaves = [chave_contrato(c) if c.get('numero_contrato') and c.get('building_id') else None
+              for c in comissoes]
+    numeros = {chave[0] for chave in chaves if chave}
+    buildings = {chave[1] for chave in chaves if chave}
+    
+    itbi_map, pago_map, regras_map = {}, {}, {}
+    if numeros:
+        itbi_map = buscar_por_contratos(supabase_client, 'comissoes_sienge_itbi',
+                                         'numero_contrato,building_id,valor_itbi', numeros, buildings)
+        pago_map = buscar_por_contratos(supabase_client, 'comissoes_sienge_valor_pago',
+                                         'numero_contrato,building_id,valor_pago', numeros, buildings)
+    
+    regra_ids = sorted({c.get('regra_gatilho_id') for c, chave in zip(comissoes, chaves)
+                        if chave and c.get('regra_gatilho_id')})
+    if regra_ids:
+        try:
+            result = supabase_client.table('comissoes_regras_gatilho')\
+                .select('id, percentual, inclui_itbi')\
+                .in_('id', regra_ids)\
+                .execute()
+            regras_map = {rg['id']: rg for rg in result.data or []}
+        except Exception as e:
+            print(f"[obter_gatilhos] Erro ao buscar regras: {str(e)}")
+    
+    resultados = []
+    for c, chave in zip(comissoes, chaves):
+        if not chave:
+            resultados.append({'valor_gatilho': 0, 'atingiu_gatilho': False, 'valor_pago': 0,
+                               'regra_gatilho': '10% + ITBI', 'valor_a_vista': 0, 'valor_itbi': 0})
+            continue
+        
+        # Valor à vista: baseValue da comissão, ou commission_value / percentual (ver obter_gatilho_contrato)
+        valor_a_vista = float(c.get('valor_comissao') or 0)
+        if valor_a_vista == 0:
+            percentual_comissao = float(c.get('installment_percentage') or 0)
+            if percentual_comissao > 0:
+                valor_a_vista = float(c.get('commission_value') or 0) / (percentual_comissao / 100)
+        
+        valor_itbi = float(itbi_map.get(chave, {}).get('valor_itbi') or 0)
+        valor_pago = float(pago_map.get(chave, {}).get('valor_pago') or 0)
+        regra = resolver_regra(c.get('regra_gatilho_id'), c.get('regra_gatilho'), regras_map)
+        valor_gatilho = regra.valor_gatilho(valor_a_vista, valor_itbi)
+        
+        resultados.append({
+            'valor_gatilho': valor_gatilho,
+            'atingiu_gatilho': gatilho_foi_atingido(valor_pago, valor_gatilho),
+            'valor_pago': valor_pago,
+            'regra_gatilho': regra.texto,
+            'valor_a_vista': valor_a_vista,
+            'valor_itbi': valor_itbi
+        })
+    return resultados
+
 # ==================== FLASK-LOGIN CALLBACKS ====================
 
 @login_manager.user_loader
@@ -612,7 +629,7 @@ def listar_contratos():
         if building_id:
             contratos = sync.get_contratos_por_empreendimento(building_id)
         else:
-            contratos = fetch_all_paginated(sync.supabase, 'comissoes_sienge_contratos', '*')
+            contratos = fetch_all_paginated(sync.supabase, 'comissoes_sienge_contratos', '*', order_by=CHAVE_CONTRATO)
         
         if contratos is None:
             contratos = []
@@ -802,16 +819,8 @@ def listar_corretores_filtro():
     """Lista corretores únicos das comissões para uso nos filtros"""
     try:
         sync = SiengeSupabaseSync()
-        # Buscar corretores únicos das comissões
-        response = sync.supabase.table('comissoes_sienge_comissoes').select('broker_nome').execute()
-        
-        corretores_set = set()
-        for c in response.data:
-            nome = c.get('broker_nome')
-            if nome and nome.strip():
-                corretores_set.add(nome.strip())
-        
-        corretores = [{'nome': nome} for nome in sorted(corretores_set)]
+        # Corretores únicos das comissões (mapa em cache)
+        corretores = [{'nome': nome} for nome in sorted(mapa_nomes_corretores(sync.supabase))]
         
         return jsonify({'sucesso': True, 'corretores': corretores}), 200
     except Exception as e:
@@ -898,126 +907,8 @@ def contratos_por_corretor():
         sync = SiengeSupabaseSync()
         comissoes = sync.get_comissoes_por_corretor(corretor_id=corretor_id, corretor_nome=corretor_nome)
         
-        # Calcular gatilho em tempo real para cada comissão (igual ao Visualizar Comissões)
-        # Batch loading dos dados necessários (com paginação para evitar limite de 1000 do Supabase)
-        contratos_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_contratos', 'numero_contrato,building_id,valor_a_vista,valor_total')
-        contratos_map = {}
-        for ct in contratos_data:
-            key = (str(ct.get('numero_contrato', '')), str(ct.get('building_id', '')))
-            contratos_map[key] = ct
-        
-        itbi_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_itbi', 'numero_contrato,building_id,valor_itbi')
-        itbi_map = {}
-        for it in itbi_data:
-            key = (str(it.get('numero_contrato', '')), str(it.get('building_id', '')))
-            itbi_map[key] = float(it.get('valor_itbi') or 0)
-        
-        # IMPORTANTE: Supabase tem limite de 1000 registros por query, usar paginação
-        pago_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_valor_pago', 'numero_contrato,building_id,valor_pago')
-        pago_map = {}
-        for pg in pago_data:
-            key = (str(pg.get('numero_contrato', '')), str(pg.get('building_id', '')))
-            pago_map[key] = float(pg.get('valor_pago') or 0)
-        
-        regras_data = fetch_all_paginated(sync.supabase, 'comissoes_regras_gatilho', 'id,percentual,inclui_itbi,nome')
-        regras_map = {}
-        for rg in regras_data:
-            regras_map[rg['id']] = rg
-        
-        # Calcular gatilho para cada comissão
-        for c in comissoes:
-            numero_contrato = str(c.get('numero_contrato') or '')
-            building_id = str(c.get('building_id') or '')
-            key = (numero_contrato, building_id)
-            
-            # Verificar se é uma comissão manual
-            is_manual = c.get('origem') == 'manual' or numero_contrato.startswith('MANUAL-')
-            
-            if is_manual:
-                # Para comissões manuais, os valores já estão definidos no registro
-                valor_a_vista = float(c.get('valor_comissao') or 0)
-                meta = extrair_meta_manual(c)
-                valor_pago_manual = pago_map.get((numero_contrato, 'MANUAL'), 0)
-                if valor_pago_manual == 0 and meta['valor_pago'] is not None:
-                    valor_pago_manual = meta['valor_pago']
-                regra_gatilho_texto = 'Manual'
-                
-                c['valor_pago'] = valor_pago_manual
-                c['valor_itbi'] = 0
-                c['valor_a_vista'] = valor_a_vista
-                c['regra_gatilho'] = regra_gatilho_texto
-                c['observacoes'] = meta['observacoes']
-                
-                # Usar valor_gatilho armazenado; se não existir, 10% do valor à vista
-                valor_gatilho = meta['valor_gatilho'] if meta['valor_gatilho'] is not None else valor_a_vista * 0.10
-                c['valor_gatilho'] = valor_gatilho
-                c['atingiu_gatilho'] = gatilho_foi_atingido(valor_pago_manual, valor_gatilho)
-            else:
-                # Lógica normal para comissões do SIENGE
-                contrato = contratos_map.get(key)
-                valor_itbi = itbi_map.get(key, 0)
-                valor_pago = pago_map.get(key, 0)
-                
-                # Data do contrato: usar do contrato ou fallback para data da comissão
-                if contrato:
-                    c['data_contrato'] = contrato.get('data_contrato')
-                else:
-                    c['data_contrato'] = c.get('commission_date') or c.get('due_date')
-                
-                # Garantir que unit_name venha do contrato se não estiver na comissão
-                if not c.get('unit_name') and contrato:
-                    c['unit_name'] = contrato.get('unidade') or contrato.get('unit_name')
-                
-                # Valor à vista = baseValue da comissão (campo valor_comissao em comissoes_sienge_comissoes,
-                # populado por sincronizar_base_value.py). NÃO usar contrato.valor_a_vista pois esse
-                # campo na view contém o valor TOTAL do contrato, não o valor à vista real.
-                valor_a_vista = float(c.get('valor_comissao') or 0)
-                if valor_a_vista == 0:
-                    # Fallback: calcular a partir do valor da comissão e percentual
-                    commission_value = float(c.get('commission_value') or 0)
-                    percentual_comissao = float(c.get('installment_percentage') or 0)
-                    if percentual_comissao > 0:
-                        valor_a_vista = commission_value / (percentual_comissao / 100)
-                
-                # Determinar regra do gatilho
-                regra_gatilho_texto = '10% + ITBI'
-                percentual = None
-                inclui_itbi = None
-                
-                regra_id = c.get('regra_gatilho_id')
-                if regra_id and regra_id in regras_map:
-                    regra_data = regras_map[regra_id]
-                    percentual = regra_data.get('percentual')
-                    inclui_itbi = regra_data.get('inclui_itbi')
-                    if percentual is not None:
-                        regra_gatilho_texto = f"{percentual}% + ITBI" if inclui_itbi else f"{percentual}%"
-                
-                if percentual is None:
-                    regra_texto = c.get('regra_gatilho')
-                    if regra_texto:
-                        regra_gatilho_texto = regra_texto
-                
-                # Calcular valor do gatilho
-                if percentual is not None:
-                    perc = float(percentual) / 100.0
-                    valor_gatilho = (valor_a_vista * perc) + valor_itbi if inclui_itbi else valor_a_vista * perc
-                else:
-                    valor_gatilho = calcular_valor_gatilho(valor_a_vista, valor_itbi, regra_gatilho_texto)
-                
-                # Verificar se atingiu gatilho (None se não há dados suficientes)
-                if valor_a_vista == 0 and not contrato:
-                    atingiu_gatilho = None
-                    c['dados_incompletos'] = True
-                else:
-                    atingiu_gatilho = gatilho_foi_atingido(valor_pago, valor_gatilho)
-                    c['dados_incompletos'] = False
-                
-                c['valor_pago'] = valor_pago
-                c['valor_itbi'] = valor_itbi
-                c['valor_gatilho'] = valor_gatilho
-                c['atingiu_gatilho'] = atingiu_gatilho
-                c['valor_a_vista'] = valor_a_vista
-                c['regra_gatilho'] = regra_gatilho_texto
+        # Calcular gatilho em tempo real (mesmo cálculo do Visualizar Comissões, gatilho.py)
+        enriquecer_comissoes(sync.supabase, comissoes)
         
         return jsonify(comissoes), 200
     except Exception as e:
@@ -1026,6 +917,29 @@ def contratos_por_corretor():
 
 # ==================== API - SINCRONIZAÇÃO ====================
 
+# Duração máxima (segundos) de cada conexão SSE de /api/jobs/<id>/eventos
+JOBS_SSE_DURACAO = int(os.getenv('JOBS_SSE_DURACAO', 15))
+# Intervalo (segundos) entre consultas ao job dentro de uma conexão SSE (e entre reconexões)
+JOBS_SSE_INTERVALO = float(os.getenv('JOBS_SSE_INTERVALO', 3))
+JOBS_SSE_RECONEXAO_MS = int(JOBS_SSE_INTERVALO * 1000)
+# Conexões SSE abertas ao mesmo tempo por processo (cada uma ocupa uma thread do gunicorn)
+JOBS_SSE_CONEXOES = int(os.getenv('JOBS_SSE_CONEXOES', 2))
+_sse_conexoes = threading.BoundedSemaphore(JOBS_SSE_CONEXOES)
+
+
+def responder_job(tipo, parametros=None):
+    """Enfileira um job em background e responde 202 com o id para acompanhamento"""
+    sync = SiengeSupabaseSync()
+    job = enfileirar_job(sync.supabase, tipo, parametros,
+                         solicitado_por=getattr(current_user, 'username', None))
+    return jsonify({
+        'sucesso': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'existente': job['existente']
+    }), 202
+
+
 @app.route('/api/sincronizar', methods=['POST'])
 @login_required
 def sincronizar():
@@ -1039,9 +953,9 @@ def sincronizar():
             if data:
                 building_id = data.get('building_id')
         
-        sync = SiengeSupabaseSync()
-        resultado = sync.sync_all(building_id=building_id)
-        return jsonify({'sucesso': True, 'resultado': resultado}), 200
+        # A sincronização roda no processo do scheduler (fila comissoes_jobs), não neste
+        # request: devolve o job na hora e o andamento fica em /api/jobs/<job_id>/eventos
+        return responder_job('sincronizar', {'building_id': building_id})
     except Exception as e:
         import traceback
         print(f"[ERRO SINCRONIZAÇÃO] {str(e)}")
@@ -1049,6 +963,113 @@ def sincronizar():
         return jsonify({'erro': str(e)}), 500
 
 
+@app.route('/api/sincronizar/<int:job_id>', methods=['GET'])
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def status_job(job_id):
+    """Andamento de um job em background: fase, processados/total, taxa e ETA"""
+    if not current_user.is_admin:
+        return jsonify({'erro': 'Apenas administradores podem acompanhar jobs'}), 403
+    
+    try:
+        sync = SiengeSupabaseSync()
+        job = obter_job(sync.supabase, job_id)
+        if not job:
+            return jsonify({'erro': 'Job não encontrado'}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+
+@app.route('/api/jobs/<int:job_id>/eventos', methods=['GET'])
+@login_required
+def eventos_job(job_id):
+    """Stream SSE (text/event-stream) do andamento de um job.
+    
+    Emite 'progresso' a cada mudança e 'fim' quando o job termina, consultando o job a cada
+    JOBS_SSE_INTERVALO segundos. Cada conexão dura no máximo JOBS_SSE_DURACAO segundos e só
+    JOBS_SSE_CONEXOES ficam abertas por processo; acima disso a resposta traz só o estado
+    atual e fecha, para não esgotar as threads do gunicorn. Nos dois casos o EventSource do
+    navegador reconecta sozinho (campo retry) e continua de onde parou.
+    """
+    if not current_user.is_admin:
+        return jsonify({'erro': 'Apenas administradores podem acompanhar jobs'}), 403
+    
+    supabase = SiengeSupabaseSync().supabase
+    
+    def evento(nome, dados):
+        return f"event: {nome}\ndata: {json.dumps(dados, default=str)}\n\n"
+    
+    def gerar():
+        # Sem vaga: uma leitura só e fecha (o EventSource vira polling a cada retry)
+        com_vaga = _sse_conexoes.acquire(blocking=False)
+        try:
+            yield f"retry: {JOBS_SSE_RECONEXAO_MS}\n\n"
+            limite = time.monotonic() + (JOBS_SSE_DURACAO if com_vaga else 0)
+            ultimo = None
+            while True:
+                try:
+                    job = obter_job(supabase, job_id)
+                except Exception as e:
+                    yield evento('erro', {'erro': str(e)})
+                    return
+                if not job:
+                    yield evento('erro', {'erro': 'Job não encontrado'})
+                    return
+                
+                chave = (job.get('status'), job.get('fase'), job.get('processados'), job.get('total'))
+                if job.get('status') not in STATUS_ATIVOS:
+                    yield evento('fim', job)
+                    return
+                if chave != ultimo:
+                    yield evento('progresso', job)
+                    ultimo = chave
+                else:
+                    # Comentário SSE: mantém a conexão viva através de proxies
+                    yield ": ping\n\n"
+                if time.monotonic() + JOBS_SSE_INTERVALO > limite:
+                    return
+                time.sleep(JOBS_SSE_INTERVALO)
+        finally:
+            if com_vaga:
+                _sse_conexoes.release()
+    
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/cache/metricas', methods=['GET'])
+@login_required
+def metricas_cache():
+    """Acertos, carregamentos e entradas do cache de referências deste processo"""
+    if not current_user.is_admin:
+        return jsonify({'erro': 'Apenas administradores podem ver o cache'}), 403
+    return jsonify(cache_referencias.metricas()), 200
+
+
+@app.route('/api/cache/invalidar', methods=['POST'])
+@login_required
+def invalidar_cache():
+    """Descarta mapas do cache em todos os workers ({"nomes": [...]} de cache.TOPICOS; sem nomes = todos)
+    e enfileira o recálculo do estado materializado do gatilho (job 'gatilho_estado')
+    """
+    if not current_user.is_admin:
+        return jsonify({'erro': 'Apenas administradores podem limpar o cache'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    nomes = data.get('nomes') or list(TOPICOS)
+    invalidos = [n for n in nomes if n not in TOPICOS]
+    if invalidos:
+        return jsonify({'sucesso': False, 'erro': f"Tópicos inválidos: {', '.join(map(str, invalidos))}"}), 400
+    supabase_client = SiengeSupabaseSync().supabase
+    publicar_alteracao(supabase_client, *nomes)
+    job = enfileirar_job(supabase_client, 'gatilho_estado', solicitado_por=getattr(current_user, 'username', None))
+    return jsonify({'sucesso': True, 'metricas': cache_referencias.metricas(),
+                    'gatilho_estado_job_id': job['id']}), 200
+
+
 @app.route('/api/ultima-sincronizacao', methods=['GET'])
 @login_required
 def ultima_sincronizacao():
@@ -1063,20 +1084,12 @@ def ultima_sincronizacao():
 @app.route('/api/sincronizar-itbi-faltantes', methods=['POST'])
 @login_required
 def sincronizar_itbi_faltantes():
-    """Sincroniza ITBIs apenas para contratos que não possuem ITBI ainda"""
+    """Reconta os contratos sem ITBI em background (os ITBIs vêm da view do Sienge)"""
     if not current_user.is_admin:
         return jsonify({'erro': 'Apenas administradores podem executar esta ação'}), 403
     
     try:
-        sync = SiengeSupabaseSync()
-        resultado = sync.sync_itbi_faltantes()
-        
-        return jsonify({
-            'sucesso': resultado.get('sucesso', False),
-            'mensagem': f"Sincronização de ITBI concluída! {resultado.get('total', 0)} novos ITBIs encontrados.",
-            'resultado': resultado
-        }), 200
-        
+        return responder_job('itbi_faltantes')
     except Exception as e:
         import traceback
         print(f"[ERRO ITBI] {str(e)}")
@@ -1091,18 +1104,9 @@ def listar_contratos_sem_itbi():
     try:
         sync = SiengeSupabaseSync()
         
-        # Buscar todos os contratos (com paginação)
-        contratos = fetch_all_paginated(sync.supabase, 'comissoes_sienge_contratos', 
-            'numero_contrato, building_id, nome_cliente, unidade, data_contrato, company_id')
-        
-        # Buscar ITBIs existentes (com paginação)
-        itbi_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_itbi', 'numero_contrato, building_id')
-        
-        # Criar set de contratos que já têm ITBI
-        itbi_existentes = set()
-        for item in itbi_data:
-            chave = f"{item.get('numero_contrato')}_{item.get('building_id')}"
-            itbi_existentes.add(chave)
+        # Contratos e ITBIs existentes (mapas em cache, chave (numero_contrato, building_id))
+        contratos = list(mapa_contratos(sync.supabase).values())
+        itbi_existentes = mapa_itbi(sync.supabase)
         
         # Mapeamento de building_id para nome do empreendimento
         EMPREENDIMENTOS = {
@@ -1129,8 +1133,7 @@ def listar_contratos_sem_itbi():
         # Filtrar contratos sem ITBI
         contratos_sem_itbi = []
         for c in contratos:
-            chave = f"{c.get('numero_contrato')}_{c.get('building_id')}"
-            if chave not in itbi_existentes:
+            if chave_contrato(c) not in itbi_existentes:
                 bid = c.get('building_id')
                 contratos_sem_itbi.append({
                     'numero_contrato': c.get('numero_contrato'),
@@ -1168,69 +1171,7 @@ def limpar_cancelados():
         return jsonify({'erro': 'Apenas administradores podem executar esta ação'}), 403
     
     try:
-        sync = SiengeSupabaseSync()
-        resultado = {
-            'canceladas_antes': 0,
-            'canceladas_deletadas': 0,
-            'duplicatas_antes': 0,
-            'duplicatas_deletadas': 0
-        }
-        
-        # 1. Deletar comissões canceladas (pagas devem permanecer com status Aprovada)
-        result = sync.supabase.table('comissoes_sienge_comissoes').select('id, installment_status').execute()
-        canceladas = [c for c in (result.data or []) if 'CANCEL' in (c.get('installment_status') or '').upper()]
-        
-        resultado['canceladas_antes'] = len(canceladas)
-        
-        for c in canceladas:
-            try:
-                sync.supabase.table('comissoes_sienge_comissoes').delete().eq('id', c['id']).execute()
-                resultado['canceladas_deletadas'] += 1
-            except:
-                pass
-        
-        # Atualizar comissões pagas para status Aprovada
-        pagas = [c for c in (result.data or []) 
-                 if 'PAID' in (c.get('installment_status') or '').upper() 
-                 or 'PAGO' in (c.get('installment_status') or '').upper()]
-        
-        resultado['pagas_atualizadas'] = 0
-        for c in pagas:
-            try:
-                sync.supabase.table('comissoes_sienge_comissoes').update({'status_aprovacao': 'Aprovada'}).eq('id', c['id']).execute()
-                resultado['pagas_atualizadas'] += 1
-            except:
-                pass
-        
-        # 2. Remover duplicatas
-        comissoes_all = fetch_all_paginated(sync.supabase, 'comissoes_sienge_comissoes', '*')
-        grupos = {}
-        for c in comissoes_all:
-            chave = f"{c.get('numero_contrato')}_{c.get('unit_name')}_{c.get('building_id')}"
-            if chave not in grupos:
-                grupos[chave] = []
-            grupos[chave].append(c)
-        
-        duplicatas = {k: v for k, v in grupos.items() if len(v) > 1}
-        resultado['duplicatas_antes'] = len(duplicatas)
-        
-        for chave, comissoes in duplicatas.items():
-            # Ordenar: não-canceladas primeiro, depois por ID
-            comissoes.sort(key=lambda x: ('CANCEL' in (x.get('installment_status') or '').upper(), x.get('id', 0)))
-            # Manter a primeira, deletar as outras
-            for c in comissoes[1:]:
-                try:
-                    sync.supabase.table('comissoes_sienge_comissoes').delete().eq('id', c['id']).execute()
-                    resultado['duplicatas_deletadas'] += 1
-                except:
-                    pass
-        
-        return jsonify({
-            'sucesso': True,
-            'mensagem': f"Limpeza concluída! Removidas {resultado['canceladas_deletadas']} canceladas e {resultado['duplicatas_deletadas']} duplicatas.",
-            'resultado': resultado
-        }), 200
-        
+        return responder_job('limpar_cancelados')
     except Exception as e:
         return jsonify({'sucesso': False, 'erro': str(e)}), 500
 
@@ -1438,6 +1379,7 @@ def criar_regra_gatilho():
         }
         
         result = sync.supabase.table('comissoes_regras_gatilho').insert(nova_regra).execute()
+        publicar_alteracao(sync.supabase, 'regras')
         
         if result.data:
             return jsonify({'status': 'sucesso', 'regra': result.data[0]}), 201
@@ -1470,6 +1412,8 @@ def atualizar_regra_gatilho(regra_id):
             .update(atualizacao)\
             .eq('id', regra_id)\
             .execute()
+        publicar_alteracao(sync.supabase, 'regras')
+        atualizar_estado_gatilho(sync.supabase, regra_ids=[regra_id])
         
         if result.data:
             return jsonify({'status': 'sucesso', 'regra': result.data[0]}), 200
@@ -1489,6 +1433,7 @@ def excluir_regra_gatilho(regra_id):
             .update({'ativo': False})\
             .eq('id', regra_id)\
             .execute()
+        publicar_alteracao(sync.supabase, 'regras')
         return jsonify({'status': 'sucesso', 'mensagem': 'Regra excluída'}), 200
     except Exception as e:
         return jsonify({'status': 'erro', 'mensagem': str(e)}), 500
@@ -1550,6 +1495,8 @@ def atualizar_regra_comissao(comissao_id):
             .update(update_data)\
             .eq('id', comissao_id)\
             .execute()
+        publicar_alteracao(sync.supabase, 'comissoes')
+        atualizar_estado_gatilho(sync.supabase, comissao_ids=[comissao_id])
         
         # Recalcular o gatilho com a nova regra
         comissao['regra_gatilho_id'] = regra_gatilho_id
@@ -1609,9 +1556,7 @@ def relatorio_comissoes():
         print(f"[API Relatório] Filtros - empreendimentos: {empreendimento_list}, corretores: {corretor_list}, regras: {regra_list}, auditorias: {auditoria_list}, data: {data_inicio} a {data_fim}")
         
         # Buscar todas as comissões (excluindo canceladas)
-        query = sync.supabase.table('comissoes_sienge_comissoes').select('*')
-        result = query.execute()
-        comissoes = [c for c in (result.data or []) 
+        comissoes = [c for c in fetch_all_paginated(sync.supabase, 'comissoes_sienge_comissoes', '*')
                      if 'cancel' not in (c.get('installment_status') or '').lower()]
         
         # Aplicar filtros (multi-select)
@@ -1639,12 +1584,10 @@ def relatorio_comissoes():
             comissoes = [c for c in comissoes if str(c.get('regra_gatilho_id')) in regra_list]
         
         # Buscar regras de gatilho para associar
-        regras_data = fetch_all_paginated(sync.supabase, 'comissoes_regras_gatilho', '*')
-        regras_dict = {r['id']: r for r in regras_data}
+        regras_dict = mapa_regras(sync.supabase)
         
         # Buscar contratos para pegar dados do cliente, lote e data_contrato
-        contratos_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_contratos', '*')
-        contratos_dict = {c['numero_contrato']: c for c in contratos_data}
+        contratos_dict = {c['numero_contrato']: c for c in mapa_contratos(sync.supabase).values()}
         
         # Filtrar por período de data do contrato
         if data_inicio or data_fim:
@@ -1774,10 +1717,10 @@ def listar_corretores_relatorio():
     
     try:
         sync = SiengeSupabaseSync()
-        result = sync.supabase.table('comissoes_sienge_comissoes').select('broker_id, broker_nome').execute()
+        comissoes = fetch_all_paginated(sync.supabase, 'comissoes_sienge_comissoes', 'broker_id, broker_nome')
         
         corretores = {}
-        for c in (result.data or []):
+        for c in comissoes:
             broker_id = c.get('broker_id')
             broker_nome = c.get('broker_nome')
             if broker_id and broker_nome and broker_id not in corretores:
@@ -1799,10 +1742,10 @@ def listar_status_parcela():
     """Lista todos os status de parcela únicos no banco"""
     try:
         sync = SiengeSupabaseSync()
-        result = sync.supabase.table('comissoes_sienge_comissoes').select('installment_status').execute()
+        comissoes = fetch_all_paginated(sync.supabase, 'comissoes_sienge_comissoes', 'installment_status')
         
         status_unicos = set()
-        for c in (result.data or []):
+        for c in comissoes:
             st = c.get('installment_status')
             if st:
                 status_unicos.add(st)
@@ -1815,9 +1758,282 @@ def listar_status_parcela():
         return jsonify({'sucesso': False, 'erro': str(e)}), 500
 
 
+# Mapeamento de status da parcela PT-BR -> valores do Sienge (busca por substring, sem caixa)
+MAPA_STATUS_PARCELA = {
+    'pago': ['paidout', 'paid out', 'paid', 'pago'],
+    'pendente': ['pending', 'pendente'],
+    'vencido': ['overdue', 'vencido'],
+    'aberto': ['open', 'aberto'],
+    'parcial': ['partial', 'parcial'],
+    'cancelado': ['cancelled', 'canceled', 'cancelado'],
+    'cancelada': ['cancelled', 'canceled', 'cancelado'],
+    'aguardando autorização': ['awaiting authorization', 'awaiting_authorization', 'aguardando autorização'],
+    'aguardando liberação': ['awaiting release', 'awaiting_release', 'aguardando liberação'],
+    'liberado': ['released', 'liberado'],
+    'liberada': ['released', 'liberado', 'liberada'],
+}
+
+
+def valores_status_parcela(status: str) -> list:
+    status_lower = status.lower()
+    return MAPA_STATUS_PARCELA.get(status_lower, [status_lower])
+
+
+def _valor_postgrest(valor) -> str:
+    # Valor entre aspas (numa lista {a,b} ou num or=(...)): espaços, vírgulas e parênteses não quebram a expressão
+    return '"' + str(valor).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _data_iso(valor: str):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d') if len(valor) == 10 else None
+    except ValueError:
+        return None
+
+
+def filtros_listar_comissoes(corretores: list, status_parcela: list, status_aprovacao: list,
+                             data_comissao_inicio: str, data_comissao_fim: str):
+    """Traduz os filtros de /api/comissoes/listar em cláusulas PostgREST (None se não há filtro).
+    
+    Equivalentes aos filtros Python de filtrar_comissoes_colunas, que continuam conferindo o
+    resultado: corretores é a lista de grafias de broker_nome do corretor escolhido
+    (mapa_nomes_corretores; None = sem filtro) e vira in_, o status da parcela um ilike any
+    com os valores de MAPA_STATUS_PARCELA, a aprovação um in_ e a data da comissão usa
+    due_date quando não há commission_date (linhas sem nenhuma das duas passam). Gatilho e
+    data do contrato dependem de outras tabelas e ficam só no Python.
+    """
+    clausulas = []
+    
+    if corretores is not None:
+        clausulas.append(lambda q: q.in_('broker_nome', corretores))
+    
+    if status_parcela:
+        padroes = {v for status in status_parcela for v in valores_status_parcela(status)}
+        lista = ','.join(_valor_postgrest(f"*{v}*") for v in sorted(padroes))
+        clausulas.append(lambda q: q.ilike_any_of('installment_status', lista))
+    
+    if status_aprovacao:
+        clausulas.append(lambda q: q.in_('status_aprovacao', status_aprovacao))
+    
+    inicio = _data_iso(data_comissao_inicio)
+    fim = _data_iso(data_comissao_fim)
+    limites = []
+    if inicio:
+        limites.append(('gte', inicio.strftime('%Y-%m-%d')))
+    if fim:
+        # < dia seguinte: inclui timestamps do último dia, como o corte [:10] do Python
+        limites.append(('lt', (fim + timedelta(days=1)).strftime('%Y-%m-%d')))
+    if limites:
+        def faixa(coluna):
+            return ','.join(f"{coluna}.{op}.{valor}" for op, valor in limites)
+        expressao_periodo = (f"and({faixa('commission_date')}),"
+                             f"and(commission_date.is.null,or(due_date.is.null,and({faixa('due_date')})))")
+        clausulas.append(lambda q: q.or_(expressao_periodo))
+    
+    if not clausulas:
+        return None
+    
+    def aplicar(query):
+        for clausula in clausulas:
+            query = clausula(query)
+        return query
+    return aplicar
+
+
+def filtrar_comissoes_colunas(comissoes: list, corretor: str, status_parcela: list, status_aprovacao: list,
+                              data_comissao_inicio: str, data_comissao_fim: str) -> list:
+    """Filtros de /api/comissoes/listar sobre colunas da própria comissão (conferência exata em Python)"""
+    # Filtrar por corretor (comparação exata pelo nome)
+    if corretor:
+        comissoes = [c for c in comissoes
+                     if (c.get('broker_nome') or '').strip() == corretor.strip()]
+    
+    if status_parcela:
+        def match_status_parcela(comissao):
+            status_comissao = (comissao.get('installment_status') or '').lower()
+            for status in status_parcela:
+                valores_busca = valores_status_parcela(status)
+                if any(v in status_comissao for v in valores_busca):
+                    return True
+            return False
+        comissoes = [c for c in comissoes if match_status_parcela(c)]
+    
+    if status_aprovacao:
+        comissoes = [c for c in comissoes if c.get('status_aprovacao') in status_aprovacao]
+    
+    # Filtro por período da data da comissão
+    if data_comissao_inicio or data_comissao_fim:
+        def filtrar_por_data_comissao(comissao):
+            data_comissao = comissao.get('commission_date') or comissao.get('due_date')
+            if not data_comissao:
+                # Sem data no registro: não ocultar (evita sumir da listagem por dado incompleto)
+                return True
+            try:
+                if 'T' in str(data_comissao):
+                    data_str = str(data_comissao).split('T')[0]
+                else:
+                    data_str = str(data_comissao)[:10]
+                
+                if data_comissao_inicio and data_str < data_comissao_inicio:
+                    return False
+                if data_comissao_fim and data_str > data_comissao_fim:
+                    return False
+                return True
+            except:
+                return False
+        
+        comissoes = [c for c in comissoes if filtrar_por_data_comissao(c)]
+    
+    return comissoes
+
+
+def enriquecer_comissoes(supabase_client, comissoes: list):
+    """Preenche valor à vista, ITBI, valor pago, regra e gatilho de cada comissão (in-place).
+    
+    Lê o estado materializado (gatilho_estado.py); só as comissões ainda sem estado são
+    calculadas na hora (gatilho.py), com os mapas em cache.
+    """
+    sem_estado = aplicar_estado(supabase_client, comissoes)
+    if sem_estado:
+        enriquecer_gatilhos(sem_estado, mapa_contratos(supabase_client), mapa_itbi(supabase_client),
+                            mapa_valor_pago(supabase_client), mapa_regras(supabase_client))
+
+
+# Paginação de /api/comissoes/listar: tamanho padrão e máximo de page_size
+LISTAR_PAGINA_PADRAO = int(os.getenv('LISTAR_PAGINA_PADRAO', 100))
+LISTAR_PAGINA_MAXIMO = int(os.getenv('LISTAR_PAGINA_MAXIMO', 500))
+
+# Colunas aceitas em sort ('campo' crescente, '-campo' decrescente); desempate sempre por id
+ORDENACOES_LISTAR = ('commission_date', 'due_date', 'broker_nome', 'enterprise_name', 'unit_name',
+                     'customer_name', 'numero_contrato', 'commission_value', 'installment_status',
+                     'status_aprovacao', 'id')
+ORDENACAO_LISTAR_PADRAO = '-commission_date'
+
+
+def _ordenacao_listar(sort: str) -> tuple:
+    campo = sort.lstrip('-')
+    if campo not in ORDENACOES_LISTAR:
+        raise ValueError(f"Ordenação inválida: {sort}. Use: {', '.join(ORDENACOES_LISTAR)}")
+    return campo, sort.startswith('-')
+
+
+def _paginacao_listar(args) -> tuple:
+    try:
+        pagina = int(args.get('page') or 1)
+        tamanho = int(args.get('page_size') or LISTAR_PAGINA_PADRAO)
+    except ValueError:
+        raise ValueError('page e page_size devem ser números inteiros')
+    return max(1, pagina), min(max(1, tamanho), LISTAR_PAGINA_MAXIMO)
+
+
+def _codificar_cursor(ordenacao: tuple, comissao: dict) -> str:
+    """Cursor opaco = posição da última linha entregue (valor da ordenação + id)"""
+    campo, desc = ordenacao
+    dados = json.dumps([campo, desc, comissao.get(campo), comissao.get('id')], default=str)
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor: str, ordenacao: tuple) -> tuple:
+    try:
+        campo, desc, valor, ultimo_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if (campo, desc) != ordenacao:
+        raise ValueError('Cursor gerado com outra ordenação')
+    return valor, ultimo_id
+
+
+def _filtro_cursor(ordenacao: tuple, valor, ultimo_id):
+    """Cláusula keyset 'depois do cursor' (nulos por último, como no order da página)"""
+    campo, desc = ordenacao
+    op = 'lt' if desc else 'gt'
+    if campo == 'id':
+        return lambda q: q.filter('id', op, ultimo_id)
+    if valor is None:
+        return lambda q: q.is_(campo, 'null').filter('id', op, ultimo_id)
+    v = _valor_postgrest(valor)
+    expressao = f"{campo}.{op}.{v},and({campo}.eq.{v},id.{op}.{ultimo_id}),{campo}.is.null"
+    return lambda q: q.or_(expressao)
+
+
+def _depois_do_cursor(comissao: dict, ordenacao: tuple, valor, ultimo_id) -> bool:
+    """Mesma regra de _filtro_cursor, para listas ordenadas em Python"""
+    campo, desc = ordenacao
+    depois = (lambda a, b: a < b) if desc else (lambda a, b: a > b)
+    atual = comissao.get(campo)
+    if valor is None:
+        return atual is None and depois(comissao.get('id') or 0, ultimo_id)
+    if atual is None:
+        return True
+    return depois(atual, valor) or (atual == valor and depois(comissao.get('id') or 0, ultimo_id))
+
+
+def ordenar_comissoes(comissoes: list, ordenacao: tuple):
+    """Ordena in-place por (campo, id), nulos por último — a mesma ordem da página do banco"""
+    campo, desc = ordenacao
+    com_valor = sorted((c for c in comissoes if c.get(campo) is not None),
+                       key=lambda c: (c.get(campo), c.get('id') or 0), reverse=desc)
+    sem_valor = sorted((c for c in comissoes if c.get(campo) is None),
+                       key=lambda c: c.get('id') or 0, reverse=desc)
+    comissoes[:] = com_valor + sem_valor
+
+
+def _pagina_comissoes_banco(supabase_client, filtros, ordenacao: tuple, pagina: int, tamanho: int, cursor):
+    """Uma página direto do banco (filtros + order + cursor/offset + limit): custo da página, não da tabela.
+    
+    Retorna (linhas, total, tem_mais). O total (count exact) sai na própria consulta da
+    página; com cursor, numa consulta de contagem à parte (o cursor restringe a página).
+    """
+    campo, desc = ordenacao
+    
+    def consulta(colunas, count=None):
+        query = supabase_client.table('comissoes_sienge_comissoes').select(colunas, count=count)
+        return filtros(query) if filtros else query
+    
+    query = consulta('*', count=None if cursor else 'exact')
+    if cursor:
+        query = _filtro_cursor(ordenacao, *cursor)(query)
+    if campo != 'id':
+        query = query.order(campo, desc=desc, nullsfirst=False)
+    # Uma linha a mais diz se existe próxima página
+    query = query.order('id', desc=desc).limit(tamanho + 1)
+    if not cursor:
+        query = query.offset((pagina - 1) * tamanho)
+    result = query.execute()
+    
+    rows = result.data or []
+    total = result.count
+    if cursor:
+        total = consulta('id', count='exact').limit(1).execute().count
+    return rows[:tamanho], total, len(rows) > tamanho
+
+
+def _resposta_pagina(comissoes: list, total: int, pagina: int, tamanho: int, ordenacao: tuple, tem_mais: bool):
+    campo, desc = ordenacao
+    return jsonify({
+        'sucesso': True,
+        'comissoes': comissoes,
+        'total': total,
+        'pagina': pagina,
+        'tamanho_pagina': tamanho,
+        'total_paginas': -(-total // tamanho) if total is not None else None,
+        'ordenacao': f"{'-' if desc else ''}{campo}",
+        'proximo_cursor': _codificar_cursor(ordenacao, comissoes[-1]) if tem_mais and comissoes else None
+    }), 200
+
+
 @app.route('/api/comissoes/listar', methods=['GET'])
 @login_required
 def listar_todas_comissoes():
+    """Comissões filtradas, com gatilho calculado.
+    
+    Paginação: page, page_size (até LISTAR_PAGINA_MAXIMO), sort ('campo' / '-campo', ver
+    ORDENACOES_LISTAR) e cursor (proximo_cursor da resposta anterior: continua depois da
+    última linha entregue, estável mesmo com inserções). Sem filtro de gatilho nem de data
+    do contrato, a página sai direto do banco e só as linhas dela são enriquecidas — o custo
+    não cresce com a tabela. Esses dois filtros dependem do gatilho calculado: todas as
+    candidatas são enriquecidas antes de paginar. Sem page/page_size/cursor devolve tudo.
+    """
     try:
         sync = SiengeSupabaseSync()
         
@@ -1835,178 +2051,37 @@ def listar_todas_comissoes():
         status_aprovacao_list = [s.strip() for s in status_aprovacao_param.split(',') if s.strip()]
         gatilho_list = [s.strip() for s in gatilho_atingido_param.split(',') if s.strip()]
         
+        paginar = any(request.args.get(p) for p in ('page', 'page_size', 'cursor'))
+        try:
+            ordenacao = _ordenacao_listar(request.args.get('sort') or ORDENACAO_LISTAR_PADRAO)
+            pagina, tamanho = _paginacao_listar(request.args)
+            cursor = _decodificar_cursor(request.args['cursor'], ordenacao) if request.args.get('cursor') else None
+        except ValueError as e:
+            return jsonify({'sucesso': False, 'erro': str(e)}), 400
+        
         print(f"[API] Filtros recebidos - status_parcela: {status_parcela_list}, status_aprovacao: {status_aprovacao_list}, gatilho: {gatilho_list}, corretor: {corretor_param}")
         
-        # Todas as parcelas (incl. canceladas no Sienge): excluir só pelo filtro de status da UI
-        comissoes = fetch_all_paginated(sync.supabase, 'comissoes_sienge_comissoes', '*')
-
-        # Filtrar por corretor (comparação exata pelo nome)
-        if corretor_param:
-            comissoes = [c for c in comissoes
-                         if (c.get('broker_nome') or '').strip() == corretor_param.strip()]
-
-        # Mapeamento de status PT-BR -> EN
-        mapa_status_parcela = {
-            'pago': ['paidout', 'paid out', 'paid', 'pago'],
-            'pendente': ['pending', 'pendente'],
-            'vencido': ['overdue', 'vencido'],
-            'aberto': ['open', 'aberto'],
-            'parcial': ['partial', 'parcial'],
-            'cancelado': ['cancelled', 'canceled', 'cancelado'],
-            'cancelada': ['cancelled', 'canceled', 'cancelado'],
-            'aguardando autorização': ['awaiting authorization', 'awaiting_authorization', 'aguardando autorização'],
-            'aguardando liberação': ['awaiting release', 'awaiting_release', 'aguardando liberação'],
-            'liberado': ['released', 'liberado'],
-            'liberada': ['released', 'liberado', 'liberada'],
-        }
+        # Todas as parcelas (incl. canceladas no Sienge): excluir só pelo filtro de status da UI.
+        # Os filtros de colunas da própria tabela vão para o banco; filtrar_comissoes_colunas
+        # confere o resultado em Python
+        corretores = mapa_nomes_corretores(sync.supabase).get(corretor_param.strip(), []) if corretor_param.strip() else None
+        filtros = filtros_listar_comissoes(corretores, status_parcela_list, status_aprovacao_list,
+                                           data_comissao_inicio, data_comissao_fim)
         
-        if status_parcela_list:
-            def match_status_parcela(comissao):
-                status_comissao = (comissao.get('installment_status') or '').lower()
-                for status in status_parcela_list:
-                    status_lower = status.lower()
-                    valores_busca = mapa_status_parcela.get(status_lower, [status_lower])
-                    if any(v in status_comissao for v in valores_busca):
-                        return True
-                return False
-            comissoes = [c for c in comissoes if match_status_parcela(c)]
-        
-        if status_aprovacao_list:
-            comissoes = [c for c in comissoes if c.get('status_aprovacao') in status_aprovacao_list]
-        
-        comissoes.sort(key=lambda x: x.get('commission_date') or '', reverse=True)
-        
-        # ===== BATCH LOADING: carregar todos os dados auxiliares de uma vez =====
-        # Em vez de N queries por comissão, fazemos queries paginadas no total
-        print(f"[API] Batch-loading dados para {len(comissoes)} comissões...")
-        
-        # 1. Carregar todos os contratos (com paginação)
-        contratos_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_contratos', 'numero_contrato,building_id,valor_a_vista,valor_total,data_contrato')
-        contratos_map = {}
-        for ct in contratos_data:
-            key = (str(ct.get('numero_contrato', '')), str(ct.get('building_id', '')))
-            contratos_map[key] = ct
-        
-        # 2. Carregar todos os ITBIs (com paginação)
-        itbi_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_itbi', 'numero_contrato,building_id,valor_itbi')
-        itbi_map = {}
-        for it in itbi_data:
-            key = (str(it.get('numero_contrato', '')), str(it.get('building_id', '')))
-            itbi_map[key] = float(it.get('valor_itbi') or 0)
-        
-        # 3. Carregar todos os valores pagos (com paginação)
-        pago_data = fetch_all_paginated(sync.supabase, 'comissoes_sienge_valor_pago', 'numero_contrato,building_id,valor_pago')
-        pago_map = {}
-        for pg in pago_data:
-            key = (str(pg.get('numero_contrato', '')), str(pg.get('building_id', '')))
-            pago_map[key] = float(pg.get('valor_pago') or 0)
-        
-        # 4. Carregar todas as regras de gatilho
-        regras_data = fetch_all_paginated(sync.supabase, 'comissoes_regras_gatilho', 'id,percentual,inclui_itbi,nome')
-        regras_map = {}
-        for rg in regras_data:
-            regras_map[rg['id']] = rg
+        def filtrar_colunas(lista):
+            return filtrar_comissoes_colunas(lista, corretor_param, status_parcela_list, status_aprovacao_list,
+                                             data_comissao_inicio, data_comissao_fim)
         
-        print(f"[API] Batch-load concluído: {len(contratos_map)} contratos, {len(itbi_map)} ITBIs, {len(pago_map)} pagos, {len(regras_map)} regras")
+        if paginar and not (gatilho_list or data_inicio or data_fim):
+            comissoes, total, tem_mais = _pagina_comissoes_banco(sync.supabase, filtros, ordenacao, pagina, tamanho, cursor)
+            comissoes = filtrar_colunas(comissoes)
+            enriquecer_comissoes(sync.supabase, comissoes)
+            print(f"[API] Página {pagina} ({len(comissoes)} de {total} comissões) direto do banco")
+            return _resposta_pagina(comissoes, total, pagina, tamanho, ordenacao, tem_mais)
         
-        # ===== Calcular gatilho para cada comissão usando dados pré-carregados =====
-        for c in comissoes:
-            numero_contrato = str(c.get('numero_contrato') or '')
-            building_id = str(c.get('building_id') or '')
-            key = (numero_contrato, building_id)
-            
-            # Verificar se é uma comissão manual
-            is_manual = c.get('origem') == 'manual' or numero_contrato.startswith('MANUAL-')
-            
-            if is_manual:
-                # Para comissões manuais, os valores já estão definidos no registro
-                valor_a_vista = float(c.get('valor_comissao') or 0)
-                meta = extrair_meta_manual(c)
-                valor_pago_manual = pago_map.get((numero_contrato, 'MANUAL'), 0)
-                if valor_pago_manual == 0 and meta['valor_pago'] is not None:
-                    valor_pago_manual = meta['valor_pago']
-                regra_gatilho_texto = 'Manual'
-                
-                c['valor_pago'] = valor_pago_manual
-                c['valor_itbi'] = 0
-                c['valor_a_vista'] = valor_a_vista
-                c['regra_gatilho'] = regra_gatilho_texto
-                c['observacoes'] = meta['observacoes']
-                c['data_contrato'] = c.get('commission_date')
-                
-                # Usar valor_gatilho armazenado; se não existir, 10% do valor à vista
-                valor_gatilho = meta['valor_gatilho'] if meta['valor_gatilho'] is not None else valor_a_vista * 0.10
-                c['valor_gatilho'] = valor_gatilho
-                c['atingiu_gatilho'] = gatilho_foi_atingido(valor_pago_manual, valor_gatilho)
-                
-            else:
-                # Lógica normal para comissões do SIENGE
-                contrato = contratos_map.get(key)
-                valor_itbi = itbi_map.get(key, 0)
-                valor_pago = pago_map.get(key, 0)
-                
-                # Data do contrato: usar do contrato ou fallback para data da comissão
-                if contrato:
-                    c['data_contrato'] = contrato.get('data_contrato')
-                else:
-                    # Fallback: usar commission_date ou due_date da comissão
-                    c['data_contrato'] = c.get('commission_date') or c.get('due_date')
-                
-                # Garantir que unit_name venha do contrato se não estiver na comissão
-                if not c.get('unit_name') and contrato:
-                    c['unit_name'] = contrato.get('unidade') or contrato.get('unit_name')
-                
-                # Valor à vista = baseValue da comissão (campo valor_comissao em comissoes_sienge_comissoes,
-                # populado por sincronizar_base_value.py). NÃO usar contrato.valor_a_vista pois esse
-                # campo na view contém o valor TOTAL do contrato, não o valor à vista real.
-                valor_a_vista = float(c.get('valor_comissao') or 0)
-                if valor_a_vista == 0:
-                    # Fallback: calcular a partir do valor da comissão e percentual
-                    commission_value = float(c.get('commission_value') or 0)
-                    percentual_comissao = float(c.get('installment_percentage') or 0)
-                    if percentual_comissao > 0:
-                        valor_a_vista = commission_value / (percentual_comissao / 100)
-                
-                # Determinar regra do gatilho
-                regra_gatilho_texto = '10% + ITBI'
-                percentual = None
-                inclui_itbi = None
-                
-                regra_id = c.get('regra_gatilho_id')
-                if regra_id and regra_id in regras_map:
-                    regra_data = regras_map[regra_id]
-                    percentual = regra_data.get('percentual')
-                    inclui_itbi = regra_data.get('inclui_itbi')
-                    if percentual is not None:
-                        regra_gatilho_texto = f"{percentual}% + ITBI" if inclui_itbi else f"{percentual}%"
-                
-                if percentual is None:
-                    regra_texto = c.get('regra_gatilho')
-                    if regra_texto:
-                        regra_gatilho_texto = regra_texto
-                
-                # Calcular valor do gatilho
-                if percentual is not None:
-                    perc = float(percentual) / 100.0
-                    valor_gatilho = (valor_a_vista * perc) + valor_itbi if inclui_itbi else valor_a_vista * perc
-                else:
-                    valor_gatilho = calcular_valor_gatilho(valor_a_vista, valor_itbi, regra_gatilho_texto)
-                
-                # Verificar se atingiu gatilho (None se não há dados suficientes)
-                if valor_a_vista == 0 and not contrato:
-                    # Sem dados para calcular - marcar como dados incompletos
-                    atingiu_gatilho = None
-                    c['dados_incompletos'] = True
-                else:
-                    atingiu_gatilho = gatilho_foi_atingido(valor_pago, valor_gatilho)
-                    c['dados_incompletos'] = False
-                
-                c['valor_pago'] = valor_pago
-                c['valor_itbi'] = valor_itbi
-                c['valor_gatilho'] = valor_gatilho
-                c['atingiu_gatilho'] = atingiu_gatilho
-                c['valor_a_vista'] = valor_a_vista
-                c['regra_gatilho'] = regra_gatilho_texto
+        comissoes = filtrar_colunas(fetch_all_paginated(sync.supabase, 'comissoes_sienge_comissoes', '*', filtros=filtros))
+        print(f"[API] Calculando gatilho de {len(comissoes)} comissões...")
+        enriquecer_comissoes(sync.supabase, comissoes)
         
         # Filtro de período de data do contrato
         if data_inicio or data_fim:
@@ -2036,35 +2111,23 @@ def listar_todas_comissoes():
             comissoes = [c for c in comissoes if c.get('atingiu_gatilho') in gatilho_bools]
             print(f"[API] Após filtro de gatilho: {len(comissoes)} comissões")
         
-        # Filtro por período da data da comissão
-        if data_comissao_inicio or data_comissao_fim:
-            def filtrar_por_data_comissao(comissao):
-                data_comissao = comissao.get('commission_date') or comissao.get('due_date')
-                if not data_comissao:
-                    # Sem data no registro: não ocultar (evita sumir da listagem por dado incompleto)
-                    return True
-                try:
-                    if 'T' in str(data_comissao):
-                        data_str = str(data_comissao).split('T')[0]
-                    else:
-                        data_str = str(data_comissao)[:10]
-                    
-                    if data_comissao_inicio and data_str < data_comissao_inicio:
-                        return False
-                    if data_comissao_fim and data_str > data_comissao_fim:
-                        return False
-                    return True
-                except:
-                    return False
-            
-            comissoes = [c for c in comissoes if filtrar_por_data_comissao(c)]
-            print(f"[API] Após filtro de data comissão: {len(comissoes)} comissões")
+        ordenar_comissoes(comissoes, ordenacao)
         
-        return jsonify({
-            'sucesso': True,
-            'comissoes': comissoes,
-            'total': len(comissoes)
-        }), 200
+        if not paginar:
+            return jsonify({
+                'sucesso': True,
+                'comissoes': comissoes,
+                'total': len(comissoes)
+            }), 200
+        
+        total = len(comissoes)
+        if cursor:
+            comissoes = [c for c in comissoes if _depois_do_cursor(c, ordenacao, *cursor)]
+            inicio = 0
+        else:
+            inicio = (pagina - 1) * tamanho
+        pagina_atual = comissoes[inicio:inicio + tamanho]
+        return _resposta_pagina(pagina_atual, total, pagina, tamanho, ordenacao, len(comissoes) > inicio + tamanho)
         
     except Exception as e:
         return jsonify({'sucesso': False, 'erro': str(e)}), 500
@@ -2140,6 +2203,7 @@ def criar_comissao_manual():
         
         if result.data:
             comissao_criada = result.data[0]
+            publicar_alteracao(sync.supabase, 'comissoes')
             
             # Criar registro de valor pago se valor_pago > 0
             if valor_pago > 0:
@@ -2151,9 +2215,14 @@ def criar_comissao_manual():
                         'valor_pago': valor_pago,
                         'atualizado_em': datetime.now().isoformat()
                     }).execute()
+                    publicar_alteracao(sync.supabase, 'valor_pago')
                 except Exception as e:
                     print(f"[API] Erro ao inserir valor_pago (não crítico, valor está em observações): {str(e)}")
             
+            # Pelo contrato: o valor pago inserido vale para todas as comissões dele
+            atualizar_estado_gatilho(sync.supabase, numeros_contrato=[numero_contrato_manual],
+                                     comissao_ids=[comissao_criada.get('id')])
+            
             print(f"[API] Comissão manual criada: {numero_contrato_manual} - Corretor: {data.get('corretor_nome')}")
             
             return jsonify({
@@ -2195,6 +2264,7 @@ def cancelar_comissao(comissao_id):
             'installment_status': 'CANCELLED',
             'atualizado_em': datetime.now().isoformat()
         }).eq('id', comissao_id).execute()
+        publicar_alteracao(sync.supabase, 'comissoes')
         
         print(f"[API] Comissão {comissao_id} cancelada por {current_user.username} | Corretor: {comissao.get('broker_nome')} | Cliente: {comissao.get('customer_name')}")
         
@@ -2225,6 +2295,7 @@ def enviar_comissoes_aprovacao():
         aprovacao = AprovacaoComissoes(sync.supabase)
         
         resultado = aprovacao.enviar_para_aprovacao(comissoes_ids, current_user.id, observacoes)
+        publicar_alteracao(sync.supabase, 'comissoes')
         
         if resultado['sucesso']:
             return jsonify(resultado), 200
@@ -2252,6 +2323,7 @@ def aprovar_comissoes():
         aprovacao = AprovacaoComissoes(sync.supabase)
         
         resultado = aprovacao.aprovar_comissoes(comissoes_ids, current_user.id, observacoes)
+        publicar_alteracao(sync.supabase, 'comissoes')
         
         if resultado['sucesso']:
             return jsonify(resultado), 200
@@ -2283,6 +2355,7 @@ def rejeitar_comissoes():
         aprovacao = AprovacaoComissoes(sync.supabase)
         
         resultado = aprovacao.rejeitar_comissoes(comissoes_ids, current_user.id, motivo, observacoes)
+        publicar_alteracao(sync.supabase, 'comissoes')
         
         if resultado['sucesso']:
             return jsonify(resultado), 200
@@ -2301,9 +2374,8 @@ def listar_comissoes_pendentes_aprovacao():
         
         comissoes = aprovacao.listar_comissoes_por_status('Pendente de Aprovação')
         
-        # Calcular gatilho usando a função centralizada (mesma da consulta por contrato)
-        for c in comissoes:
-            gatilho = obter_gatilho_contrato(sync, c.get('numero_contrato'), c.get('building_id'), c)
+        # Gatilho em lote (mesmo cálculo da consulta por contrato, sem consultas por comissão)
+        for c, gatilho in zip(comissoes, obter_gatilhos(sync.supabase, comissoes)):
             c['valor_gatilho'] = gatilho['valor_gatilho']
             c['atingiu_gatilho'] = gatilho['atingiu_gatilho']
             c['valor_pago'] = gatilho['valor_pago']
@@ -2328,45 +2400,7 @@ def reverter_status_comissoes():
         return jsonify({'erro': 'Apenas administradores podem executar esta ação'}), 403
     
     try:
-        sync = SiengeSupabaseSync()
-        
-        # Buscar comissões que não estão pendentes
-        result = sync.supabase.table('comissoes_sienge_comissoes')\
-            .select('id, status_aprovacao, broker_nome')\
-            .neq('status_aprovacao', 'Pendente')\
-            .execute()
-        
-        comissoes_para_reverter = result.data if result.data else []
-        total = len(comissoes_para_reverter)
-        revertidas = 0
-        
-        print(f"[REVERTER] Encontradas {total} comissões para reverter")
-        
-        for c in comissoes_para_reverter:
-            try:
-                sync.supabase.table('comissoes_sienge_comissoes')\
-                    .update({
-                        'status_aprovacao': 'Pendente',
-                        'data_envio_aprovacao': None,
-                        'enviado_por': None,
-                        'data_aprovacao': None,
-                        'aprovado_por': None,
-                        'observacoes': None
-                    })\
-                    .eq('id', c['id'])\
-                    .execute()
-                revertidas += 1
-                print(f"[REVERTER] Comissão {c['id']} ({c.get('broker_nome', 'N/A')}) revertida de '{c.get('status_aprovacao')}' para 'Pendente'")
-            except Exception as e:
-                print(f"[REVERTER] Erro ao reverter comissão {c['id']}: {str(e)}")
-        
-        return jsonify({
-            'sucesso': True,
-            'mensagem': f'{revertidas} comissões revertidas para status Pendente',
-            'total_encontradas': total,
-            'revertidas': revertidas
-        }), 200
-        
+        return responder_job('reverter_status')
     except Exception as e:
         print(f"[REVERTER] Erro: {str(e)}")
         return jsonify({'sucesso': False, 'erro': str(e)}), 500
@@ -2457,7 +2491,11 @@ def sincronizacao_diaria():
     try:
         print(f"[{datetime.now()}] Iniciando sincronização automática...")
         sync = SiengeSupabaseSync()
-        resultado = sync.sync_all()
+        resultado = executar_sincronizacao(
+            sync.supabase,
+            lambda progresso: sync.sync_all(progresso=progresso),
+            origem='app'
+        )
         print(f"[{datetime.now()}] Sincronização concluída: {resultado}")
     except Exception as e:
         print(f"[{datetime.now()}] Erro na sincronização: {str(e)}")
@@ -3,13 +3,12 @@ Gerenciador de Autenticação - Sistema de Comissões Young
 Gerencia autenticação de usuários (gestores e corretores) com Flask-Login
 """
 
-import os
 import hashlib
 import bcrypt
 from datetime import datetime
 from typing import Optional
 from flask_login import UserMixin
-from supabase import create_client
+from supabase_client import get_supabase
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,11 +46,8 @@ class CorretorUser(UserMixin):
 class AuthManager:
     """Gerenciador de autenticação"""
     
-    def __init__(self):
-        self.supabase = create_client(
-            os.getenv('SUPABASE_URL'),
-            os.getenv('SUPABASE_KEY')
-        )
+    def __init__(self, supabase=None):
+        self.supabase = supabase or get_supabase()
     
     def _hash_senha(self, senha: str) -> str:
         """Gera hash bcrypt da senha"""
@@ -0,0 +1,203 @@
+"""
+Cache em Memória - Sistema de Comissões Young
+Cache com TTL por processo para as tabelas de referência (contratos, ITBI, valor pago,
+regras de gatilho), que as telas de comissões recarregavam inteiras a cada request.
+
+As entradas expiram em CACHE_TTL_SEGUNDOS, o cache guarda no máximo
+CACHE_MAX_ENTRADAS (descarta a menos usada) e quem grava nessas tabelas chama
+invalidar(). Os valores são compartilhados entre requests: NÃO modifique o que
+obter() devolve.
+
+Invalidação entre processos (workers do gunicorn, scheduler, scripts): quem grava
+chama barramento.publicar(supabase, tópico...), que incrementa a versão do tópico na
+tabela comissoes_cache_versao; cada processo confere essa tabela (uma linha por
+tópico) no máximo a cada CACHE_VERSAO_INTERVALO segundos e descarta o que mudou.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Validade (segundos) de cada entrada do cache de referências
+CACHE_TTL_SEGUNDOS = float(os.getenv('CACHE_TTL_SEGUNDOS', 300))
+
+# Máximo de entradas por cache (as menos usadas saem primeiro)
+CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS', 32))
+
+# Intervalo mínimo (segundos) entre consultas às versões publicadas por outros processos
+CACHE_VERSAO_INTERVALO = float(os.getenv('CACHE_VERSAO_INTERVALO', 5))
+
+
+class CacheTTL:
+    """Cache chave -> valor com TTL, limite de tamanho (LRU) e métricas.
+    
+    obter(chave, carregar) devolve o valor em cache ou chama carregar() uma única vez
+    por chave, mesmo com várias threads pedindo ao mesmo tempo (as outras esperam).
+    """
+    
+    def __init__(self, nome: str, ttl: float = CACHE_TTL_SEGUNDOS, max_entradas: int = CACHE_MAX_ENTRADAS):
+        self.nome = nome
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # chave -> (expira_em, valor)
+        self._carregando = {}  # chave -> Lock do carregamento em andamento
+        self._lock = threading.Lock()
+        # Incrementada a cada invalidação: um carregamento iniciado antes não é gravado
+        self._geracao = 0
+        self._metricas = {'hits': 0, 'misses': 0, 'carregamentos': 0, 'expirados': 0,
+                          'despejos': 0, 'invalidacoes': 0, 'erros': 0, 'tempo_carga_s': 0.0}
+    
+    def _buscar(self, chave: Hashable, agora: float):
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return False, None
+        if entrada[0] <= agora:
+            del self._entradas[chave]
+            self._metricas['expirados'] += 1
+            return False, None
+        self._entradas.move_to_end(chave)
+        return True, entrada[1]
+    
+    def obter(self, chave: Hashable, carregar: Callable):
+        with self._lock:
+            achou, valor = self._buscar(chave, time.monotonic())
+            if achou:
+                self._metricas['hits'] += 1
+                return valor
+            self._metricas['misses'] += 1
+            trava = self._carregando.setdefault(chave, threading.Lock())
+        
+        with trava:
+            # Outra thread pode ter carregado enquanto esta esperava
+            with self._lock:
+                achou, valor = self._buscar(chave, time.monotonic())
+                if achou:
+                    return valor
+                geracao = self._geracao
+            
+            inicio = time.monotonic()
+            try:
+                valor = carregar()
+            except Exception:
+                with self._lock:
+                    self._metricas['erros'] += 1
+                raise
+            finally:
+                with self._lock:
+                    if self._carregando.get(chave) is trava:
+                        del self._carregando[chave]
+            
+            with self._lock:
+                self._metricas['carregamentos'] += 1
+                self._metricas['tempo_carga_s'] += time.monotonic() - inicio
+                if geracao == self._geracao:
+                    self._entradas[chave] = (time.monotonic() + self.ttl, valor)
+                    self._entradas.move_to_end(chave)
+                    while len(self._entradas) > self.max_entradas:
+                        self._entradas.popitem(last=False)
+                        self._metricas['despejos'] += 1
+            return valor
+    
+    def invalidar(self, *chaves: Hashable):
+        """Remove as chaves informadas (ou tudo, sem argumentos)."""
+        with self._lock:
+            if chaves:
+                for chave in chaves:
+                    self._entradas.pop(chave, None)
+            else:
+                self._entradas.clear()
+            self._geracao += 1
+            self._metricas['invalidacoes'] += 1
+    
+    def metricas(self) -> Dict:
+        with self._lock:
+            consultas = self._metricas['hits'] + self._metricas['misses']
+            return dict(
+                self._metricas,
+                nome=self.nome,
+                entradas=len(self._entradas),
+                chaves=[str(c) for c in self._entradas],
+                taxa_acerto=round(self._metricas['hits'] / consultas, 3) if consultas else None,
+                ttl_segundos=self.ttl,
+                max_entradas=self.max_entradas
+            )
+
+
+class BarramentoInvalidacao:
+    """Liga tópicos de escrita ('regras', 'comissoes', ...) às entradas de cache que dependem deles.
+    
+    publicar() invalida no próprio processo e incrementa a versão do tópico no Supabase;
+    verificar() (chamada antes de ler do cache) compara as versões e invalida nos demais.
+    Falha no Supabase não derruba a escrita nem a leitura: sobra o TTL como garantia.
+    """
+    
+    def __init__(self, intervalo: float = CACHE_VERSAO_INTERVALO):
+        self.intervalo = intervalo
+        self._assinantes: Dict[str, List] = {}  # tópico -> [(cache, chaves)]
+        self._versoes = None  # tópico -> versão vista; None = ainda não consultado
+        self._proxima_consulta = 0.0
+        self._lock = threading.Lock()
+    
+    def assinar(self, topico: str, cache: CacheTTL, *chaves: Hashable):
+        """Escritas em topico invalidam essas chaves do cache (sem chaves = o cache inteiro)."""
+        self._assinantes.setdefault(topico, []).append((cache, chaves))
+    
+    def _invalidar_local(self, topicos):
+        for topico in topicos:
+            for cache, chaves in self._assinantes.get(topico, []):
+                cache.invalidar(*chaves)
+    
+    def publicar(self, supabase, *topicos: str):
+        """Avisa todos os processos que os dados dos tópicos mudaram."""
+        try:
+            versoes = supabase.rpc('comissoes_cache_publicar', {'p_nomes': list(topicos)}).execute().data or {}
+            with self._lock:
+                if self._versoes is not None:
+                    self._versoes.update(versoes)
+        except Exception as e:
+            print(f"[Cache] Erro ao publicar invalidação {list(topicos)}: {str(e)}")
+        # Depois do RPC: o que foi carregado antes dele não sobrevive
+        self._invalidar_local(topicos)
+    
+    def verificar(self, supabase, forcar: bool = False):
+        """Invalida os tópicos publicados por outros processos desde a última consulta."""
+        agora = time.monotonic()
+        with self._lock:
+            if not forcar and agora < self._proxima_consulta:
+                return
+            self._proxima_consulta = agora + self.intervalo
+        
+        try:
+            rows = supabase.table('comissoes_cache_versao').select('nome,versao').execute().data or []
+        except Exception as e:
+            print(f"[Cache] Erro ao consultar versões: {str(e)}")
+            return
+        
+        versoes = {row['nome']: row['versao'] for row in rows}
+        with self._lock:
+            anteriores, self._versoes = self._versoes, versoes
+        if anteriores is None:
+            # Primeira consulta do processo: só registra; o cache começou vazio
+            return
+        mudaram = [t for t, v in versoes.items() if anteriores.get(t) != v]
+        if mudaram:
+            self._invalidar_local(mudaram)
+
+
+# Tópicos de escrita. 'comissoes' é publicado por toda escrita em comissoes_sienge_comissoes
+# (endpoints de aprovação, cancelamento, regra da comissão, sincronização)
+TOPICOS = ('contratos', 'itbi', 'valor_pago', 'regras', 'comissoes')
+
+# Mapas de referência das telas de comissões (ver app.py: mapa_contratos, mapa_itbi, ...)
+cache_referencias = CacheTTL('referencias')
+
+barramento = BarramentoInvalidacao()
+for _topico in ('contratos', 'itbi', 'valor_pago', 'regras'):
+    barramento.assinar(_topico, cache_referencias, _topico)
+# Nomes de corretores (filtro e grafias de broker_nome) vêm das comissões
+barramento.assinar('comissoes', cache_referencias, 'corretores')
@@ -14,6 +14,7 @@ if sys.platform == 'win32':
 load_dotenv()
 
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 from sienge_client import sienge_client
 
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
@@ -51,9 +52,9 @@ def main():
     
     # 2. Buscar registros no Supabase que precisam correção
     print("\n[2/4] Buscando registros problemáticos no Supabase...")
-    result = supabase.table('comissoes_sienge_comissoes').select('*').execute()
+    result_data = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', '*')
     
-    registros = result.data or []
+    registros = result_data
     print(f"      {len(registros)} registros no banco")
     
     # Filtrar só os que têm unit_name errado (> 1000)
@@ -14,6 +14,7 @@ if sys.platform == 'win32':
 load_dotenv()
 
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 from sienge_client import sienge_client
 
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
@@ -40,9 +41,9 @@ def main():
     
     # 2. Buscar registros no Supabase que precisam correção
     print("\n[2/3] Buscando registros no Supabase...")
-    result = supabase.table('comissoes_sienge_comissoes').select('id, sienge_id, unit_name').execute()
+    result_data = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', 'id, sienge_id, unit_name')
     
-    registros = result.data or []
+    registros = result_data
     print(f"      {len(registros)} registros no banco")
     
     # 3. Corrigir registros
@@ -0,0 +1,29 @@
+-- Migração: atualização em lote do baseValue (valor à vista) das comissões.
+--
+-- O enriquecimento de baseValue (SiengeSupabaseSync.sync_base_value) fazia um
+-- UPDATE por comissão. Esta função recebe um lote JSON
+--   [{"id": 123, "valor_comissao": 150000.0, "atualizado_em": "2026-10-17T04:10:00"}, ...]
+-- e aplica tudo num único UPDATE ... FROM. Só mexe em valor_comissao/atualizado_em
+-- (status_aprovacao e demais colunas ficam intactos). Retorna o nº de linhas atualizadas.
+--
+-- Não usamos upsert da tabela porque o INSERT implícito exigiria todas as colunas NOT NULL.
+
+create or replace function public.comissoes_atualizar_base_value(payload jsonb)
+returns integer
+language sql
+as $$
+  with dados as (
+    select (x->>'id')::bigint                 as id,
+           (x->>'valor_comissao')::numeric    as valor_comissao,
+           (x->>'atualizado_em')::timestamptz as atualizado_em
+      from jsonb_array_elements(payload) x
+  ), atualizadas as (
+    update public.comissoes_sienge_comissoes c
+       set valor_comissao = d.valor_comissao,
+           atualizado_em  = coalesce(d.atualizado_em, now())
+      from dados d
+     where c.id = d.id
+    returning 1
+  )
+  select count(*)::integer from atualizadas;
+$$;
@@ -0,0 +1,12 @@
+-- Migração: hash de conteúdo das comissões sincronizadas do Sienge.
+--
+-- A sincronização regravava TODAS as comissões a cada execução (novo atualizado_em),
+-- disparando o trigger trg_comissoes_regra_padrao_maio linha a linha. Agora cada
+-- registro guarda o hash (sha1) dos campos vindos do Sienge; quando o hash calculado
+-- na sincronização é igual ao gravado, a linha não é reescrita. Com isso
+-- atualizado_em passa a indicar a última mudança real no Sienge.
+--
+-- Linhas existentes ficam com hash nulo e são regravadas uma única vez na próxima sync.
+
+alter table public.comissoes_sienge_comissoes
+  add column if not exists sienge_hash text;
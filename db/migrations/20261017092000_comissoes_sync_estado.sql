@@ -0,0 +1,17 @@
+-- Migração: estado persistente da sincronização Sienge → Supabase.
+--
+-- Guarda, por escopo, o cursor (high-water mark) da sincronização incremental:
+--   escopo = 'comissoes:empresa:<companyId>'
+--   cursor = {"max_id": <maior commissionID visto>, "total": <count do Sienge na última leitura>}
+--   ultima_sync_completa = última leitura COMPLETA da empresa (reconciliação)
+--
+-- No modo incremental só são lidas as páginas finais de cada empresa (a partir de
+-- total - 1 página); a cada SYNC_RECONCILIACAO_HORAS a empresa é relida por inteiro
+-- para pegar alterações em comissões antigas e exclusões no Sienge.
+
+create table if not exists public.comissoes_sync_estado (
+  escopo                text primary key,
+  cursor                jsonb not null default '{}'::jsonb,
+  ultima_sync_completa  timestamptz,
+  atualizado_em         timestamptz not null default now()
+);
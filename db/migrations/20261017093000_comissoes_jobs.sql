@@ -0,0 +1,30 @@
+-- Migração: fila de jobs em background (sincronização e outras operações longas).
+--
+-- POST /api/sincronizar não roda mais a sincronização dentro do request do gunicorn
+-- (timeout de 120s, 4 threads): enfileira uma linha aqui e devolve o id. O processo
+-- do scheduler (scheduler.py / python jobs.py) reivindica os jobs 'pendente'
+-- (UPDATE ... WHERE status = 'pendente'), executa e vai gravando o progresso:
+--   fase, processados, total, fase_iniciada_em  → taxa e ETA em /api/sincronizar/<id>
+-- status: pendente → executando → concluido | erro
+
+create table if not exists public.comissoes_jobs (
+  id                bigint generated by default as identity primary key,
+  tipo              text not null,
+  status            text not null default 'pendente'
+                    check (status in ('pendente', 'executando', 'concluido', 'erro')),
+  parametros        jsonb not null default '{}'::jsonb,
+  fase              text,
+  processados       integer not null default 0,
+  total             integer,
+  fase_iniciada_em  timestamptz,
+  resultado         jsonb,
+  erro              text,
+  solicitado_por    text,
+  criado_em         timestamptz not null default now(),
+  iniciado_em       timestamptz,
+  atualizado_em     timestamptz not null default now(),
+  concluido_em      timestamptz
+);
+
+create index if not exists comissoes_jobs_status_idx
+  on public.comissoes_jobs (status, criado_em);
@@ -0,0 +1,94 @@
+-- Migração: lock (lease) entre processos para a sincronização com o Sienge.
+--
+-- O scheduler.py, a tarefa do Windows (sincronizacao_agendada.py), os scripts
+-- avulsos (executar_sync_completo.py / sincronizar_comissoes.py) e a API (fila
+-- comissoes_jobs) podiam rodar a mesma sincronização ao mesmo tempo, dobrando a
+-- carga no Sienge e disputando os inserts. Todos passam a adquirir este lease:
+--   adquirir → renovar (heartbeat a cada ~1/3 do TTL) → liberar
+-- Um lease cujo dono morreu sem liberar expira sozinho (expira_em). Quem chega
+-- com o lease ocupado acompanha o job do dono (job_id) em vez de rodar de novo.
+--
+-- As datas são calculadas com now() do banco: as máquinas (servidor Linux e PC
+-- Windows) não precisam ter relógios sincronizados.
+
+create table if not exists public.comissoes_sync_lock (
+  nome          text primary key,
+  dono          text not null,
+  job_id        bigint,
+  adquirido_em  timestamptz not null default now(),
+  renovado_em   timestamptz not null default now(),
+  expira_em     timestamptz not null
+);
+
+-- Adquire o lease se estiver livre, expirado ou já for do mesmo dono.
+-- Retorna {"adquirido": bool, "dono", "job_id", "adquirido_em", "expira_em"} —
+-- quando não adquirido, os campos descrevem quem está com o lease.
+create or replace function public.comissoes_sync_lock_adquirir(
+  p_nome text, p_dono text, p_ttl_segundos integer, p_job_id bigint default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  atual public.comissoes_sync_lock;
+begin
+  insert into public.comissoes_sync_lock as l (nome, dono, job_id, adquirido_em, renovado_em, expira_em)
+  values (p_nome, p_dono, p_job_id, now(), now(), now() + make_interval(secs => p_ttl_segundos))
+  on conflict (nome) do update
+     set dono = excluded.dono,
+         job_id = excluded.job_id,
+         adquirido_em = case when l.dono = excluded.dono then l.adquirido_em else now() end,
+         renovado_em = now(),
+         expira_em = excluded.expira_em
+   where l.expira_em < now() or l.dono = excluded.dono
+  returning * into atual;
+
+  if found then
+    return to_jsonb(atual) || jsonb_build_object('adquirido', true);
+  end if;
+
+  select * into atual from public.comissoes_sync_lock where nome = p_nome;
+  return to_jsonb(atual) || jsonb_build_object('adquirido', false);
+end;
+$$;
+
+-- Heartbeat: estende o lease (e opcionalmente vincula o job). false = lease perdido.
+create or replace function public.comissoes_sync_lock_renovar(
+  p_nome text, p_dono text, p_ttl_segundos integer, p_job_id bigint default null
+)
+returns boolean
+language sql
+as $$
+  with renovado as (
+    update public.comissoes_sync_lock
+       set renovado_em = now(),
+           expira_em = now() + make_interval(secs => p_ttl_segundos),
+           job_id = coalesce(p_job_id, job_id)
+     where nome = p_nome and dono = p_dono
+    returning 1
+  )
+  select exists (select 1 from renovado);
+$$;
+
+create or replace function public.comissoes_sync_lock_liberar(p_nome text, p_dono text)
+returns boolean
+language sql
+as $$
+  with liberado as (
+    delete from public.comissoes_sync_lock
+     where nome = p_nome and dono = p_dono
+    returning 1
+  )
+  select exists (select 1 from liberado);
+$$;
+
+-- Dono atual do lease (null se livre ou expirado).
+create or replace function public.comissoes_sync_lock_atual(p_nome text)
+returns jsonb
+language sql
+stable
+as $$
+  select to_jsonb(l)
+    from public.comissoes_sync_lock l
+   where l.nome = p_nome and l.expira_em >= now();
+$$;
@@ -0,0 +1,29 @@
+-- Migração: versões de cache por tópico (invalidação entre processos).
+--
+-- Cada worker do gunicorn (e o scheduler) guarda em memória os mapas de
+-- referência das telas de comissões (cache.py). Quem grava em contratos, ITBI,
+-- valor pago, regras ou comissões incrementa a versão do tópico aqui
+-- (comissoes_cache_publicar); os processos leem esta tabela (uma linha por
+-- tópico) a cada poucos segundos e descartam as entradas cujo tópico mudou.
+
+create table if not exists public.comissoes_cache_versao (
+  nome           text primary key,
+  versao         bigint not null default 0,
+  atualizado_em  timestamptz not null default now()
+);
+
+-- Incrementa a versão dos tópicos informados; retorna {"tópico": versão_nova, ...}.
+create or replace function public.comissoes_cache_publicar(p_nomes text[])
+returns jsonb
+language sql
+as $$
+  with publicados as (
+    insert into public.comissoes_cache_versao as v (nome, versao, atualizado_em)
+    select distinct unnest(p_nomes), 1, now()
+    on conflict (nome) do update
+       set versao = v.versao + 1,
+           atualizado_em = now()
+    returning v.nome, v.versao
+  )
+  select coalesce(jsonb_object_agg(nome, versao), '{}'::jsonb) from publicados;
+$$;
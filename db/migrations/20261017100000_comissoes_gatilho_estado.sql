@@ -0,0 +1,30 @@
+-- Migração: estado materializado do gatilho por comissão.
+--
+-- As telas de comissões recalculavam o gatilho de todas as comissões a cada
+-- request, juntando em Python comissões, contratos, ITBI, valor pago e regras.
+-- O resultado passa a ficar gravado aqui (gatilho_estado.py):
+--   - a sincronização recalcula todas as comissões e regrava só as linhas que mudaram;
+--   - os endpoints de regras, regra da comissão e comissão manual recalculam só as afetadas.
+-- Comissão sem linha aqui é calculada na hora pela aplicação.
+-- Apagar a comissão apaga o estado (on delete cascade).
+
+create table if not exists public.comissoes_gatilho_estado (
+  comissao_id        bigint primary key
+                     references public.comissoes_sienge_comissoes (id) on delete cascade,
+  numero_contrato    text,
+  building_id        text,
+  valor_a_vista      double precision,
+  valor_itbi         double precision,
+  valor_pago         double precision,
+  valor_gatilho      double precision,
+  atingiu_gatilho    boolean,            -- null = dados insuficientes para calcular
+  dados_incompletos  boolean not null default false,
+  regra_gatilho      text,               -- regra aplicada ('10% + ITBI', 'Manual', ...)
+  data_contrato      text,
+  unit_name          text,
+  observacoes        text,
+  computed_at        timestamptz not null default now()
+);
+
+create index if not exists comissoes_gatilho_estado_contrato_idx
+  on public.comissoes_gatilho_estado (numero_contrato, building_id);
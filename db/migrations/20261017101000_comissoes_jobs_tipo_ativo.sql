@@ -0,0 +1,25 @@
+-- Migração: no máximo um job ativo (pendente/executando) por tipo em comissoes_jobs.
+--
+-- jobs.enfileirar_job deduplicava com select + insert: dois POSTs simultâneos podiam
+-- enfileirar a mesma sincronização duas vezes. Com o índice, o insert do segundo falha
+-- (23505) e ele devolve o job existente; executar_sincronizacao (scheduler, tarefa do
+-- Windows, scripts) assume o 'sincronizar' pendente em vez de inserir outro.
+
+-- Duplicatas de antes do índice: mantém o ativo mais antigo de cada tipo
+update public.comissoes_jobs j
+   set status = 'erro',
+       erro = 'Job duplicado (outro do mesmo tipo já estava ativo)',
+       atualizado_em = now(),
+       concluido_em = now()
+ where j.status in ('pendente', 'executando')
+   and exists (
+     select 1
+       from public.comissoes_jobs o
+      where o.tipo = j.tipo
+        and o.status in ('pendente', 'executando')
+        and (o.criado_em, o.id) < (j.criado_em, j.id)
+   );
+
+create unique index if not exists comissoes_jobs_tipo_ativo_idx
+  on public.comissoes_jobs (tipo)
+  where status in ('pendente', 'executando');
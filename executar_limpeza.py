@@ -7,6 +7,7 @@ Sistema de Comissões Young Empreendimentos
 import os
 from datetime import datetime
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -31,10 +32,10 @@ def executar_limpeza():
     
     # 1. DELETAR COMISSÕES CANCELADAS
     print("\n[1/3] Buscando comissões canceladas...")
-    result = supabase.table('comissoes_sienge_comissoes').select('*').execute()
+    comissoes = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', '*')
     
     comissoes_canceladas = []
-    for c in (result.data or []):
+    for c in comissoes:
         status = (c.get('installment_status') or '').upper()
         if 'CANCEL' in status:
             comissoes_canceladas.append(c)
@@ -53,11 +54,11 @@ def executar_limpeza():
     
     # 2. BUSCAR E LIMPAR DUPLICATAS
     print("\n[2/3] Buscando comissões duplicadas...")
-    result = supabase.table('comissoes_sienge_comissoes').select('*').execute()
+    comissoes = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', '*')
     
     # Agrupar por numero_contrato + unit_name + building_id
     grupos = {}
-    for c in (result.data or []):
+    for c in comissoes:
         chave = f"{c.get('numero_contrato')}_{c.get('unit_name')}_{c.get('building_id')}"
         if chave not in grupos:
             grupos[chave] = []
@@ -93,20 +94,20 @@ def executar_limpeza():
     print("\n[3/3] Verificando contratos órfãos...")
     
     # Buscar todos os contratos
-    result_contratos = supabase.table('comissoes_sienge_contratos').select('id, numero_contrato, building_id').execute()
+    contratos = fetch_all_keyset(supabase, 'comissoes_sienge_contratos', 'id, numero_contrato, building_id')
     
     # Buscar todas as comissões restantes
-    result_comissoes = supabase.table('comissoes_sienge_comissoes').select('numero_contrato, building_id').execute()
+    comissoes = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', 'numero_contrato, building_id')
     
     # Criar set de contratos com comissões
     contratos_com_comissoes = set()
-    for c in (result_comissoes.data or []):
+    for c in comissoes:
         chave = f"{c.get('numero_contrato')}_{c.get('building_id')}"
         contratos_com_comissoes.add(chave)
     
     # Identificar contratos órfãos
     contratos_orfaos = []
-    for c in (result_contratos.data or []):
+    for c in contratos:
         chave = f"{c.get('numero_contrato')}_{c.get('building_id')}"
         if chave not in contratos_com_comissoes:
             contratos_orfaos.append(c)
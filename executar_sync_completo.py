@@ -5,6 +5,7 @@ import sys
 sys.stdout.reconfigure(line_buffering=True)
 
 from sync_sienge_supabase import SiengeSupabaseSync
+from jobs import executar_sincronizacao
 
 print("=" * 60)
 print("SINCRONIZAÇÃO COMPLETA COM SIENGE")
@@ -16,7 +17,12 @@ sync = SiengeSupabaseSync()
 print("Iniciando sincronização completa...")
 print()
 
-resultado = sync.sync_all()
+# Se já houver uma sincronização rodando (scheduler/API), acompanha a dela
+resultado = executar_sincronizacao(
+    sync.supabase,
+    lambda progresso: sync.sync_all(progresso=progresso),
+    origem='executar_sync_completo'
+)
 
 print()
 print("=" * 60)
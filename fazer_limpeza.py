@@ -5,6 +5,7 @@ Script de limpeza que salva resultado em JSON
 import os
 import json
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,8 +24,8 @@ def main():
         sb = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
         
         # 1. Contar e deletar canceladas
-        result = sb.table('comissoes_sienge_comissoes').select('id, installment_status').execute()
-        canceladas = [c for c in (result.data or []) if 'CANCEL' in (c.get('installment_status') or '').upper()]
+        comissoes = fetch_all_keyset(sb, 'comissoes_sienge_comissoes', 'id, installment_status')
+        canceladas = [c for c in comissoes if 'CANCEL' in (c.get('installment_status') or '').upper()]
         resultado['canceladas_antes'] = len(canceladas)
         
         for c in canceladas:
@@ -35,9 +36,8 @@ def main():
                 pass
         
         # 2. Buscar duplicatas
-        result2 = sb.table('comissoes_sienge_comissoes').select('*').execute()
         grupos = {}
-        for c in (result2.data or []):
+        for c in fetch_all_keyset(sb, 'comissoes_sienge_comissoes', '*'):
             chave = f"{c.get('numero_contrato')}_{c.get('unit_name')}_{c.get('building_id')}"
             if chave not in grupos:
                 grupos[chave] = []
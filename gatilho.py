@@ -0,0 +1,255 @@
+"""
+Cálculo do Gatilho - Sistema de Comissões Young
+Regras de gatilho (valor à vista, regra, valor do gatilho, atingiu?) num único lugar,
+usado por todas as telas.
+
+calcular_gatilhos trabalha em colunas: recebe as comissões como listas por campo
+(para_colunas) mais os mapas de referência (contratos, ITBI, valor pago, regras) e
+devolve as colunas calculadas, que mesclar_colunas grava de volta nos dicts. Cada
+etapa é uma passada sobre a coluna inteira e a regra é resolvida uma vez por regra
+distinta (não por linha); comissões manuais (raras) são refeitas linha a linha no fim.
+"""
+
+import re
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, List, NamedTuple
+
+# Regra usada quando a comissão não tem regra estruturada nem texto
+REGRA_PADRAO = '10% + ITBI'
+
+# Tolerância de arredondamento do gatilho.
+# Aceita o gatilho como ATINGIDO quando o valor pago chega a (1 - TOLERANCIA) do valor
+# do gatilho. Com 1%, uma regra de 10% passa a valer ~9,9% — evita reprovar contratos
+# que ficam a centavos/arredondamento do alvo (ex.: cliente pagou 9,9% em vez de 10%).
+TOLERANCIA_GATILHO = 0.01
+
+# Campos da comissão lidos por calcular_gatilhos
+CAMPOS_ENTRADA = ('numero_contrato', 'building_id', 'origem', 'valor_comissao', 'commission_value',
+                  'installment_percentage', 'regra_gatilho_id', 'regra_gatilho', 'observacoes',
+                  'commission_date', 'due_date', 'unit_name')
+
+
+def chave_contrato(row: dict) -> tuple:
+    """(numero_contrato, building_id) em str — chave dos mapas de contratos, ITBI e valor pago"""
+    return (str(row.get('numero_contrato', '')), str(row.get('building_id', '')))
+
+
+def extrair_meta_manual(comissao: dict) -> dict:
+    """Extrai valor_gatilho e valor_pago dos metadados armazenados em observacoes/regra_gatilho de comissões manuais.
+    Formato esperado: [GATILHO:XXX][VALOR_PAGO:YYY] texto livre
+    """
+    meta = {'valor_gatilho': None, 'valor_pago': None, 'observacoes': ''}
+    texto = (comissao.get('observacoes') or '') or (comissao.get('regra_gatilho') or '')
+    if not texto:
+        return meta
+    m_gat = re.search(r'\[GATILHO:([0-9.]+)\]', texto)
+    m_pag = re.search(r'\[VALOR_PAGO:([0-9.]+)\]', texto)
+    if m_gat:
+        try:
+            meta['valor_gatilho'] = float(m_gat.group(1))
+        except ValueError:
+            pass
+    if m_pag:
+        try:
+            meta['valor_pago'] = float(m_pag.group(1))
+        except ValueError:
+            pass
+    obs_limpo = re.sub(r'\[GATILHO:[0-9.]+\]', '', texto)
+    obs_limpo = re.sub(r'\[VALOR_PAGO:[0-9.]+\]', '', obs_limpo).strip()
+    meta['observacoes'] = obs_limpo
+    return meta
+
+
+class RegraGatilho(NamedTuple):
+    """Regra de gatilho interpretada: gatilho = valor à vista * percentual (+ ITBI se inclui_itbi).
+    
+    tipo: 'estruturada' (tabela de regras), 'texto' (percentual lido do texto da regra) ou
+    'padrao' (sem texto ou sem percentual reconhecível -> 10% + ITBI).
+    """
+    texto: str
+    percentual: float
+    inclui_itbi: bool
+    tipo: str
+    
+    def valor_gatilho(self, valor_a_vista: float, valor_itbi: float) -> float:
+        if self.inclui_itbi:
+            return (valor_a_vista * self.percentual) + valor_itbi
+        return valor_a_vista * self.percentual
+
+
+# Textos de regra distintos mantidos já interpretados (poucos na prática: '10% + ITBI', '6%', ...)
+REGRAS_COMPILADAS_MAX = 1024
+
+_PERCENTUAL = re.compile(r'(\d+[,.]?\d*)\s*%')
+
+# Só para textos sem percentual numérico reconhecível pela regex
+_PERCENTUAIS_CONHECIDOS = (('10%', 0.10), ('6%', 0.06), ('5%', 0.05))
+
+
+@lru_cache(maxsize=REGRAS_COMPILADAS_MAX)
+def compilar_regra(regra: str) -> RegraGatilho:
+    """Regra em texto ('10% + ITBI', '7,5%', ...) -> RegraGatilho, interpretada uma vez por texto distinto.
+    
+    O percentual vem do primeiro número seguido de '%'; 'itbi' no texto soma o ITBI,
+    independente do percentual.
+    """
+    if not regra:
+        return RegraGatilho(REGRA_PADRAO, 0.10, True, 'padrao')
+    
+    regra_lower = regra.lower().strip()
+    inclui_itbi = 'itbi' in regra_lower
+    
+    match = _PERCENTUAL.search(regra)
+    if match:
+        return RegraGatilho(regra, float(match.group(1).replace(',', '.')) / 100, inclui_itbi, 'texto')
+    for trecho, percentual in _PERCENTUAIS_CONHECIDOS:
+        if trecho in regra_lower:
+            return RegraGatilho(regra, percentual, inclui_itbi, 'texto')
+    return RegraGatilho(regra, 0.10, True, 'padrao')
+
+
+# Função para calcular o valor do gatilho a partir da string de regra
+def calcular_valor_gatilho(valor_a_vista: float, valor_itbi: float, regra: str) -> float:
+    return compilar_regra(regra).valor_gatilho(valor_a_vista, valor_itbi)
+
+
+def gatilho_foi_atingido(valor_pago, valor_gatilho) -> bool:
+    """True se o valor pago atingiu o gatilho, com folga de arredondamento (TOLERANCIA_GATILHO)."""
+    try:
+        vg = float(valor_gatilho)
+        if vg <= 0:
+            return False
+        return float(valor_pago) >= vg * (1 - TOLERANCIA_GATILHO)
+    except (TypeError, ValueError):
+        return False
+
+
+def resolver_regra(regra_id, regra_texto, regras_map: Dict) -> RegraGatilho:
+    """Regra de gatilho da comissão.
+    
+    Prioridade: regra_gatilho_id (tabela de regras) -> campo texto regra_gatilho -> REGRA_PADRAO
+    """
+    if regra_id and regra_id in regras_map:
+        regra_data = regras_map[regra_id]
+        percentual = regra_data.get('percentual')
+        inclui_itbi = regra_data.get('inclui_itbi')
+        if percentual is not None:
+            texto = f"{percentual}% + ITBI" if inclui_itbi else f"{percentual}%"
+            return RegraGatilho(texto, float(percentual) / 100.0, bool(inclui_itbi), 'estruturada')
+    return compilar_regra(regra_texto)
+
+
+def _memo_str(valores: list) -> Dict:
+    """valor -> str(valor or '') para cada valor distinto da coluna"""
+    return {v: str(v or '') for v in set(valores)}
+
+
+def para_colunas(comissoes: List[Dict], campos=CAMPOS_ENTRADA) -> Dict[str, list]:
+    return {campo: [c.get(campo) for c in comissoes] for campo in campos}
+
+
+def mesclar_colunas(comissoes: List[Dict], colunas: Dict[str, list]):
+    """Grava as colunas calculadas de volta nos dicts das comissões (in-place)"""
+    for campo, valores in colunas.items():
+        for c, valor in zip(comissoes, valores):
+            c[campo] = valor
+
+
+def calcular_gatilhos(colunas: Dict[str, list], contratos_map: Dict, itbi_map: Dict, pago_map: Dict,
+                      regras_map: Dict) -> Dict[str, list]:
+    """Calcula o gatilho de todas as comissões de uma vez.
+    
+    colunas: CAMPOS_ENTRADA como listas. Mapas por (numero_contrato, building_id) em str;
+    regras_map por id. Devolve as colunas valor_a_vista, valor_itbi, valor_pago,
+    regra_gatilho, valor_gatilho, atingiu_gatilho (None = dados insuficientes),
+    dados_incompletos, data_contrato, unit_name e observacoes.
+    
+    Comissões manuais (origem 'manual' ou contrato MANUAL-*) usam os valores gravados no
+    registro: regra 'Manual', gatilho dos metadados (ou 10% do valor à vista) e valor pago
+    de (contrato, 'MANUAL') ou dos metadados.
+    """
+    # Chaves em str; building_id se repete muito, converte cada valor distinto uma vez
+    numeros = [str(v or '') for v in colunas['numero_contrato']]
+    chaves = list(zip(numeros, map(_memo_str(colunas['building_id']).__getitem__, colunas['building_id'])))
+    contratos = list(map(contratos_map.get, chaves))
+    
+    # Valor à vista = baseValue da comissão (valor_comissao). NÃO usar contrato.valor_a_vista:
+    # na view ele é o valor TOTAL do contrato. Sem baseValue (comissões do Sienge), deriva
+    # de commission_value / percentual da comissão
+    valor_a_vista = [float(v or 0) for v in colunas['valor_comissao']]
+    for i in [i for i, a in enumerate(valor_a_vista) if not a]:
+        pct = float(colunas['installment_percentage'][i] or 0)
+        if pct > 0:
+            valor_a_vista[i] = float(colunas['commission_value'][i] or 0) / (pct / 100)
+    
+    valor_itbi = list(map(itbi_map.get, chaves, repeat(0)))
+    valor_pago = list(map(pago_map.get, chaves, repeat(0)))
+    
+    # Regra: resolvida uma vez por (regra_gatilho_id, texto) distinto
+    chaves_regra = list(zip(colunas['regra_gatilho_id'], colunas['regra_gatilho']))
+    regras = {chave: resolver_regra(chave[0], chave[1], regras_map) for chave in set(chaves_regra)}
+    resolvidas = list(map(regras.__getitem__, chaves_regra))
+    
+    regra_gatilho = [r.texto for r in resolvidas]
+    valor_gatilho = [
+        (a * r.percentual) + itbi if r.inclui_itbi else a * r.percentual
+        for r, a, itbi in zip(resolvidas, valor_a_vista, valor_itbi)
+    ]
+    
+    # Sem valor à vista e sem contrato não há como calcular
+    dados_incompletos = [not a and not ct for a, ct in zip(valor_a_vista, contratos)]
+    fator = 1 - TOLERANCIA_GATILHO
+    atingiu_gatilho = [
+        None if inc else vg > 0 and pago >= vg * fator
+        for inc, vg, pago in zip(dados_incompletos, valor_gatilho, valor_pago)
+    ]
+    
+    # Data do contrato: do contrato ou fallback para a data da comissão
+    data_contrato = [
+        ct.get('data_contrato') if ct else dc or dd
+        for ct, dc, dd in zip(contratos, colunas['commission_date'], colunas['due_date'])
+    ]
+    unit_name = [
+        un if un or not ct else ct.get('unidade') or ct.get('unit_name')
+        for un, ct in zip(colunas['unit_name'], contratos)
+    ]
+    observacoes = list(colunas['observacoes'])
+    
+    # Manuais (poucas): refaz a linha com os valores gravados no próprio registro
+    for i in [i for i, (origem, numero) in enumerate(zip(colunas['origem'], numeros))
+              if origem == 'manual' or numero.startswith('MANUAL-')]:
+        meta = extrair_meta_manual({'observacoes': colunas['observacoes'][i], 'regra_gatilho': colunas['regra_gatilho'][i]})
+        valor_a_vista[i] = float(colunas['valor_comissao'][i] or 0)
+        valor_itbi[i] = 0
+        valor_pago[i] = pago_map.get((numeros[i], 'MANUAL'), 0)
+        if valor_pago[i] == 0 and meta['valor_pago'] is not None:
+            valor_pago[i] = meta['valor_pago']
+        regra_gatilho[i] = 'Manual'
+        valor_gatilho[i] = meta['valor_gatilho'] if meta['valor_gatilho'] is not None else valor_a_vista[i] * 0.10
+        dados_incompletos[i] = False
+        atingiu_gatilho[i] = valor_gatilho[i] > 0 and valor_pago[i] >= valor_gatilho[i] * fator
+        data_contrato[i] = colunas['commission_date'][i]
+        unit_name[i] = colunas['unit_name'][i]
+        observacoes[i] = meta['observacoes']
+    
+    return {
+        'valor_a_vista': valor_a_vista,
+        'valor_itbi': valor_itbi,
+        'valor_pago': valor_pago,
+        'regra_gatilho': regra_gatilho,
+        'valor_gatilho': valor_gatilho,
+        'atingiu_gatilho': atingiu_gatilho,
+        'dados_incompletos': dados_incompletos,
+        'data_contrato': data_contrato,
+        'unit_name': unit_name,
+        'observacoes': observacoes
+    }
+
+
+def enriquecer_gatilhos(comissoes: List[Dict], contratos_map: Dict, itbi_map: Dict, pago_map: Dict,
+                        regras_map: Dict):
+    """para_colunas -> calcular_gatilhos -> mesclar_colunas sobre a lista de comissões (in-place)"""
+    if comissoes:
+        mesclar_colunas(comissoes, calcular_gatilhos(para_colunas(comissoes), contratos_map, itbi_map,
+                                                     pago_map, regras_map))
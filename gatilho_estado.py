@@ -0,0 +1,227 @@
+"""
+Estado do Gatilho - Sistema de Comissões Young
+Projeção materializada do gatilho de cada comissão (tabela comissoes_gatilho_estado):
+valor à vista, ITBI, valor pago, valor do gatilho, atingiu?, regra aplicada e computed_at.
+
+As telas leem o estado pronto (aplicar_estado) em vez de juntar comissões, contratos,
+ITBI, valor pago e regras em Python a cada request. Quem muda essas entradas chama
+recalcular_estado, que recalcula com gatilho.calcular_gatilhos e só regrava as linhas
+cujo resultado mudou:
+  - a sincronização, para todas as comissões (o valor pago muda sem a comissão mudar);
+  - os endpoints de regras, regra da comissão e comissão manual, só para as afetadas.
+Comissão ainda sem estado (tabela vazia, comissão nova antes da próxima sincronização)
+é calculada na hora por quem lê. Estado mais antigo que GATILHO_ESTADO_VALIDADE_SEGUNDOS
+também é calculado na hora e a leitura pede o recálculo completo em background (job
+'gatilho_estado' da fila de jobs.py), o que limita quanto uma entrada alterada fora desses
+caminhos (direto no banco, no Sienge) fica sem refletir sem pesar no request.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from supabase_client import fetch_all_keyset, fetch_all_paginated, CHAVE_CONTRATO, FETCH_PARALELO
+from gatilho import CAMPOS_ENTRADA, calcular_gatilhos, chave_contrato, para_colunas
+
+load_dotenv()
+
+TABELA_ESTADO = 'comissoes_gatilho_estado'
+
+# Colunas de gatilho.calcular_gatilhos gravadas no estado (e copiadas para a comissão na leitura)
+CAMPOS_ESTADO = ('valor_a_vista', 'valor_itbi', 'valor_pago', 'regra_gatilho', 'valor_gatilho',
+                 'atingiu_gatilho', 'dados_incompletos', 'data_contrato', 'unit_name', 'observacoes')
+
+# Linhas por upsert e valores por consulta in_ (ids de comissão / números de contrato)
+GATILHO_ESTADO_LOTE = int(os.getenv('GATILHO_ESTADO_LOTE', 500))
+
+# Acima de tantas comissões, a leitura traz a tabela de estado inteira em vez de consultar por id
+GATILHO_ESTADO_LEITURA_COMPLETA = int(os.getenv('GATILHO_ESTADO_LEITURA_COMPLETA', 2000))
+
+# Validade (segundos) de cada linha do estado: mais antiga que isso é recalculada na leitura
+GATILHO_ESTADO_VALIDADE_SEGUNDOS = int(os.getenv('GATILHO_ESTADO_VALIDADE_SEGUNDOS', 3600))
+
+# Intervalo mínimo (segundos) entre pedidos de recálculo em background feitos por um mesmo processo
+GATILHO_ESTADO_PEDIDO_INTERVALO = int(os.getenv('GATILHO_ESTADO_PEDIDO_INTERVALO', 60))
+
+COLUNAS_COMISSAO = ','.join(('id',) + CAMPOS_ENTRADA)
+
+_proximo_pedido = 0.0
+_pedido_lock = threading.Lock()
+
+
+def _lotes(valores: list, tamanho: int = GATILHO_ESTADO_LOTE):
+    for i in range(0, len(valores), tamanho):
+        yield valores[i:i + tamanho]
+
+
+def buscar_por_contratos(supabase, tabela: str, colunas: str, numeros, buildings=None, lote: int = 200) -> Dict:
+    """(numero_contrato, building_id) em str -> linha da tabela, com uma consulta in_ por lote de contratos.
+    
+    buildings restringe também o building_id; numero x building traz pares a mais, que
+    quem consulta descarta pela chave exata.
+    """
+    linhas = {}
+    numeros = sorted(numeros)
+    for i in range(0, len(numeros), lote):
+        try:
+            query = supabase.table(tabela).select(colunas).in_('numero_contrato', numeros[i:i + lote])
+            if buildings:
+                query = query.in_('building_id', sorted(buildings))
+            result = query.execute()
+        except Exception as e:
+            print(f"[GatilhoEstado] Erro ao buscar {tabela}: {str(e)}")
+            continue
+        for row in result.data or []:
+            linhas.setdefault(chave_contrato(row), row)
+    return linhas
+
+
+def carregar_referencias(supabase, numeros=None) -> tuple:
+    """(contratos, ITBI, valor pago, regras) no formato de gatilho.calcular_gatilhos.
+    
+    numeros=None lê as views inteiras; senão só os contratos informados.
+    """
+    if numeros is None:
+        def ler(tabela, colunas):
+            return {chave_contrato(row): row
+                    for row in fetch_all_paginated(supabase, tabela, colunas, order_by=CHAVE_CONTRATO)}
+    else:
+        def ler(tabela, colunas):
+            return buscar_por_contratos(supabase, tabela, colunas, numeros)
+    
+    contratos = ler('comissoes_sienge_contratos', '*')
+    itbi = {chave: float(row.get('valor_itbi') or 0)
+            for chave, row in ler('comissoes_sienge_itbi', 'numero_contrato,building_id,valor_itbi').items()}
+    pago = {chave: float(row.get('valor_pago') or 0)
+            for chave, row in ler('comissoes_sienge_valor_pago', 'numero_contrato,building_id,valor_pago').items()}
+    regras = {rg['id']: rg for rg in fetch_all_paginated(supabase, 'comissoes_regras_gatilho', '*')}
+    return contratos, itbi, pago, regras
+
+
+def _vencido(linha: Dict, limite: datetime) -> bool:
+    """True se a linha foi calculada antes do limite (ou não tem computed_at legível)"""
+    valor = str(linha.get('computed_at') or '').replace('Z', '+00:00')
+    try:
+        computed_at = datetime.fromisoformat(valor)
+    except ValueError:
+        try:
+            computed_at = datetime.fromisoformat(valor[:19])
+        except ValueError:
+            return True
+    if computed_at.tzinfo is None:
+        computed_at = computed_at.replace(tzinfo=timezone.utc)
+    return computed_at < limite
+
+
+def ler_estado(supabase, comissao_ids: List = None) -> Dict:
+    """comissao_id -> linha do estado (das comissões informadas, ou de todas)"""
+    if comissao_ids is None or len(comissao_ids) > GATILHO_ESTADO_LEITURA_COMPLETA:
+        linhas = fetch_all_keyset(supabase, TABELA_ESTADO, '*', chave='comissao_id', paralelo=FETCH_PARALELO)
+    else:
+        linhas = []
+        for lote in _lotes(sorted(set(comissao_ids))):
+            linhas.extend(supabase.table(TABELA_ESTADO).select('*').in_('comissao_id', lote).execute().data or [])
+    return {row['comissao_id']: row for row in linhas}
+
+
+def aplicar_estado(supabase, comissoes: List[Dict]) -> List[Dict]:
+    """Copia o estado gravado para as comissões (in-place); retorna as que não têm estado.
+    
+    Linhas com computed_at mais antigo que GATILHO_ESTADO_VALIDADE_SEGUNDOS também voltam
+    como pendentes, e o recálculo completo é pedido em background (pedir_recalculo).
+    Se a tabela não puder ser lida, todas voltam como pendentes (quem chama calcula).
+    """
+    try:
+        estado = ler_estado(supabase, [c['id'] for c in comissoes if c.get('id') is not None])
+    except Exception as e:
+        print(f"[GatilhoEstado] Erro ao ler estado: {str(e)}")
+        return comissoes
+    
+    limite = datetime.now(timezone.utc) - timedelta(seconds=GATILHO_ESTADO_VALIDADE_SEGUNDOS)
+    if any(_vencido(linha, limite) for linha in estado.values()):
+        pedir_recalculo(supabase)
+    
+    sem_estado = []
+    for c in comissoes:
+        linha = estado.get(c.get('id'))
+        if linha is None or _vencido(linha, limite):
+            sem_estado.append(c)
+        else:
+            c.update({campo: linha.get(campo) for campo in CAMPOS_ESTADO})
+    return sem_estado
+
+
+def pedir_recalculo(supabase) -> Optional[Dict]:
+    """Enfileira o recálculo completo do estado (job 'gatilho_estado', executado pelo scheduler).
+    
+    No máximo um pedido a cada GATILHO_ESTADO_PEDIDO_INTERVALO segundos por processo; se o
+    job já estiver na fila ou rodando, enfileirar_job devolve o existente.
+    """
+    global _proximo_pedido
+    with _pedido_lock:
+        agora = time.monotonic()
+        if agora < _proximo_pedido:
+            return None
+        _proximo_pedido = agora + GATILHO_ESTADO_PEDIDO_INTERVALO
+    
+    from jobs import enfileirar_job
+    try:
+        return enfileirar_job(supabase, 'gatilho_estado', solicitado_por='gatilho_estado')
+    except Exception as e:
+        print(f"[GatilhoEstado] Erro ao pedir recálculo: {str(e)}")
+        return None
+
+
+def _comissoes_afetadas(supabase, numeros_contrato, comissao_ids, regra_ids) -> List[Dict]:
+    comissoes = {}
+    for coluna, valores in (('numero_contrato', numeros_contrato), ('id', comissao_ids),
+                            ('regra_gatilho_id', regra_ids)):
+        for lote in _lotes(sorted({str(v) for v in valores or [] if v not in (None, '')})):
+            for c in fetch_all_paginated(supabase, 'comissoes_sienge_comissoes', COLUNAS_COMISSAO,
+                                         filtros=lambda query, coluna=coluna, lote=lote: query.in_(coluna, lote)):
+                comissoes[c['id']] = c
+    return list(comissoes.values())
+
+
+def recalcular_estado(supabase, numeros_contrato=None, comissao_ids=None, regra_ids=None) -> Dict:
+    """Recalcula o gatilho e grava no estado só as linhas novas ou alteradas.
+    
+    Sem argumentos: todas as comissões (sincronização). Com numeros_contrato, comissao_ids
+    e/ou regra_ids: só as comissões desses contratos, ids ou regras.
+    Retorna {'sucesso', 'comissoes': recalculadas, 'gravadas': linhas regravadas}.
+    """
+    todas = numeros_contrato is None and comissao_ids is None and regra_ids is None
+    if todas:
+        comissoes = fetch_all_paginated(supabase, 'comissoes_sienge_comissoes', COLUNAS_COMISSAO)
+    else:
+        comissoes = _comissoes_afetadas(supabase, numeros_contrato, comissao_ids, regra_ids)
+    if not comissoes:
+        return {'sucesso': True, 'comissoes': 0, 'gravadas': 0}
+    
+    numeros = None if todas else {str(c['numero_contrato']) for c in comissoes if c.get('numero_contrato')}
+    colunas = calcular_gatilhos(para_colunas(comissoes), *carregar_referencias(supabase, numeros))
+    atual = ler_estado(supabase, None if todas else [c['id'] for c in comissoes])
+    
+    computed_at = datetime.now(timezone.utc).isoformat()
+    alteradas = []
+    iguais = []
+    for i, c in enumerate(comissoes):
+        valores = {campo: colunas[campo][i] for campo in CAMPOS_ESTADO}
+        gravado = atual.get(c['id'])
+        if gravado is not None and all(gravado.get(campo) == valor for campo, valor in valores.items()):
+            iguais.append(c['id'])
+            continue
+        numero, building = chave_contrato(c)
+        alteradas.append(dict(valores, comissao_id=c['id'], numero_contrato=numero, building_id=building,
+                              computed_at=computed_at))
+    
+    for lote in _lotes(alteradas):
+        supabase.table(TABELA_ESTADO).upsert(lote, on_conflict='comissao_id').execute()
+    # Inalteradas: só renova computed_at (conferidas agora), sem regravar a linha
+    for lote in _lotes(iguais):
+        supabase.table(TABELA_ESTADO).update({'computed_at': computed_at}).in_('comissao_id', lote).execute()
+    
+    print(f"[GatilhoEstado] {len(comissoes)} comissões recalculadas, {len(alteradas)} regravadas")
+    return {'sucesso': True, 'comissoes': len(comissoes), 'gravadas': len(alteradas)}
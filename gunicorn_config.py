@@ -14,10 +14,11 @@ bind = f"0.0.0.0:{os.getenv('FLASK_PORT', 5000)}"
 # IMPORTANTE: Usar apenas 1 worker se tiver scheduler interno
 # ou mover scheduler para processo separado
 workers = 1
-threads = 4
+# Threads do worker: requests comuns + até JOBS_SSE_CONEXOES streams SSE de progresso
+threads = int(os.getenv('GUNICORN_THREADS', 8))
 
 # Worker class
-worker_class = 'sync'  # ou 'gthread' para threads
+worker_class = 'gthread'
 
 # Timeout
 timeout = 120  # segundos (aumentado para operações de sincronização)
@@ -0,0 +1,389 @@
+"""
+Jobs em Background - Sistema de Comissões Young
+Operações longas (ex.: sincronização com o Sienge) saem do request do gunicorn:
+a API enfileira o job em comissoes_jobs e devolve o id; o processo do scheduler
+(scheduler.py, ou python jobs.py) executa e grava o progresso na mesma linha.
+
+Toda sincronização (API, scheduler, tarefa do Windows, scripts) passa por
+executar_sincronizacao: roda sob o lease de sync_lock.py e vira um job
+'sincronizar', então quem chega com uma já em andamento acompanha o progresso dela.
+
+Execute o worker avulso: python jobs.py
+"""
+
+import os
+import sys
+import time
+import traceback
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+from supabase_client import get_supabase
+from dotenv import load_dotenv
+import operacoes_admin
+from sync_lock import LeaseSync, SYNC_LOCK_TTL, lease_atual
+
+load_dotenv()
+
+# Intervalo (segundos) entre verificações da fila pelo worker
+JOBS_INTERVALO_SEGUNDOS = int(os.getenv('JOBS_INTERVALO_SEGUNDOS', 5))
+
+# Intervalo mínimo (segundos) entre gravações de progresso de um job
+JOBS_INTERVALO_PROGRESSO = float(os.getenv('JOBS_INTERVALO_PROGRESSO', 2))
+
+# Job 'executando' sem atualização há mais que isso é dado como interrompido
+JOBS_EXPIRACAO_MINUTOS = int(os.getenv('JOBS_EXPIRACAO_MINUTOS', 30))
+
+STATUS_ATIVOS = ('pendente', 'executando')
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_data(valor) -> Optional[datetime]:
+    if not valor:
+        return None
+    try:
+        data = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return data if data.tzinfo else data.replace(tzinfo=timezone.utc)
+
+
+class ProgressoJob:
+    """Reporta fase/processados/total de um job em comissoes_jobs.
+    
+    Chamável como progresso(fase, processados, total): troca de fase grava na hora;
+    dentro da mesma fase grava no máximo a cada JOBS_INTERVALO_PROGRESSO segundos.
+    """
+    
+    def __init__(self, supabase, job_id: int, intervalo: float = JOBS_INTERVALO_PROGRESSO):
+        self.supabase = supabase
+        self.job_id = job_id
+        self.intervalo = intervalo
+        self.fase = None
+        self.processados = 0
+        self.total = None
+        self._ultima_gravacao = 0.0
+    
+    def __call__(self, fase: str, processados: int = 0, total: int = None):
+        data = {'processados': processados, 'total': total, 'atualizado_em': _agora()}
+        if fase != self.fase:
+            data.update(fase=fase, fase_iniciada_em=data['atualizado_em'])
+        elif time.monotonic() - self._ultima_gravacao < self.intervalo and processados != total:
+            self.processados, self.total = processados, total
+            return
+        self.fase, self.processados, self.total = fase, processados, total
+        self._ultima_gravacao = time.monotonic()
+        try:
+            self.supabase.table('comissoes_jobs').update(data).eq('id', self.job_id).execute()
+        except Exception as e:
+            print(f"[Jobs] Erro ao gravar progresso do job {self.job_id}: {str(e)}")
+
+
+def _job_ativo(supabase, tipo: str) -> Optional[Dict]:
+    ativo = supabase.table('comissoes_jobs')\
+        .select('*')\
+        .eq('tipo', tipo)\
+        .in_('status', list(STATUS_ATIVOS))\
+        .order('criado_em')\
+        .limit(1)\
+        .execute()
+    return ativo.data[0] if ativo.data else None
+
+
+def enfileirar_job(supabase, tipo: str, parametros: Dict = None, solicitado_por: str = None) -> Dict:
+    """Enfileira um job; se já houver um do mesmo tipo pendente/executando, devolve esse.
+    
+    O índice único parcial comissoes_jobs_tipo_ativo_idx garante um job ativo por tipo:
+    se dois requests inserirem ao mesmo tempo, o segundo cai no conflito e devolve o do primeiro.
+    """
+    if tipo not in TIPOS_JOB:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+    recuperar_jobs_interrompidos(supabase)
+    ativo = _job_ativo(supabase, tipo)
+    if ativo:
+        return dict(ativo, existente=True)
+    
+    try:
+        result = supabase.table('comissoes_jobs').insert({
+            'tipo': tipo,
+            'parametros': parametros or {},
+            'solicitado_por': solicitado_por,
+            'status': 'pendente'
+        }).execute()
+    except Exception:
+        # Violação do índice único (23505): outro request enfileirou o mesmo tipo entre o select e o insert
+        ativo = _job_ativo(supabase, tipo)
+        if ativo:
+            return dict(ativo, existente=True)
+        raise
+    return dict(result.data[0], existente=False)
+
+
+def descrever_job(job: Dict) -> Dict:
+    """Acrescenta ao job a taxa (itens/s) da fase atual e o ETA (segundos)."""
+    job = dict(job)
+    job['taxa'] = None
+    job['eta_segundos'] = None
+    inicio = _parse_data(job.get('fase_iniciada_em'))
+    processados = job.get('processados') or 0
+    if job.get('status') == 'executando' and inicio and processados:
+        decorrido = (datetime.now(timezone.utc) - inicio).total_seconds()
+        if decorrido > 0:
+            job['taxa'] = round(processados / decorrido, 2)
+            if job.get('total'):
+                job['eta_segundos'] = max(0, round((job['total'] - processados) / job['taxa']))
+    return job
+
+
+def obter_job(supabase, job_id) -> Optional[Dict]:
+    """Estado de um job (com taxa e ETA) ou None se não existir."""
+    result = supabase.table('comissoes_jobs').select('*').eq('id', job_id).limit(1).execute()
+    return descrever_job(result.data[0]) if result.data else None
+
+
+def _resultado_com_erros(resultado: Optional[Dict]) -> Dict:
+    """status/erro de um job a partir do resultado do handler."""
+    # sync_all devolve um resultado por etapa; as operações de admin, um só
+    etapas = [v for v in (resultado or {}).values() if isinstance(v, dict)] + [resultado or {}]
+    erros = [etapa.get('erro', 'erro desconhecido') for etapa in etapas if not etapa.get('sucesso', True)]
+    return {'status': 'erro' if erros else 'concluido', 'resultado': resultado, 'erro': '\n'.join(erros) or None}
+
+
+def _finalizar_job(supabase, job_id: int, resultado: Dict = None, erro: str = None) -> Dict:
+    final = {'status': 'erro', 'erro': erro} if erro else _resultado_com_erros(resultado)
+    final['atualizado_em'] = final['concluido_em'] = _agora()
+    supabase.table('comissoes_jobs').update(final).eq('id', job_id).execute()
+    print(f"[Jobs] Job {job_id} finalizado: {final['status']}")
+    return final
+
+
+def recuperar_jobs_interrompidos(supabase) -> int:
+    """Marca como 'erro' os jobs 'executando' cujo processo morreu.
+    
+    Sincronização: sem o lease e sem atualização há mais de SYNC_LOCK_TTL segundos.
+    Demais tipos: sem atualização há mais de JOBS_EXPIRACAO_MINUTOS.
+    """
+    executando = supabase.table('comissoes_jobs')\
+        .select('id, tipo, atualizado_em')\
+        .eq('status', 'executando')\
+        .execute()
+    if not executando.data:
+        return 0
+    
+    agora = datetime.now(timezone.utc)
+    dono = lease_atual(supabase) if any(j['tipo'] == 'sincronizar' for j in executando.data) else None
+    recuperados = 0
+    for job in executando.data:
+        atualizado = _parse_data(job.get('atualizado_em'))
+        parado = (agora - atualizado).total_seconds() if atualizado else float('inf')
+        if job['tipo'] == 'sincronizar':
+            interrompido = parado > SYNC_LOCK_TTL and (dono or {}).get('job_id') != job['id']
+        else:
+            interrompido = parado > JOBS_EXPIRACAO_MINUTOS * 60
+        if not interrompido:
+            continue
+        # Condicional no status: não sobrescreve um job que terminou neste meio-tempo
+        supabase.table('comissoes_jobs').update({
+            'status': 'erro',
+            'erro': 'Job interrompido (o processo que o executava parou)',
+            'atualizado_em': _agora(),
+            'concluido_em': _agora()
+        }).eq('id', job['id']).eq('status', 'executando').execute()
+        print(f"[Jobs] Job {job['id']} ({job['tipo']}) marcado como interrompido")
+        recuperados += 1
+    return recuperados
+
+
+def acompanhar_sincronizacao(supabase, dono: Dict, progresso: Callable = None) -> Optional[Dict]:
+    """Espera a sincronização de outro processo terminar, repassando o progresso dela.
+    
+    Retorna o job final do dono (ou None se ele não tinha job / morreu sem finalizar).
+    """
+    job_id = dono.get('job_id')
+    sem_lease = 0
+    ultimo = None
+    while True:
+        job = obter_job(supabase, job_id) if job_id else None
+        if job and job.get('status') not in STATUS_ATIVOS:
+            return job
+        if job:
+            andamento = (job.get('fase') or 'aguardando', job.get('processados') or 0, job.get('total'))
+            if progresso:
+                # Repassa a cada volta: também mantém atualizado_em do job que acompanha
+                progresso(*andamento)
+            elif andamento != ultimo:
+                print(f"[Sync] Em andamento (job {job_id}): {andamento[0]} {andamento[1]}/{andamento[2] or '?'}")
+            ultimo = andamento
+        
+        atual = lease_atual(supabase)
+        if not atual or (job_id and atual.get('job_id') not in (None, job_id)):
+            # O dono finaliza o job logo depois de soltar o lease: confere mais uma vez
+            sem_lease += 1
+            if sem_lease > 1:
+                return obter_job(supabase, job_id) if job_id else None
+        else:
+            sem_lease = 0
+            job_id = job_id or atual.get('job_id')
+        time.sleep(JOBS_INTERVALO_SEGUNDOS)
+
+
+def executar_sincronizacao(supabase, executar: Callable[[Callable], Dict], origem: str,
+                           job_id: int = None, progresso: Callable = None) -> Dict:
+    """Roda executar(progresso) sob o lease da sincronização.
+    
+    Sem job_id (scheduler, tarefa do Windows, scripts) registra um job 'sincronizar' já
+    'executando' (ou assume o que a API deixou pendente), para que a API e os demais
+    processos possam acompanhá-lo. Se outra
+    sincronização estiver rodando, não inicia uma segunda: acompanha a existente e
+    devolve o resultado dela (com 'acompanhou_job'). Se o lease for perdido no meio
+    (heartbeat falhou por um TTL inteiro), a execução é abortada com LeasePerdido.
+    """
+    lease = LeaseSync(supabase, origem=origem)
+    if not lease.adquirir(job_id):
+        dono = lease.atual or {}
+        print(f"[Sync] Sincronização já em andamento por {dono.get('dono')} (job {dono.get('job_id') or '-'}); "
+              f"acompanhando em vez de iniciar outra")
+        final = acompanhar_sincronizacao(supabase, dono, progresso) or {}
+        resultado = dict(final.get('resultado') or {}, acompanhou_job=final.get('id'))
+        if final.get('status') != 'concluido':
+            resultado.update(sucesso=False, erro=final.get('erro') or 'Sincronização acompanhada não concluiu')
+        return resultado
+    
+    criado = None
+    try:
+        if job_id is None:
+            agora = _agora()
+            try:
+                criado = supabase.table('comissoes_jobs').insert({
+                    'tipo': 'sincronizar',
+                    'status': 'executando',
+                    'parametros': {},
+                    'solicitado_por': origem,
+                    'iniciado_em': agora,
+                    'atualizado_em': agora
+                }).execute().data[0]['id']
+            except Exception:
+                # Índice único comissoes_jobs_tipo_ativo_idx: já há um 'sincronizar' ativo
+                # (ex.: enfileirado pela API e ainda pendente). Esta execução o assume.
+                ativo = _job_ativo(supabase, 'sincronizar')
+                if not ativo:
+                    raise
+                criado = ativo['id']
+                supabase.table('comissoes_jobs')\
+                    .update({'status': 'executando', 'iniciado_em': agora, 'atualizado_em': agora})\
+                    .eq('id', criado)\
+                    .eq('status', 'pendente')\
+                    .execute()
+                print(f"[Sync] Assumindo o job {criado} de sincronização já enfileirado")
+            lease.renovar(criado)
+            progresso = progresso or ProgressoJob(supabase, criado)
+        
+        def progresso_com_lease(fase: str, processados: int = 0, total: int = None):
+            # Chamado a cada página/lote: lease perdido (LeasePerdido) aborta antes da próxima escrita
+            lease.verificar()
+            if progresso:
+                progresso(fase, processados, total)
+        
+        resultado = executar(progresso_com_lease)
+        lease.verificar()
+    except Exception as e:
+        if criado:
+            _finalizar_job(supabase, criado, erro=str(e))
+        raise
+    else:
+        if criado:
+            _finalizar_job(supabase, criado, resultado)
+        return resultado
+    finally:
+        lease.liberar()
+
+
+def _job_sincronizar(supabase, parametros: Dict, progresso: Callable) -> Dict:
+    from sync_sienge_supabase import SiengeSupabaseSync
+    
+    sync = SiengeSupabaseSync()
+    return executar_sincronizacao(
+        supabase,
+        lambda p: sync.sync_all(
+            building_id=parametros.get('building_id'),
+            incremental=bool(parametros.get('incremental')),
+            progresso=p
+        ),
+        origem='api',
+        job_id=progresso.job_id,
+        progresso=progresso
+    )
+
+
+def _job_gatilho_estado(supabase, parametros: Dict, progresso: Callable) -> Dict:
+    from gatilho_estado import recalcular_estado
+    
+    progresso('gatilho_estado')
+    return recalcular_estado(supabase)
+
+
+# tipo -> handler(supabase, parametros, progresso) que devolve o resultado (dict serializável)
+TIPOS_JOB = {
+    'sincronizar': _job_sincronizar,
+    'limpar_cancelados': lambda supabase, parametros, progresso: operacoes_admin.limpar_cancelados(supabase, progresso),
+    'reverter_status': lambda supabase, parametros, progresso: operacoes_admin.reverter_status(supabase, progresso),
+    'itbi_faltantes': lambda supabase, parametros, progresso: operacoes_admin.verificar_itbi_faltantes(supabase, progresso),
+    'gatilho_estado': _job_gatilho_estado,
+}
+
+
+def executar_proximo_job(supabase) -> Optional[Dict]:
+    """Reivindica o job pendente mais antigo e executa. Retorna o job executado (ou None)."""
+    pendentes = supabase.table('comissoes_jobs')\
+        .select('*')\
+        .eq('status', 'pendente')\
+        .order('criado_em')\
+        .limit(1)\
+        .execute()
+    if not pendentes.data:
+        return None
+    job = pendentes.data[0]
+    
+    # UPDATE condicional: se outro worker pegou antes, não retorna linha
+    agora = _agora()
+    reivindicado = supabase.table('comissoes_jobs')\
+        .update({'status': 'executando', 'iniciado_em': agora, 'atualizado_em': agora})\
+        .eq('id', job['id'])\
+        .eq('status', 'pendente')\
+        .execute()
+    if not reivindicado.data:
+        return None
+    
+    print(f"[Jobs] Executando job {job['id']} ({job['tipo']})")
+    try:
+        handler = TIPOS_JOB[job['tipo']]
+        resultado = handler(supabase, job.get('parametros') or {}, ProgressoJob(supabase, job['id']))
+        final = _finalizar_job(supabase, job['id'], resultado)
+    except Exception as e:
+        traceback.print_exc()
+        final = _finalizar_job(supabase, job['id'], erro=str(e))
+    return dict(job, **final)
+
+
+def processar_fila(supabase=None):
+    """Executa todos os jobs pendentes (chamado periodicamente pelo scheduler)."""
+    supabase = supabase or get_supabase()
+    recuperar_jobs_interrompidos(supabase)
+    while executar_proximo_job(supabase):
+        pass
+
+
+if __name__ == '__main__':
+    print(f"[Jobs] Worker iniciado (verificando a fila a cada {JOBS_INTERVALO_SEGUNDOS}s). Ctrl+C para parar.")
+    cliente = get_supabase()
+    try:
+        while True:
+            try:
+                processar_fila(cliente)
+            except Exception as e:
+                print(f"[Jobs] Erro ao processar fila: {str(e)}")
+            time.sleep(JOBS_INTERVALO_SEGUNDOS)
+    except KeyboardInterrupt:
+        sys.exit(0)
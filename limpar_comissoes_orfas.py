@@ -11,6 +11,7 @@ import os
 import sys
 from dotenv import load_dotenv
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 from sienge_client import sienge_client
 
 if sys.platform == 'win32':
@@ -38,9 +39,9 @@ for c in commissions:
 print(f"      {len(ids_sienge)} ids unicos no Sienge")
 
 print("\n[2/3] Buscando comissoes no Supabase...")
-rows = sb.table('comissoes_sienge_comissoes').select(
+rows = fetch_all_keyset(sb, 'comissoes_sienge_comissoes',
     'id,sienge_id,numero_contrato,building_id,broker_nome,unit_name,installment_status,commission_value'
-).execute().data or []
+)
 print(f"      {len(rows)} linhas no Supabase")
 
 def is_manual(row):
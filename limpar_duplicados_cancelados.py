@@ -15,6 +15,7 @@ if sys.platform == 'win32':
 load_dotenv()
 
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 
@@ -37,8 +38,8 @@ def main():
     print("=" * 80)
 
     # Buscar todas as comissões
-    result = supabase.table('comissoes_sienge_comissoes').select('*').execute()
-    comissoes = result.data or []
+    result_data = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', '*')
+    comissoes = result_data
     print(f"\nTotal de comissões no banco: {len(comissoes)}")
 
     # Agrupar por contrato + empreendimento
@@ -0,0 +1,167 @@
+"""
+Operações Administrativas - Sistema de Comissões Young
+Manutenções em lote disparadas pelo admin (limpar canceladas, reverter status,
+verificar ITBIs faltantes). Rodam como jobs em background (ver jobs.py) e
+reportam o andamento via progresso(fase, processados, total).
+"""
+
+from typing import Callable, Dict, List
+from supabase_client import fetch_all_keyset
+from cache import barramento
+
+# Linhas por requisição nas exclusões/atualizações em lote (filtro id in (...))
+TAMANHO_LOTE_IDS = 200
+
+
+def _select_view(supabase, table: str, columns: str, batch_size: int = 1000) -> List[Dict]:
+    """Lê todas as linhas de uma view do Sienge (sem id: offset em ordem de contrato)."""
+    rows = []
+    offset = 0
+    while True:
+        result = supabase.table(table).select(columns)\
+            .order('building_id').order('numero_contrato')\
+            .limit(batch_size).offset(offset).execute()
+        if not result.data:
+            break
+        rows.extend(result.data)
+        if len(result.data) < batch_size:
+            break
+        offset += batch_size
+    return rows
+
+
+def _em_lotes_por_id(ids: List, aplicar: Callable, fase: str, progresso: Callable) -> int:
+    """Aplica aplicar(lote_de_ids) em blocos de TAMANHO_LOTE_IDS, reportando o progresso."""
+    feitos = 0
+    progresso(fase, 0, len(ids))
+    for i in range(0, len(ids), TAMANHO_LOTE_IDS):
+        lote = ids[i:i + TAMANHO_LOTE_IDS]
+        try:
+            aplicar(lote)
+            feitos += len(lote)
+        except Exception as e:
+            print(f"[Admin] Erro em {fase} (ids {lote[0]}..{lote[-1]}): {str(e)}")
+        progresso(fase, min(i + len(lote), len(ids)), len(ids))
+    return feitos
+
+
+def limpar_cancelados(supabase, progresso: Callable) -> Dict:
+    """Remove comissões canceladas e duplicatas; marca as pagas como Aprovada."""
+    tabela = 'comissoes_sienge_comissoes'
+    resultado = {
+        'canceladas_antes': 0,
+        'canceladas_deletadas': 0,
+        'duplicatas_antes': 0,
+        'duplicatas_deletadas': 0
+    }
+    
+    progresso('carregando')
+    comissoes_all = fetch_all_keyset(supabase, tabela, '*')
+    
+    # 1. Deletar comissões canceladas (pagas devem permanecer com status Aprovada)
+    canceladas = [c['id'] for c in comissoes_all if 'CANCEL' in (c.get('installment_status') or '').upper()]
+    resultado['canceladas_antes'] = len(canceladas)
+    resultado['canceladas_deletadas'] = _em_lotes_por_id(
+        canceladas,
+        lambda lote: supabase.table(tabela).delete().in_('id', lote).execute(),
+        'canceladas', progresso
+    )
+    
+    # Atualizar comissões pagas para status Aprovada
+    pagas = [
+        c['id'] for c in comissoes_all
+        if 'PAID' in (c.get('installment_status') or '').upper()
+        or 'PAGO' in (c.get('installment_status') or '').upper()
+    ]
+    resultado['pagas_atualizadas'] = _em_lotes_por_id(
+        pagas,
+        lambda lote: supabase.table(tabela).update({'status_aprovacao': 'Aprovada'}).in_('id', lote).execute(),
+        'pagas', progresso
+    )
+    
+    # 2. Remover duplicatas (entre as que sobraram)
+    removidas = set(canceladas)
+    grupos = {}
+    for c in comissoes_all:
+        if c['id'] in removidas:
+            continue
+        chave = f"{c.get('numero_contrato')}_{c.get('unit_name')}_{c.get('building_id')}"
+        grupos.setdefault(chave, []).append(c)
+    
+    duplicatas = {k: v for k, v in grupos.items() if len(v) > 1}
+    resultado['duplicatas_antes'] = len(duplicatas)
+    
+    excluir = []
+    for comissoes in duplicatas.values():
+        # Ordenar: não-canceladas primeiro, depois por ID; manter a primeira
+        comissoes.sort(key=lambda x: ('CANCEL' in (x.get('installment_status') or '').upper(), x.get('id', 0)))
+        excluir.extend(c['id'] for c in comissoes[1:])
+    resultado['duplicatas_deletadas'] = _em_lotes_por_id(
+        excluir,
+        lambda lote: supabase.table(tabela).delete().in_('id', lote).execute(),
+        'duplicatas', progresso
+    )
+    barramento.publicar(supabase, 'comissoes')
+    
+    resultado['sucesso'] = True
+    resultado['mensagem'] = (f"Limpeza concluída! Removidas {resultado['canceladas_deletadas']} canceladas "
+                             f"e {resultado['duplicatas_deletadas']} duplicatas.")
+    return resultado
+
+
+def reverter_status(supabase, progresso: Callable) -> Dict:
+    """Reverte todas as comissões com status diferente de 'Pendente' para 'Pendente'."""
+    tabela = 'comissoes_sienge_comissoes'
+    progresso('carregando')
+    comissoes = [
+        c for c in fetch_all_keyset(supabase, tabela, 'id, status_aprovacao')
+        # Mesmo critério do neq('status_aprovacao', 'Pendente') no banco: NULL fica de fora
+        if c.get('status_aprovacao') not in (None, 'Pendente')
+    ]
+    print(f"[REVERTER] Encontradas {len(comissoes)} comissões para reverter")
+    
+    revertidas = _em_lotes_por_id(
+        [c['id'] for c in comissoes],
+        lambda lote: supabase.table(tabela).update({
+            'status_aprovacao': 'Pendente',
+            'data_envio_aprovacao': None,
+            'enviado_por': None,
+            'data_aprovacao': None,
+            'aprovado_por': None,
+            'observacoes': None
+        }).in_('id', lote).execute(),
+        'revertendo', progresso
+    )
+    barramento.publicar(supabase, 'comissoes')
+    return {
+        'sucesso': True,
+        'mensagem': f'{revertidas} comissões revertidas para status Pendente',
+        'total_encontradas': len(comissoes),
+        'revertidas': revertidas
+    }
+
+
+def verificar_itbi_faltantes(supabase, progresso: Callable) -> Dict:
+    """Confere quantos contratos seguem sem ITBI.
+    
+    comissoes_sienge_itbi é uma VIEW calculada direto do Sienge, então não há o que
+    copiar: um ITBI lançado no Sienge já aparece na view. O job só recontabiliza.
+    """
+    progresso('carregando')
+    contratos = _select_view(supabase, 'comissoes_sienge_contratos', 'numero_contrato, building_id')
+    itbis = _select_view(supabase, 'comissoes_sienge_itbi', 'numero_contrato, building_id')
+    com_itbi = {f"{i.get('numero_contrato')}_{i.get('building_id')}" for i in itbis}
+    
+    sem_itbi = 0
+    progresso('verificando', 0, len(contratos))
+    for n, c in enumerate(contratos, 1):
+        if f"{c.get('numero_contrato')}_{c.get('building_id')}" not in com_itbi:
+            sem_itbi += 1
+        if n % 500 == 0 or n == len(contratos):
+            progresso('verificando', n, len(contratos))
+    return {
+        'sucesso': True,
+        'total': 0,
+        'total_sem_itbi': sem_itbi,
+        'mensagem': f"ITBIs vêm direto do Sienge: {sem_itbi} contratos seguem sem ITBI lançado."
+    }
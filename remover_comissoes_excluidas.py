@@ -12,6 +12,7 @@ if sys.platform == 'win32':
 load_dotenv()
 
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 from sienge_client import sienge_client
 
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
@@ -41,8 +42,8 @@ def main():
     
     # 2. Buscar todas comissões do banco
     print("\n[2/3] Buscando comissões do banco...")
-    result = supabase.table('comissoes_sienge_comissoes').select('id, sienge_id, numero_contrato, broker_nome, installment_status, commission_value').execute()
-    comissoes_banco = result.data or []
+    result_data = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', 'id, sienge_id, numero_contrato, broker_nome, installment_status, commission_value')
+    comissoes_banco = result_data
     print(f"      {len(comissoes_banco)} comissões no banco")
     
     # 3. Identificar comissões que não existem mais na API
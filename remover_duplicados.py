@@ -13,6 +13,7 @@ if sys.platform == 'win32':
 load_dotenv()
 
 from supabase import create_client
+from supabase_client import fetch_all_keyset
 
 supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 
@@ -23,9 +24,9 @@ def main():
     
     # 1. Buscar registros com unit_name errado (> 1000)
     print("\n[1/2] Buscando registros com unit_name > 1000...")
-    result = supabase.table('comissoes_sienge_comissoes').select('id, sienge_id, unit_name, broker_nome, numero_contrato').execute()
+    result_data = fetch_all_keyset(supabase, 'comissoes_sienge_comissoes', 'id, sienge_id, unit_name, broker_nome, numero_contrato')
     
-    registros = result.data or []
+    registros = result_data
     print(f"      {len(registros)} registros no banco")
     
     # Filtrar os que têm unit_name errado
@@ -16,6 +16,7 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from dotenv import load_dotenv
 
 # Garante que estamos na pasta do projeto
@@ -27,6 +28,13 @@ load_dotenv()
 # Configuração
 SYNC_HOUR = int(os.getenv('SYNC_HOUR', 4))  # Hora da sincronização (padrão: 4h)
 SYNC_MINUTE = int(os.getenv('SYNC_MINUTE', 0))  # Minuto (padrão: 0)
+# Sincronização incremental das comissões a cada N minutos (0 = desativada).
+# Só traz commissionIDs acima do cursor (max_id) de cada empresa, supondo que o Sienge
+# pagina em ordem crescente de id: mudança de status/valor em comissão já existente só
+# entra na reconciliação completa (SYNC_RECONCILIACAO_HORAS, sync_engine.py) ou na diária.
+SYNC_INTERVALO_INCREMENTAL = int(os.getenv('SYNC_INTERVALO_INCREMENTAL', 0))
+# Intervalo (segundos) de verificação da fila de jobs da API (comissoes_jobs)
+JOBS_INTERVALO_SEGUNDOS = int(os.getenv('JOBS_INTERVALO_SEGUNDOS', 5))
 
 # Configuração de E-mail
 SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
@@ -130,9 +138,12 @@ def enviar_email_notificacao(sucesso: bool, resultado: dict, erro: str = None):
         print(f"[E-mail] Erro ao enviar notificação: {str(e)}")
 
 
-def sincronizacao_diaria():
-    """Executa sincronização diária com o Sienge"""
-    print(f"[{datetime.now()}] Iniciando sincronização automática...")
+def sincronizacao_diaria(incremental: bool = False, retomar: bool = True):
+    """Executa sincronização diária com o Sienge (completa, ou incremental nos intervalos).
+    
+    retomar=True continua uma sincronização interrompida a partir dos checkpoints.
+    """
+    print(f"[{datetime.now()}] Iniciando sincronização automática{' incremental' if incremental else ''}...")
     
     resultado = {}
     sucesso = False
@@ -140,15 +151,25 @@ def sincronizacao_diaria():
     
     try:
         from sync_sienge_supabase import SiengeSupabaseSync
+        from jobs import executar_sincronizacao
         
         sync = SiengeSupabaseSync()
-        resultado = sync.sync_all()
+        # Sob o lease: se já houver uma sincronização rodando, acompanha a dela
+        resultado = executar_sincronizacao(
+            sync.supabase,
+            lambda progresso: sync.sync_all(incremental=incremental, retomar=retomar, progresso=progresso),
+            origem='scheduler'
+        )
         
         # Verificar se todas as sincronizações foram bem sucedidas
         erros = []
         for chave, valor in resultado.items():
             if isinstance(valor, dict) and not valor.get('sucesso', True):
                 erros.append(f"{chave}: {valor.get('erro', 'erro desconhecido')}")
+        if 'acompanhou_job' in resultado:
+            print(f"[{datetime.now()}] Já havia uma sincronização em andamento (job {resultado['acompanhou_job']}); acompanhada até o fim")
+            if not resultado.get('sucesso', True):
+                erros.append(resultado.get('erro', 'erro desconhecido'))
         
         sucesso = len(erros) == 0
         if erros:
@@ -171,12 +192,25 @@ def sincronizacao_diaria():
     else:
         print(f"[E-mail] Sincronização OK - e-mail não enviado (somente notifica em caso de erro)")
 
-def sync_manual():
+def sincronizacao_incremental():
+    """Sincronização incremental (só comissões novas desde o último cursor; alterações
+    em comissões existentes ficam para a reconciliação completa)"""
+    sincronizacao_diaria(incremental=True)
+
+def processar_fila_jobs():
+    """Executa os jobs enfileirados pela API (ex.: POST /api/sincronizar)"""
+    try:
+        from jobs import processar_fila
+        processar_fila()
+    except Exception as e:
+        print(f"[{datetime.now()}] ERRO ao processar fila de jobs: {str(e)}")
+
+def sync_manual(incremental: bool = False, retomar: bool = True):
     """Executa sincronização manualmente (para testes)"""
     print("\n" + "=" * 60)
-    print("  SINCRONIZAÇÃO MANUAL")
+    print("  SINCRONIZAÇÃO MANUAL" + (" (INCREMENTAL)" if incremental else "") + ("" if retomar else " (DO ZERO)"))
     print("=" * 60 + "\n")
-    sincronizacao_diaria()
+    sincronizacao_diaria(incremental=incremental, retomar=retomar)
 
 def signal_handler(signum, frame):
     """Trata sinais de interrupção"""
@@ -200,6 +234,9 @@ def main():
     print("=" * 60)
     print()
     print(f"Sincronização agendada para: {SYNC_HOUR:02d}:{SYNC_MINUTE:02d} diariamente")
+    if SYNC_INTERVALO_INCREMENTAL > 0:
+        print(f"Sincronização incremental: a cada {SYNC_INTERVALO_INCREMENTAL} minutos")
+    print(f"Fila de jobs da API: verificada a cada {JOBS_INTERVALO_SEGUNDOS} segundos")
     print()
     print("Comandos disponíveis:")
     print("  - Ctrl+C: Parar scheduler")
@@ -217,6 +254,27 @@ def main():
         replace_existing=True
     )
     
+    if SYNC_INTERVALO_INCREMENTAL > 0:
+        scheduler.add_job(
+            sincronizacao_incremental,
+            IntervalTrigger(minutes=SYNC_INTERVALO_INCREMENTAL),
+            id='sincronizacao_incremental',
+            name='Sincronização Incremental Sienge → Supabase',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+    
+    scheduler.add_job(
+        processar_fila_jobs,
+        IntervalTrigger(seconds=JOBS_INTERVALO_SEGUNDOS),
+        id='fila_jobs',
+        name='Fila de jobs da API (comissoes_jobs)',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    
     # Mostrar próxima execução (compatível com diferentes versões do APScheduler)
     try:
         jobs = scheduler.get_jobs()
@@ -246,12 +304,21 @@ if __name__ == '__main__':
     # Verificar argumentos
     if len(sys.argv) > 1:
         if sys.argv[1] in ['--sync', '-s', 'sync']:
-            sync_manual()
+            if '--resume' in sys.argv and '--restart' in sys.argv:
+                print("Use apenas uma das opções: --resume ou --restart")
+                sys.exit(1)
+            sync_manual(incremental='--incremental' in sys.argv, retomar='--restart' not in sys.argv)
         elif sys.argv[1] in ['--help', '-h', 'help']:
             print("Uso: python scheduler.py [opção]")
             print()
             print("Opções:")
             print("  --sync, -s    Executa sincronização manualmente")
+            print("                --incremental: só comissões novas desde o último cursor")
+            print("                  (commissionID acima do max_id de cada empresa; status/valor")
+            print("                  alterados em comissões existentes só entram na sync completa,")
+            print("                  feita no máximo a cada SYNC_RECONCILIACAO_HORAS)")
+            print("                --resume: continua a sincronização interrompida (padrão)")
+            print("                --restart: descarta os checkpoints e recomeça do zero")
             print("  --help, -h    Mostra esta ajuda")
             print()
             print("Sem argumentos: inicia scheduler em modo daemon")
@@ -4,13 +4,91 @@ Gerencia comunicação com a API do Sienge para buscar dados de contratos, comis
 """
 
 import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from itertools import islice
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from typing import Optional, List, Dict
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Status HTTP que indicam sobrecarga/instabilidade temporária do Sienge (vale tentar de novo)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class SiengeRequestError(Exception):
+    """Falha definitiva numa chamada ao Sienge (retentativas esgotadas).
+    
+    Diferente de "sem dados": quem pagina ou sincroniza deve abortar em vez de
+    tratar a página como vazia (o que truncaria a sincronização).
+    """
+    
+    def __init__(self, message: str, endpoint: str = None, status_code: int = None):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """Rate limiter (token bucket) thread-safe, compartilhado por todas as chamadas ao Sienge.
+    
+    rate = tokens repostos por segundo; capacity = rajada máxima.
+    pause() bloqueia todas as threads até o instante indicado (usado com Retry-After).
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Espera até haver um token disponível e o consome."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def pause(self, seconds: float):
+        """Suspende a emissão de tokens por `seconds` (para todas as threads)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos de espera."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
 
 class SiengeClient:
     """Cliente para API do Sienge"""
@@ -26,54 +104,137 @@ class SiengeClient:
         self.all_company_ids = [c.strip() for c in company_ids_str.split(',') if c.strip()]
         self.auth = HTTPBasicAuth(self.username, self.password)
         self.timeout = 30
+        # Pool de conexões HTTP (keep-alive): evita um handshake TCP+TLS por página.
+        # pool_connections = nº de hosts distintos em cache; pool_maxsize = conexões por host.
+        self.pool_connections = int(os.getenv('SIENGE_POOL_CONNECTIONS', 4))
+        self.pool_maxsize = int(os.getenv('SIENGE_POOL_MAXSIZE', 16))
+        self._session = None
+        self._session_lock = threading.Lock()
+        # Paginação paralela: tamanho da página e nº máximo de páginas buscadas ao mesmo tempo
+        self.page_size = int(os.getenv('SIENGE_PAGE_SIZE', 100))
+        self.max_workers = int(os.getenv('SIENGE_MAX_WORKERS', 8))
+        # Limite de requisições (token bucket) e retentativas com backoff exponencial + jitter
+        self.rate_limiter = TokenBucket(
+            rate=float(os.getenv('SIENGE_RATE_LIMIT', 3)),
+            capacity=int(os.getenv('SIENGE_RATE_BURST', 6))
+        )
+        self.max_retries = int(os.getenv('SIENGE_MAX_RETRIES', 5))
+        self.backoff_base = float(os.getenv('SIENGE_BACKOFF_BASE', 1.0))
+        self.backoff_max = float(os.getenv('SIENGE_BACKOFF_MAX', 60.0))
+    
+    @property
+    def session(self) -> requests.Session:
+        """Sessão HTTP compartilhada (criada sob demanda, uma por processo).
+        
+        O HTTPAdapter mantém um pool thread-safe por host; com pool_block=True,
+        threads além de pool_maxsize esperam uma conexão livre em vez de abrir
+        conexões extras que seriam descartadas.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.auth = self.auth
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        pool_block=True
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+    
+    def _backoff(self, attempt: int) -> float:
+        """Espera antes da próxima tentativa: exponencial com "full jitter"."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
     
     def _make_request(self, endpoint: str, params: dict = None) -> Optional[dict]:
-        """Faz requisição à API do Sienge"""
-        try:
-            url = f"{self.base_url}/{endpoint}"
-            response = requests.get(
-                url,
-                auth=self.auth,
-                params=params,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Erro na requisicao Sienge: {str(e)}")
-            return None
+        """Faz requisição à API do Sienge.
+        
+        Toda chamada passa pelo rate limiter. 429/5xx e falhas de rede são
+        repetidos com backoff (respeitando Retry-After); esgotadas as tentativas,
+        levanta SiengeRequestError. Outros erros 4xx (ex.: 404) retornam None.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        last_error = None
+        status_code = None
+        
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(
+                    url,
+                    params=params,
+                    timeout=self.timeout
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = str(e)
+                wait = self._backoff(attempt)
+            else:
+                status_code = response.status_code
+                if status_code not in RETRY_STATUS_CODES:
+                    try:
+                        response.raise_for_status()
+                        return response.json()
+                    except requests.exceptions.RequestException as e:
+                        print(f"Erro na requisicao Sienge: {str(e)}")
+                        return None
+                
+                last_error = f"HTTP {status_code}"
+                retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    # Cota estourada: segura TODAS as threads, não só esta
+                    self.rate_limiter.pause(retry_after)
+                    wait = retry_after
+                else:
+                    wait = self._backoff(attempt)
+            
+            if attempt < self.max_retries:
+                print(f"[Sienge] {endpoint}: {last_error} - tentativa {attempt + 1}/{self.max_retries + 1}, aguardando {wait:.1f}s")
+                time.sleep(wait)
+        
+        raise SiengeRequestError(
+            f"Sienge {endpoint}: {last_error} após {self.max_retries + 1} tentativas",
+            endpoint=endpoint,
+            status_code=status_code
+        )
     
-    def get_buildings(self) -> List[Dict]:
+    def get_buildings(self, company_id: str = None) -> List[Dict]:
         """Busca todos os empreendimentos"""
         try:
             # Na API v1, o endpoint é 'enterprises'
-            result = self._make_request('enterprises', {'companyId': self.company_id})
+            result = self._make_request('enterprises', {'companyId': company_id or self.company_id})
             if result and 'resultSetMetadata' in result:
                 return result.get('results', [])
             return result if isinstance(result, list) else []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar empreendimentos: {str(e)}")
             return []
     
-    def get_building_units(self, building_id: int) -> List[Dict]:
+    def get_building_units(self, building_id: int, company_id: str = None) -> List[Dict]:
         """Busca unidades de um empreendimento"""
         try:
             result = self._make_request('units', {
-                'companyId': self.company_id,
+                'companyId': company_id or self.company_id,
                 'enterpriseId': building_id
             })
             if result and 'resultSetMetadata' in result:
                 return result.get('results', [])
             return result if isinstance(result, list) else []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar unidades: {str(e)}")
             return []
     
-    def get_contracts(self, building_id: int = None, offset: int = 0, limit: int = 100) -> List[Dict]:
+    def get_contracts(self, building_id: int = None, offset: int = 0, limit: int = 100, company_id: str = None) -> List[Dict]:
         """Busca contratos com dados completos incluindo paymentConditions"""
         try:
             params = {
-                'companyId': self.company_id,
+                'companyId': company_id or self.company_id,
                 'offset': offset,
                 'limit': limit
             }
@@ -84,6 +245,8 @@ class SiengeClient:
             if result and 'resultSetMetadata' in result:
                 return result.get('results', [])
             return result if isinstance(result, list) else []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar contratos: {str(e)}")
             return []
@@ -92,40 +255,46 @@ class SiengeClient:
         """Busca detalhes de um contrato específico"""
         try:
             return self._make_request(f'sales-contracts/{contract_id}')
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar detalhes do contrato: {str(e)}")
             return None
     
-    def get_contract_by_number(self, contract_number: str, building_id: int) -> Optional[Dict]:
+    def get_contract_by_number(self, contract_number: str, building_id: int, company_id: str = None) -> Optional[Dict]:
         """Busca contrato pelo número"""
         try:
-            contracts = self.get_contracts(building_id=building_id, limit=500)
+            contracts = self.get_contracts(building_id=building_id, limit=500, company_id=company_id)
             for contract in contracts:
                 if str(contract.get('number')) == str(contract_number):
                     return contract
             return None
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar contrato por numero: {str(e)}")
             return None
     
-    def get_brokers(self, building_id: int = None) -> List[Dict]:
+    def get_brokers(self, building_id: int = None, company_id: str = None) -> List[Dict]:
         """Busca corretores"""
         try:
             result = self._make_request('commissions/configurations/brokers', {
-                'companyId': self.company_id
+                'companyId': company_id or self.company_id
             })
             if result and 'resultSetMetadata' in result:
                 return result.get('results', [])
             return result if isinstance(result, list) else []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar corretores: {str(e)}")
             return []
     
-    def get_broker_commissions(self, broker_id: int, building_id: int = None) -> List[Dict]:
+    def get_broker_commissions(self, broker_id: int, building_id: int = None, company_id: str = None) -> List[Dict]:
         """Busca comissões de um corretor"""
         try:
             params = {
-                'companyId': self.company_id,
+                'companyId': company_id or self.company_id,
                 'brokerId': broker_id
             }
             if building_id:
@@ -135,15 +304,17 @@ class SiengeClient:
             if result and 'resultSetMetadata' in result:
                 return result.get('results', [])
             return result if isinstance(result, list) else []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar comissoes do corretor: {str(e)}")
             return []
     
-    def get_commissions(self, building_id: int = None, offset: int = 0, limit: int = 100, include_cancelled: bool = True) -> List[Dict]:
+    def get_commissions(self, building_id: int = None, offset: int = 0, limit: int = 100, include_cancelled: bool = True, company_id: str = None) -> List[Dict]:
         """Busca todas as comissões (incluindo canceladas por padrão)"""
         try:
             params = {
-                'companyId': self.company_id,
+                'companyId': company_id or self.company_id,
                 'offset': offset,
                 'limit': limit
             }
@@ -154,6 +325,8 @@ class SiengeClient:
             if result and 'resultSetMetadata' in result:
                 return result.get('results', [])
             return result if isinstance(result, list) else []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar comissoes: {str(e)}")
             return []
@@ -162,6 +335,8 @@ class SiengeClient:
         """Busca detalhes de uma comissão específica (inclui baseValue)"""
         try:
             return self._make_request(f'commissions/{commission_id}')
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar detalhes da comissao {commission_id}: {str(e)}")
             return None
@@ -173,14 +348,16 @@ class SiengeClient:
             if contract:
                 return contract.get('linkedCommissions', [])
             return []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar comissoes do contrato: {str(e)}")
             return []
     
-    def get_customers(self, building_id: int = None) -> List[Dict]:
+    def get_customers(self, building_id: int = None, company_id: str = None) -> List[Dict]:
         """Busca clientes"""
         try:
-            params = {'companyId': self.company_id}
+            params = {'companyId': company_id or self.company_id}
             if building_id:
                 params['enterpriseId'] = building_id
             
@@ -188,100 +365,191 @@ class SiengeClient:
             if result and 'resultSetMetadata' in result:
                 return result.get('results', [])
             return result if isinstance(result, list) else []
+        except SiengeRequestError:
+            raise
         except Exception as e:
             print(f"Erro ao buscar clientes: {str(e)}")
             return []
     
-    def get_all_contracts_paginated(self, building_id: int = None) -> List[Dict]:
-        """Busca todos os contratos com paginação automática"""
-        all_contracts = []
-        offset = 0
-        limit = 100
+    def _get_page(self, endpoint: str, params: dict, offset: int, limit: int):
+        """Busca uma página de um endpoint paginado.
+        
+        Retorna (resultados, total) — total vem de resultSetMetadata.count
+        (None quando a API não informa).
+        """
+        page_params = dict(params, offset=offset, limit=limit)
+        result = self._make_request(endpoint, page_params)
+        if result and 'resultSetMetadata' in result:
+            total = result['resultSetMetadata'].get('count')
+            return result.get('results', []), total
+        return (result if isinstance(result, list) else []), None
+    
+    def _get_page_intermediaria(self, endpoint: str, params: dict, offset: int, limit: int, total):
+        """_get_page de uma página seguinte à primeira.
+        
+        Página antes da última (offset + limit < total) vazia = requisição falhou (4xx
+        devolve None): levanta SiengeRequestError para a sincronização abortar e poder
+        retomar, em vez de pular a página e gravar o cursor como se estivesse completa.
+        """
+        page, _ = self._get_page(endpoint, params, offset, limit)
+        if not page and total is not None and offset + limit < total:
+            raise SiengeRequestError(
+                f"Sienge {endpoint}: página offset={offset} veio vazia ou falhou (total {total})",
+                endpoint=endpoint
+            )
+        return page, total
+    
+    def _iter_pages(self, endpoint: str, params: dict, start_offset: int = 0, parallel: bool = True):
+        """Gera as páginas de um endpoint paginado a partir de start_offset, na ordem.
+        
+        Cada item é (resultados, total) — total é o resultSetMetadata.count (ou None).
+        Com count conhecido, mantém até max_workers páginas seguintes sendo buscadas
+        em paralelo enquanto o consumidor processa a atual (janela deslizante), então
+        no máximo max_workers páginas ficam em memória. Sem count (ou com
+        parallel=False), percorre as páginas em série.
+        """
+        limit = self.page_size
+        first_page, total = self._get_page(endpoint, params, start_offset, limit)
+        yield first_page, total
+        if len(first_page) < limit:
+            return
+        
+        if parallel and total is not None:
+            offsets = iter(range(start_offset + limit, total, limit))
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            try:
+                pendentes = deque(
+                    executor.submit(self._get_page_intermediaria, endpoint, params, offset, limit, total)
+                    for offset in islice(offsets, self.max_workers)
+                )
+                while pendentes:
+                    page, _ = pendentes.popleft().result()
+                    proximo = next(offsets, None)
+                    if proximo is not None:
+                        pendentes.append(executor.submit(self._get_page_intermediaria, endpoint, params, proximo,
+                                                         limit, total))
+                    yield page, total
+            finally:
+                # Consumidor parou no meio (erro/close): não busca o resto
+                executor.shutdown(wait=True, cancel_futures=True)
+            return
         
+        offset = start_offset + limit
         while True:
-            contracts = self.get_contracts(building_id=building_id, offset=offset, limit=limit)
-            if not contracts:
+            page, _ = self._get_page_intermediaria(endpoint, params, offset, limit, total)
+            if not page:
                 break
-            all_contracts.extend(contracts)
-            if len(contracts) < limit:
+            yield page, total
+            if len(page) < limit:
                 break
             offset += limit
+    
+    def _fetch_pages_from(self, endpoint: str, params: dict, start_offset: int = 0, parallel: bool = True):
+        """Busca todas as páginas a partir de start_offset numa lista (ver _iter_pages).
         
-        return all_contracts
+        Retorna (resultados, total) — total é o count informado pela API (ou None).
+        """
+        all_results = []
+        total = None
+        for page, total in self._iter_pages(endpoint, params, start_offset, parallel=parallel):
+            all_results.extend(page)
+        return all_results, total
+    
+    def _fetch_all_pages(self, endpoint: str, params: dict, parallel: bool = True) -> List[Dict]:
+        """Busca todas as páginas de um endpoint paginado (ver _fetch_pages_from)."""
+        results, _ = self._fetch_pages_from(endpoint, params, 0, parallel=parallel)
+        return results
+    
+    def get_all_contracts_paginated(self, building_id: int = None, parallel: bool = True, company_id: str = None) -> List[Dict]:
+        """Busca todos os contratos com paginação automática"""
+        params = {'companyId': company_id or self.company_id}
+        if building_id:
+            params['enterpriseId'] = building_id
+        return self._fetch_all_pages('sales-contracts', params, parallel=parallel)
     
-    def get_all_commissions_paginated(self, building_id: int = None) -> List[Dict]:
+    def get_all_commissions_paginated(self, building_id: int = None, parallel: bool = True, company_id: str = None) -> List[Dict]:
         """Busca todas as comissões com paginação automática"""
-        all_commissions = []
-        offset = 0
-        limit = 100
+        params = {'companyId': company_id or self.company_id}
+        if building_id:
+            params['enterpriseId'] = building_id
+        return self._fetch_all_pages('commissions', params, parallel=parallel)
+    
+    def iter_contracts(self, building_id: int = None, company_id: str = None, start_offset: int = 0):
+        """Gera os contratos página a página: (pagina, total) à medida que chegam."""
+        params = {'companyId': company_id or self.company_id}
+        if building_id:
+            params['enterpriseId'] = building_id
+        return self._iter_pages('sales-contracts', params, start_offset)
+    
+    def iter_commissions(self, building_id: int = None, company_id: str = None, start_offset: int = 0):
+        """Gera as comissões página a página: (pagina, total) à medida que chegam.
         
-        while True:
-            commissions = self.get_commissions(building_id=building_id, offset=offset, limit=limit)
-            if not commissions:
-                break
-            all_commissions.extend(commissions)
-            if len(commissions) < limit:
-                break
-            offset += limit
+        Permite gravar uma página enquanto as seguintes ainda estão sendo buscadas.
+        """
+        params = {'companyId': company_id or self.company_id}
+        if building_id:
+            params['enterpriseId'] = building_id
+        return self._iter_pages('commissions', params, start_offset)
+    
+    def get_commissions_from_offset(self, start_offset: int, company_id: str = None, building_id: int = None):
+        """Busca as comissões a partir de um offset (usado pela sincronização incremental).
         
-        return all_commissions
+        Retorna (comissoes, total) — total é o count atual da empresa no Sienge.
+        """
+        params = {'companyId': company_id or self.company_id}
+        if building_id:
+            params['enterpriseId'] = building_id
+        return self._fetch_pages_from('commissions', params, start_offset)
     
-    def get_contracts_all_companies(self) -> List[Dict]:
-        """Busca contratos de TODAS as empresas cadastradas"""
-        all_contracts = []
-        original_company_id = self.company_id
+    def _for_all_companies(self, fetch, label: str) -> List[Dict]:
+        """Executa fetch(company_id) para TODAS as empresas em paralelo.
         
-        for company_id in self.all_company_ids:
-            self.company_id = company_id
+        Cada chamada recebe o company_id explicitamente — o estado do cliente
+        (self.company_id) nunca é alterado, então é seguro chamar de várias threads
+        (ex.: /api/sincronizar e scheduler ao mesmo tempo). O resultado mantém a
+        ordem de SIENGE_COMPANY_IDS.
+        """
+        def fetch_company(company_id):
             try:
-                contracts = self.get_all_contracts_paginated()
-                if contracts:
-                    print(f"[Sienge] Empresa {company_id}: {len(contracts)} contratos")
-                    all_contracts.extend(contracts)
+                items = fetch(company_id) or []
+                if items:
+                    print(f"[Sienge] Empresa {company_id}: {len(items)} {label}")
+                return items
+            except SiengeRequestError:
+                raise
             except Exception as e:
                 print(f"[Sienge] Erro na empresa {company_id}: {str(e)}")
+                return []
+        
+        all_items = []
+        workers = max(1, len(self.all_company_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for items in executor.map(fetch_company, self.all_company_ids):
+                all_items.extend(items)
         
-        self.company_id = original_company_id
-        print(f"[Sienge] Total de contratos (todas empresas): {len(all_contracts)}")
-        return all_contracts
+        print(f"[Sienge] Total de {label} (todas empresas): {len(all_items)}")
+        return all_items
+    
+    def get_contracts_all_companies(self) -> List[Dict]:
+        """Busca contratos de TODAS as empresas cadastradas"""
+        return self._for_all_companies(
+            lambda company_id: self.get_all_contracts_paginated(company_id=company_id),
+            'contratos'
+        )
     
     def get_commissions_all_companies(self) -> List[Dict]:
         """Busca comissões de TODAS as empresas cadastradas"""
-        all_commissions = []
-        original_company_id = self.company_id
-        
-        for company_id in self.all_company_ids:
-            self.company_id = company_id
-            try:
-                commissions = self.get_all_commissions_paginated()
-                if commissions:
-                    print(f"[Sienge] Empresa {company_id}: {len(commissions)} comissoes")
-                    all_commissions.extend(commissions)
-            except Exception as e:
-                print(f"[Sienge] Erro na empresa {company_id}: {str(e)}")
-        
-        self.company_id = original_company_id
-        print(f"[Sienge] Total de comissoes (todas empresas): {len(all_commissions)}")
-        return all_commissions
+        return self._for_all_companies(
+            lambda company_id: self.get_all_commissions_paginated(company_id=company_id),
+            'comissoes'
+        )
     
     def get_buildings_all_companies(self) -> List[Dict]:
         """Busca empreendimentos de TODAS as empresas cadastradas"""
-        all_buildings = []
-        original_company_id = self.company_id
-        
-        for company_id in self.all_company_ids:
-            self.company_id = company_id
-            try:
-                buildings = self.get_buildings()
-                if buildings:
-                    print(f"[Sienge] Empresa {company_id}: {len(buildings)} empreendimentos")
-                    all_buildings.extend(buildings)
-            except Exception as e:
-                print(f"[Sienge] Erro na empresa {company_id}: {str(e)}")
-        
-        self.company_id = original_company_id
-        print(f"[Sienge] Total de empreendimentos (todas empresas): {len(all_buildings)}")
-        return all_buildings
+        return self._for_all_companies(
+            lambda company_id: self.get_buildings(company_id=company_id),
+            'empreendimentos'
+        )
     
     def extract_itbi_from_contract(self, contract: Dict) -> Optional[Dict]:
         """Extrai dados de ITBI do paymentConditions de um contrato
@@ -23,11 +23,15 @@ if not os.getenv('SUPABASE_URL') or not os.getenv('SUPABASE_KEY'):
     print("[ERRO] Variaveis SUPABASE_URL e SUPABASE_KEY nao configuradas!")
     sys.exit(1)
 
-from supabase import create_client
+from supabase_client import get_supabase
 from sienge_client import sienge_client
+from cache import TOPICOS, barramento
+from gatilho_estado import recalcular_estado
+from sync_engine import ComissoesSyncEngine
+from jobs import executar_sincronizacao
 
 # Conectar ao Supabase
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+supabase = get_supabase()
 
 # Arquivo de log
 LOG_FILE = os.path.join(os.path.dirname(__file__), 'logs', 'sincronizacao.log')
@@ -45,126 +49,46 @@ def log(mensagem):
         f.write(linha + '\n')
 
 
+engine = ComissoesSyncEngine(supabase, sienge_client, log=log)
+
+
 def sincronizar_comissoes():
-    """Sincroniza comissoes de todas as empresas"""
+    """Sincroniza comissoes de todas as empresas (motor unico de sync_engine)"""
     log("Iniciando sincronizacao de COMISSOES...")
     
-    try:
-        # Buscar comissoes da API
-        commissions = sienge_client.get_commissions_all_companies()
-        total_api = len(commissions)
-        log(f"  {total_api} comissoes encontradas na API")
-        
-        # Buscar comissoes existentes no Supabase
-        result = supabase.table('comissoes_sienge_comissoes').select('sienge_id').execute()
-        existentes = set(int(item['sienge_id']) for item in (result.data or []) if item['sienge_id'])
-        log(f"  {len(existentes)} comissoes ja cadastradas")
-        
-        ids_processados = set()
-        novos = 0
-        atualizados = 0
-        erros = 0
-        
-        for commission in commissions:
-            try:
-                # O campo correto e commissionID
-                sienge_id = commission.get('commissionID') or commission.get('id') or commission.get('commissionId')
-                if not sienge_id or sienge_id in ids_processados:
-                    continue
-                
-                ids_processados.add(sienge_id)
-                
-                data = {
-                    'sienge_id': str(sienge_id),
-                    'numero_contrato': str(commission.get('salesContractNumber') or commission.get('contractNumber')) if (commission.get('salesContractNumber') or commission.get('contractNumber')) else None,
-                    'building_id': commission.get('enterpriseID') or commission.get('enterpriseId'),
-                    'company_id': str(commission.get('companyId')) if commission.get('companyId') else None,
-                    'broker_id': commission.get('brokerID') or commission.get('brokerId'),
-                    'broker_nome': commission.get('brokerName'),
-                    'customer_name': commission.get('customerName'),
-                    'enterprise_name': commission.get('enterpriseName'),
-                    'unit_name': commission.get('unitName'),
-                    'commission_value': commission.get('value') or commission.get('commissionValue'),
-                    'installment_status': commission.get('installmentStatus'),
-                    'customer_situation_type': commission.get('customerSituationType'),
-                    'commission_date': commission.get('dueDate') or commission.get('commissionDate'),
-                    'atualizado_em': datetime.now().isoformat()
-                }
-                
-                if sienge_id in existentes:
-                    supabase.table('comissoes_sienge_comissoes').update(data).eq('sienge_id', str(sienge_id)).execute()
-                    atualizados += 1
-                else:
-                    data['status_aprovacao'] = 'Pendente'
-                    supabase.table('comissoes_sienge_comissoes').insert(data).execute()
-                    novos += 1
-                    
-            except Exception as e:
-                erros += 1
-                if erros <= 5:
-                    log(f"  Erro comissao {commission.get('commissionID')}: {str(e)[:100]}")
-        
-        log(f"COMISSOES: {len(ids_processados)} processadas | {novos} novas | {atualizados} atualizadas | {erros} erros")
-        return {'sucesso': True, 'total': len(ids_processados), 'sincronizados': novos + atualizados, 'novos': novos, 'atualizados': atualizados, 'erros': erros}
-        
-    except Exception as e:
-        log(f"ERRO em comissoes: {str(e)}")
-        return {'sucesso': False, 'erro': str(e)}
-
-
-def sincronizar_base_value():
-    """Sincroniza o baseValue (valor a vista) das comissões"""
+    resultado = engine.sincronizar_comissoes()
+    if resultado.get('sucesso'):
+        resultado['sincronizados'] = resultado['novos'] + resultado['atualizados']
+        resultado['erros'] = 0
+        log(f"COMISSOES: {resultado['total']} processadas | {resultado['novos']} novas | {resultado['atualizados']} atualizadas | {resultado['inalterados']} inalteradas")
+    else:
+        log(f"ERRO em comissoes: {resultado.get('erro')}")
+    return resultado
+
+
+def sincronizar_base_value(sienge_ids=None):
+    """Sincroniza o baseValue (valor a vista) das comissoes novas/alteradas"""
     log("Iniciando sincronizacao de BASE VALUE (valor a vista)...")
     
-    import time
+    resultado = engine.enriquecer(sienge_ids=sienge_ids)
+    if resultado.get('sucesso'):
+        log(f"BASE VALUE: {resultado.get('total', 0)} comissoes | {resultado.get('sincronizados', 0)} atualizados | {resultado.get('erros', 0)} erros")
+    else:
+        log(f"ERRO em baseValue: {resultado.get('erro')}")
+    return resultado
+
+
+def sincronizar_gatilho_estado():
+    """Recalcula o estado materializado do gatilho e regrava so o que mudou"""
+    log("Iniciando atualizacao do ESTADO DO GATILHO...")
     
     try:
-        # Buscar todas as comissões do banco
-        result = supabase.table('comissoes_sienge_comissoes').select('id,sienge_id,numero_contrato').execute()
-        comissoes = result.data or []
-        total = len(comissoes)
-        log(f"  {total} comissoes para buscar baseValue")
-        
-        atualizados = 0
-        erros = 0
-        
-        for i, c in enumerate(comissoes):
-            sienge_id = c.get('sienge_id')
-            if not sienge_id:
-                continue
-            
-            try:
-                # Buscar detalhes da comissão
-                detalhe = sienge_client.get_commission_details(int(sienge_id))
-                
-                if detalhe and 'baseValue' in detalhe:
-                    base_value = detalhe.get('baseValue')
-                    
-                    # Atualizar no banco
-                    supabase.table('comissoes_sienge_comissoes').update({
-                        'valor_comissao': base_value,
-                        'atualizado_em': datetime.now().isoformat()
-                    }).eq('id', c['id']).execute()
-                    
-                    atualizados += 1
-                else:
-                    erros += 1
-                
-                # Pequeno delay para não sobrecarregar a API
-                if i % 10 == 0:
-                    time.sleep(0.3)
-                    
-            except Exception as e:
-                erros += 1
-                if erros <= 5:
-                    log(f"  Erro baseValue comissao {sienge_id}: {str(e)[:60]}")
-        
-        log(f"BASE VALUE: {total} comissoes | {atualizados} atualizados | {erros} erros")
-        return {'sucesso': True, 'total': total, 'sincronizados': atualizados, 'erros': erros}
-        
+        resultado = recalcular_estado(supabase)
     except Exception as e:
-        log(f"ERRO em baseValue: {str(e)}")
+        log(f"ERRO no estado do gatilho: {str(e)}")
         return {'sucesso': False, 'erro': str(e)}
+    log(f"ESTADO DO GATILHO: {resultado['comissoes']} comissoes recalculadas | {resultado['gravadas']} regravadas")
+    return dict(resultado, sincronizados=resultado['gravadas'], erros=0)
 
 
 def executar_sincronizacao_completa():
@@ -175,19 +99,37 @@ def executar_sincronizacao_completa():
     log("=" * 60)
     
     inicio = datetime.now()
-    resultados = {}
     
     # NOTA: contratos, ITBI e valor pago agora sao VIEWS no banco
     # (comissoes_sienge_contratos / _itbi / _valor_pago), calculadas direto do
     # Sienge. Nao devem mais ser gravadas aqui (daria erro/redundancia). Por isso
     # sincronizar_contratos / sincronizar_itbis / sincronizar_valores_pagos foram
     # removidos deste fluxo. Dados manuais ficam nas tabelas *_manual.
-
-    # Sincronizar comissoes (incluindo canceladas) - tabela real
-    resultados['comissoes'] = sincronizar_comissoes()
-
-    # Sincronizar baseValue (valor a vista) das comissoes - coluna real
-    resultados['base_value'] = sincronizar_base_value()
+    def executar(progresso):
+        engine.progresso = progresso
+        resultados = {}
+        
+        # Sincronizar comissoes (incluindo canceladas) - tabela real
+        resultados['comissoes'] = sincronizar_comissoes()
+        
+        # Sincronizar baseValue (valor a vista) das comissoes novas/alteradas - coluna real
+        alterados = resultados['comissoes'].pop('alterados', [])
+        resultados['base_value'] = sincronizar_base_value(sienge_ids=alterados)
+        
+        # Comissoes/valor a vista mudaram: invalida o cache da API e dos demais processos
+        if any(res.get('sucesso') for res in resultados.values()):
+            barramento.publicar(supabase, *TOPICOS)
+            resultados['gatilho_estado'] = sincronizar_gatilho_estado()
+        return resultados
+    
+    # Sob o lease da sincronizacao: se o scheduler/API ja estiver sincronizando,
+    # acompanha a execucao dele em vez de rodar uma segunda em paralelo
+    resultados = executar_sincronizacao(supabase, executar, origem='sincronizacao_agendada')
+    if 'acompanhou_job' in resultados:
+        log(f"Sincronizacao ja estava em andamento em outro processo (job {resultados['acompanhou_job'] or '-'}) - acompanhada ate o fim")
+        if not resultados.get('sucesso', True):
+            log(f"ERRO na sincronizacao acompanhada: {resultados.get('erro')}")
+        resultados = {tipo: res for tipo, res in resultados.items() if isinstance(res, dict)}
     
     fim = datetime.now()
     duracao = (fim - inicio).total_seconds() / 60
@@ -1,13 +1,13 @@
 """
 Script para sincronizar o baseValue (valor a vista) das comissões
 Busca o detalhe de cada comissão para obter o baseValue
-Salva no campo valor_a_vista da tabela sienge_comissoes
+Salva no campo valor_comissao da tabela comissoes_sienge_comissoes
+
+Por padrão só busca comissões ainda sem valor; use --completo para refazer todas.
+Executar: python sincronizar_base_value.py [--completo]
 """
 
-import os
 import sys
-import time
-from datetime import datetime
 from dotenv import load_dotenv
 
 if sys.platform == 'win32':
@@ -16,75 +16,50 @@ if sys.platform == 'win32':
 
 load_dotenv()
 
-from supabase import create_client
-from sienge_client import sienge_client
+from cache import TOPICOS, barramento
+from gatilho_estado import recalcular_estado
+from jobs import executar_sincronizacao
+from sync_sienge_supabase import SiengeSupabaseSync
 
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
 
-def sincronizar_base_value():
+def sincronizar_base_value(completo: bool = False):
     print("=" * 60)
     print("SINCRONIZAÇÃO DE BASE VALUE (VALOR À VISTA)")
     print("=" * 60)
     
-    # 1. Buscar todas as comissões do banco
-    print("\n[1/2] Buscando comissões...")
-    result = supabase.table('comissoes_sienge_comissoes').select('id,sienge_id,numero_contrato,broker_nome').execute()
-    
-    comissoes = result.data or []
-    print(f"      {len(comissoes)} comissões encontradas")
-    
-    # 2. Para cada comissão, buscar o detalhe e pegar o baseValue
-    print("\n[2/2] Buscando baseValue de cada comissão...")
+    sync = SiengeSupabaseSync()
     
-    atualizados = 0
-    erros = 0
+    def executar(progresso):
+        sync.engine.progresso = progresso
+        resultado = sync.sync_base_value(completo=completo)
+        if resultado.get('sucesso'):
+            # valor_comissao mudou: invalida o cache da API e recalcula o estado do gatilho
+            barramento.publicar(sync.supabase, *TOPICOS)
+            try:
+                recalcular_estado(sync.supabase)
+            except Exception as e:
+                print(f"Erro ao atualizar estado do gatilho: {str(e)}")
+        return resultado
     
-    for i, c in enumerate(comissoes):
-        sienge_id = c.get('sienge_id')
-        if not sienge_id:
-            continue
-        
-        try:
-            # Buscar detalhes da comissão
-            detalhe = sienge_client.get_commission_details(int(sienge_id))
-            
-            if detalhe and 'baseValue' in detalhe:
-                base_value = detalhe.get('baseValue')
-                
-                # Atualizar no banco - campo valor_comissao (usado para armazenar valor_a_vista/baseValue)
-                supabase.table('comissoes_sienge_comissoes').update({
-                    'valor_comissao': base_value,
-                    'atualizado_em': datetime.now().isoformat()
-                }).eq('id', c['id']).execute()
-                
-                atualizados += 1
-                
-                if atualizados % 50 == 0:
-                    print(f"      Progresso: {atualizados}/{len(comissoes)} atualizados")
-            else:
-                erros += 1
-                if erros <= 5:
-                    print(f"      [AVISO] Comissão {sienge_id} - baseValue não encontrado")
-            
-            # Pequeno delay para não sobrecarregar a API
-            if i % 10 == 0:
-                time.sleep(0.3)
-                
-        except Exception as e:
-            erros += 1
-            if erros <= 10:
-                print(f"      [ERRO] ID {sienge_id}: {str(e)[:60]}")
+    # Sob o lease da sincronização: se outra estiver rodando, acompanha a dela
+    resultado = executar_sincronizacao(sync.supabase, executar, origem='sincronizar_base_value')
+    if 'acompanhou_job' in resultado:
+        resultado = dict(resultado.get('base_value', resultado), sucesso=resultado.get('sucesso', True),
+                         erro=resultado.get('erro'))
     
     print("\n" + "=" * 60)
     print("RESULTADO")
     print("=" * 60)
-    print(f"Total processado: {len(comissoes)}")
-    print(f"Atualizados:      {atualizados}")
-    print(f"Erros/Avisos:     {erros}")
+    if resultado.get('sucesso'):
+        print(f"Comissões buscadas: {resultado.get('total', 0)}")
+        print(f"Atualizados:        {resultado.get('sincronizados', 0)}")
+        print(f"Erros/Avisos:       {resultado.get('erros', 0)}")
+    else:
+        print(f"ERRO: {resultado.get('erro')}")
     print("=" * 60)
     
-    return {'atualizados': atualizados, 'erros': erros}
+    return {'atualizados': resultado.get('sincronizados', 0), 'erros': resultado.get('erros', 0)}
 
 
 if __name__ == '__main__':
-    sincronizar_base_value()
+    sincronizar_base_value(completo='--completo' in sys.argv)
@@ -2,9 +2,7 @@
 Script para sincronizar TODAS as comissoes do Sienge para o Supabase
 """
 
-import os
 import sys
-from datetime import datetime
 from dotenv import load_dotenv
 
 if sys.platform == 'win32':
@@ -13,111 +11,60 @@ if sys.platform == 'win32':
 
 load_dotenv()
 
-from supabase import create_client
+from supabase_client import get_supabase
 from sienge_client import sienge_client
+from cache import TOPICOS, barramento
+from gatilho_estado import recalcular_estado
+from sync_engine import ComissoesSyncEngine
+from jobs import executar_sincronizacao
 
-supabase = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+supabase = get_supabase()
 
 def sincronizar_comissoes():
     print("=" * 60)
     print("SINCRONIZACAO DE COMISSOES - INICIO")
     print("=" * 60)
     
-    # 1. Buscar comissoes da API principal
-    print("\n[1/3] Buscando comissoes da API...")
-    commissions = sienge_client.get_commissions_all_companies()
-    print(f"      {len(commissions)} comissoes encontradas na API")
+    # Mesmo motor do scheduler/app: chave sienge_id + broker_id, troca de
+    # commissionID detectada por numero_contrato + broker_id + building_id
+    engine = ComissoesSyncEngine(supabase, sienge_client)
     
-    # 2. Buscar comissoes existentes no Supabase
-    print("\n[2/3] Verificando comissoes existentes no Supabase...")
-    result = supabase.table('comissoes_sienge_comissoes').select('sienge_id').execute()
-    # sienge_id no Supabase e string, entao convertemos para int para comparacao
-    existentes = set(int(item['sienge_id']) for item in (result.data or []) if item['sienge_id'])
-    print(f"      {len(existentes)} comissoes ja cadastradas")
-    
-    # 3. Processar e inserir/atualizar
-    print("\n[3/3] Processando comissoes...")
-    
-    chaves_processadas = set()
-    novos = 0
-    atualizados = 0
-    erros = 0
-    
-    for commission in commissions:
-        try:
-            # O campo correto e commissionID
-            sienge_id = commission.get('commissionID') or commission.get('id') or commission.get('commissionId')
-            broker_id = commission.get('brokerID') or commission.get('brokerId')
-            if not sienge_id:
-                continue
-            
-            # Chave unica: sienge_id + broker_id (para suportar multiplos corretores no mesmo contrato)
-            chave_unica = f"{sienge_id}_{broker_id}"
-            if chave_unica in chaves_processadas:
-                continue
-            
-            chaves_processadas.add(chave_unica)
+    def executar(progresso):
+        engine.progresso = progresso
+        resultado = engine.sincronizar_comissoes()
+        resultado.pop('alterados', None)
+        if resultado.get('sucesso'):
+            # Comissoes mudaram: invalida o cache da API e dos demais processos
+            barramento.publicar(supabase, *TOPICOS)
             
-            data = {
-                'sienge_id': str(sienge_id),
-                'numero_contrato': str(commission.get('salesContractNumber') or commission.get('contractNumber')) if (commission.get('salesContractNumber') or commission.get('contractNumber')) else None,
-                'building_id': commission.get('enterpriseID') or commission.get('enterpriseId'),
-                'company_id': str(commission.get('companyId')) if commission.get('companyId') else None,
-                'broker_id': broker_id,
-                'broker_nome': commission.get('brokerName'),
-                'customer_name': commission.get('customerName'),
-                'enterprise_name': commission.get('enterpriseName'),
-                'unit_name': commission.get('unitName'),
-                'commission_value': commission.get('value') or commission.get('commissionValue'),
-                'installment_percentage': commission.get('installmentPercentage'),
-                'installment_status': commission.get('installmentStatus'),
-                'customer_situation_type': commission.get('customerSituationType'),
-                'commission_date': commission.get('dueDate') or commission.get('commissionDate'),
-                'atualizado_em': datetime.now().isoformat()
-            }
-            
-            numero_contrato = data['numero_contrato']
-            building_id = data['building_id']
-            
-            # Verificar se ja existe no banco por sienge_id E broker_id
-            existe = supabase.table('comissoes_sienge_comissoes').select('id,sienge_id').eq('sienge_id', str(sienge_id)).eq('broker_id', broker_id).execute()
-            
-            if existe.data:
-                # Atualizar pelo sienge_id + broker_id
-                supabase.table('comissoes_sienge_comissoes').update(data).eq('sienge_id', str(sienge_id)).eq('broker_id', broker_id).execute()
-                atualizados += 1
-            else:
-                # Verificar se existe pelo numero_contrato + broker_id + building_id (caso o sienge_id tenha mudado)
-                existe_por_contrato = supabase.table('comissoes_sienge_comissoes').select('id,sienge_id').eq('numero_contrato', numero_contrato).eq('broker_id', broker_id).eq('building_id', building_id).execute()
-                
-                if existe_por_contrato.data:
-                    # Atualizar registro existente (sienge_id mudou no Sienge)
-                    old_sienge_id = existe_por_contrato.data[0].get('sienge_id')
-                    print(f"      [UPDATE] Contrato {numero_contrato} - sienge_id mudou de {old_sienge_id} para {sienge_id}")
-                    supabase.table('comissoes_sienge_comissoes').update(data).eq('numero_contrato', numero_contrato).eq('broker_id', broker_id).eq('building_id', building_id).execute()
-                    atualizados += 1
-                else:
-                    # Inserir novo registro
-                    data['status_aprovacao'] = 'Pendente'
-                    supabase.table('comissoes_sienge_comissoes').insert(data).execute()
-                    novos += 1
-                    print(f"      [NOVO] ID {sienge_id} - {commission.get('brokerName')} - Contrato {commission.get('salesContractNumber')} - R$ {commission.get('value')}")
-                
-        except Exception as e:
-            erros += 1
-            if erros <= 10:
-                print(f"      [ERRO] ID {commission.get('commissionID')}: {str(e)[:80]}")
+            # Estado materializado do gatilho: recalcula tudo e regrava so o que mudou
+            try:
+                recalcular_estado(supabase)
+            except Exception as e:
+                print(f"Erro ao atualizar estado do gatilho: {str(e)}")
+        return resultado
+    
+    # Sob o lease da sincronização: se outra estiver rodando, acompanha a dela
+    resultado = executar_sincronizacao(supabase, executar, origem='sincronizar_comissoes')
+    if 'acompanhou_job' in resultado:
+        resultado = dict(resultado.get('comissoes', resultado), sucesso=resultado.get('sucesso', True),
+                         erro=resultado.get('erro'))
     
     print("\n" + "=" * 60)
     print("RESULTADO")
     print("=" * 60)
-    print(f"Total processado: {len(chaves_processadas)} comissoes unicas")
-    print(f"Novas inseridas:  {novos}")
-    print(f"Atualizadas:      {atualizados}")
-    print(f"Erros:            {erros}")
+    if not resultado.get('sucesso'):
+        print(f"Erro:             {resultado.get('erro')}")
+        print("=" * 60)
+        return {'novos': 0, 'atualizados': 0, 'erros': 1}
+    print(f"Total processado: {resultado['total']} comissoes")
+    print(f"Novas inseridas:  {resultado['novos']}")
+    print(f"Atualizadas:      {resultado['atualizados']}")
+    print(f"Inalteradas:      {resultado['inalterados']}")
+    print(f"ID trocado:       {resultado['rechaveados']}")
     print("=" * 60)
     
-    return {'novos': novos, 'atualizados': atualizados, 'erros': erros}
+    return {'novos': resultado['novos'], 'atualizados': resultado['atualizados'], 'erros': 0}
 
 
 if __name__ == '__main__':
@@ -15,6 +15,10 @@ let observacoesComissoes = {}; // Armazena observações por ID de comissão
 let comissaoAtualObservacao = null; // ID da comissão sendo editada
 let regrasGatilhoDisponiveis = []; // Lista de regras de gatilho disponíveis para seleção
 
+// Visualizar Comissões: o servidor devolve uma página por vez (page/page_size/sort/cursor)
+const TAMANHO_PAGINA_COMISSOES = 100;
+let listagemComissoes = { pagina: 1, ordenacao: '-commission_date', cursores: {} };
+
 // ================================
 // UTILITÁRIOS
 // ================================
@@ -646,7 +650,11 @@ async function carregarRegrasGatilhoDisponiveis() {
     }
 }
 
-async function buscarComissoes() {
+async function buscarComissoes(pagina = 1) {
+    // Página 1 = nova busca: cursores anteriores não valem mais
+    if (pagina === 1) listagemComissoes.cursores = {};
+    listagemComissoes.pagina = pagina;
+    
     const loading = document.getElementById('loadingComissoes');
     const tabelaContainer = document.getElementById('tabelaComissoesContainer');
     const progressContainer = document.getElementById('progressContainer');
@@ -702,6 +710,10 @@ async function buscarComissoes() {
         if (corretor) url += `corretor=${encodeURIComponent(corretor)}&`;
         if (dataComissaoInicio) url += `data_comissao_inicio=${dataComissaoInicio}&`;
         if (dataComissaoFim) url += `data_comissao_fim=${dataComissaoFim}&`;
+        url += `page=${pagina}&page_size=${TAMANHO_PAGINA_COMISSOES}&sort=${listagemComissoes.ordenacao}`;
+        // Próxima página via cursor: estável mesmo se entrarem comissões novas entre as páginas
+        const cursor = listagemComissoes.cursores[pagina];
+        if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
         
         const response = await fetchComRetry(url);
         
@@ -712,8 +724,10 @@ async function buscarComissoes() {
         
         atualizarProgresso(95, 'Renderizando tabela...');
         
-        if (data.sucesso && data.comissoes) {
+        if (data.sucesso && data.comissoes && data.comissoes.length > 0) {
+            if (data.proximo_cursor) listagemComissoes.cursores[pagina + 1] = data.proximo_cursor;
             renderizarTabelaComissoes(data.comissoes);
+            renderizarPaginacaoComissoes(data);
             atualizarProgresso(100, 'Concluído!');
             
             setTimeout(() => {
@@ -722,9 +736,12 @@ async function buscarComissoes() {
                 if (tabelaContainer) tabelaContainer.style.display = 'block';
             }, 300);
             
-            const total = data.total || data.comissoes.length;
-            showAlert(`${total} comissões encontradas`, 'info');
+            if (pagina === 1) {
+                const total = data.total || data.comissoes.length;
+                showAlert(`${total} comissões encontradas`, 'info');
+            }
         } else {
+            renderizarPaginacaoComissoes({ total: 0, total_paginas: 0 });
             atualizarProgresso(100, 'Nenhuma comissão encontrada');
             setTimeout(() => {
                 if (loading) loading.style.display = 'none';
@@ -746,6 +763,41 @@ async function buscarComissoes() {
     }
 }
 
+function renderizarPaginacaoComissoes(data) {
+    const container = document.getElementById('paginacaoComissoes');
+    if (!container) return;
+    
+    const pagina = listagemComissoes.pagina;
+    const totalPaginas = data.total_paginas || 0;
+    if (totalPaginas <= 1) {
+        container.style.display = 'none';
+        container.innerHTML = '';
+        return;
+    }
+    
+    container.style.display = 'flex';
+    container.innerHTML = `
+        <button class="btn-secondary" ${pagina <= 1 ? 'disabled' : ''} onclick="buscarComissoes(${pagina - 1})">&laquo; Anterior</button>
+        <span style="color: #888;">Página ${pagina} de ${totalPaginas} (${data.total} comissões)</span>
+        <button class="btn-secondary" ${pagina >= totalPaginas ? 'disabled' : ''} onclick="buscarComissoes(${pagina + 1})">Próxima &raquo;</button>
+    `;
+}
+
+/**
+ * Ordena a listagem pelo campo (clique no cabeçalho): mesmo campo inverte a direção
+ */
+function ordenarComissoes(campo) {
+    const atual = listagemComissoes.ordenacao;
+    if (atual === campo) {
+        listagemComissoes.ordenacao = `-${campo}`;
+    } else if (atual === `-${campo}`) {
+        listagemComissoes.ordenacao = campo;
+    } else {
+        listagemComissoes.ordenacao = campo === 'commission_date' ? `-${campo}` : campo;
+    }
+    buscarComissoes(1);
+}
+
 function traduzirStatusAprovacao(status) {
     if (!status) return 'Aguardando liberação';
     
@@ -1368,7 +1420,7 @@ async function enviarParaAprovacao() {
             showAlert(data.mensagem || 'Comissões enviadas para aprovação!', 'success');
             comissoesSelecionadas = [];
             atualizarAcoesLote();
-            buscarComissoes();
+            buscarComissoes(listagemComissoes.pagina);
         } else {
             const erro = data.erro || data.mensagem || 'Erro ao enviar para aprovação';
             showAlert(erro, 'error');
@@ -1862,6 +1914,75 @@ window.salvarConfiguracoesEmails = async function() {
 // SINCRONIZAÇÃO
 // ================================
 
+const FASES_JOB = {
+    empreendimentos: 'Empreendimentos',
+    corretores: 'Corretores',
+    comissoes: 'Comissões',
+    base_value: 'Valor à vista',
+    carregando: 'Carregando',
+    canceladas: 'Removendo canceladas',
+    pagas: 'Atualizando pagas',
+    duplicatas: 'Removendo duplicatas',
+    revertendo: 'Revertendo',
+    verificando: 'Verificando contratos',
+    gatilho_estado: 'Estado do gatilho'
+};
+
+function descreverProgressoJob(job) {
+    if (job.status === 'pendente') return 'Na fila...';
+    const fase = FASES_JOB[job.fase] || job.fase || 'Iniciando';
+    let texto = fase;
+    if (job.total) {
+        texto += `: ${job.processados}/${job.total}`;
+    } else if (job.processados) {
+        texto += `: ${job.processados}`;
+    }
+    if (job.eta_segundos != null) {
+        const minutos = Math.floor(job.eta_segundos / 60);
+        const segundos = job.eta_segundos % 60;
+        texto += ` (faltam ~${minutos > 0 ? minutos + 'min ' : ''}${segundos}s)`;
+    }
+    return texto;
+}
+
+// Acompanha um job em background pelo stream SSE /api/jobs/<id>/eventos.
+// Resolve com o job final (status concluido ou erro); onProgresso recebe cada atualização.
+function acompanharJob(jobId, onProgresso) {
+    return new Promise((resolve, reject) => {
+        const eventos = new EventSource(`/api/jobs/${jobId}/eventos`);
+        eventos.addEventListener('progresso', (e) => {
+            if (onProgresso) onProgresso(JSON.parse(e.data));
+        });
+        eventos.addEventListener('fim', (e) => {
+            eventos.close();
+            resolve(JSON.parse(e.data));
+        });
+        eventos.addEventListener('erro', (e) => {
+            eventos.close();
+            reject(new Error(JSON.parse(e.data).erro || 'Erro ao acompanhar job'));
+        });
+        // O servidor encerra cada conexão após alguns segundos e o EventSource reconecta
+        // sozinho; só desiste se o navegador fechar a conexão de vez
+        eventos.onerror = () => {
+            if (eventos.readyState === EventSource.CLOSED) {
+                reject(new Error('Conexão com o servidor perdida'));
+            }
+        };
+    });
+}
+
+// Enfileira uma operação em background (POST que responde 202 com job_id) e espera o fim
+async function executarJob(url, onProgresso) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' }
+    });
+    const data = await response.json();
+    if (!data.sucesso) throw new Error(data.erro || 'Erro ao iniciar operação');
+    if (data.existente) showAlert('Esta operação já está em andamento; acompanhando o progresso.', 'info');
+    return acompanharJob(data.job_id, onProgresso);
+}
+
 async function sincronizarDados() {
     const btn = document.getElementById('syncButton');
     const status = document.getElementById('syncStatus');
@@ -1870,24 +1991,20 @@ async function sincronizarDados() {
     if (status) status.textContent = 'Sincronizando...';
     
     try {
-        const response = await fetch('/api/sincronizar', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' }
+        const job = await executarJob('/api/sincronizar', (progresso) => {
+            if (status) status.textContent = descreverProgressoJob(progresso);
         });
-        
-        const data = await response.json();
-        
-        if (data.sucesso) {
+        if (job.status === 'concluido') {
             if (status) status.textContent = 'Sincronizado!';
             showAlert('Dados sincronizados com sucesso!', 'success');
         } else {
             if (status) status.textContent = 'Erro';
-            showAlert(data.erro || 'Erro na sincronização', 'error');
+            showAlert(job.erro || 'Erro na sincronização', 'error');
         }
     } catch (error) {
         console.error('Erro:', error);
         if (status) status.textContent = 'Erro';
-        showAlert('Erro na sincronização', 'error');
+        showAlert(error.message || 'Erro na sincronização', 'error');
     }
     
     if (btn) btn.disabled = false;
@@ -2032,7 +2149,7 @@ let regraParaExcluir = null;
 // Função para mostrar aba de configuração
 window.mostrarConfigTab = function(tabId) {
     // Esconder todas as abas
-    const tabs = ['configUsuarios', 'configCorretores', 'configEmails', 'configRegras'];
+    const tabs = ['configUsuarios', 'configCorretores', 'configEmails', 'configRegras', 'configManutencao'];
     tabs.forEach(id => {
         const el = document.getElementById(id);
         if (el) el.style.display = 'none';
@@ -2715,33 +2832,29 @@ window.sincronizarItbiFaltantes = async function() {
         return;
     }
     
+    const textoBotao = (texto) => '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" style="animation: spin 1s linear infinite;"><path d="M21 12a9 9 0 1 1-9-9c2.52 0 4.93 1 6.74 2.74L21 8"/><path d="M21 3v5h-5"/></svg> ' + texto;
+    
     try {
         if (btn) {
-            btn.innerHTML = '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" style="animation: spin 1s linear infinite;"><path d="M21 12a9 9 0 1 1-9-9c2.52 0 4.93 1 6.74 2.74L21 8"/><path d="M21 3v5h-5"/></svg> Sincronizando...';
+            btn.innerHTML = textoBotao('Sincronizando...');
             btn.disabled = true;
         }
         
-        const response = await fetch('/api/sincronizar-itbi-faltantes', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' }
+        const job = await executarJob('/api/sincronizar-itbi-faltantes', (progresso) => {
+            if (btn) btn.innerHTML = textoBotao(descreverProgressoJob(progresso));
         });
         
-        const data = await response.json();
-        
-        if (data.sucesso) {
-            const resultado = data.resultado || {};
-            const mensagem = `Sincronização concluída! ${resultado.total || 0} novos ITBIs encontrados de ${resultado.total_sem_itbi || 0} contratos verificados.`;
-            
-            showAlert(mensagem, 'success');
+        if (job.status === 'concluido') {
+            showAlert((job.resultado || {}).mensagem || 'Sincronização concluída!', 'success');
             
             // Recarregar lista
             carregarContratosSemItbi();
         } else {
-            showAlert(data.erro || 'Erro ao sincronizar ITBIs', 'error');
+            showAlert(job.erro || 'Erro ao sincronizar ITBIs', 'error');
         }
     } catch (error) {
         console.error('Erro ao sincronizar ITBIs:', error);
-        showAlert('Erro ao sincronizar ITBIs', 'error');
+        showAlert(error.message || 'Erro ao sincronizar ITBIs', 'error');
     } finally {
         if (btn) {
             btn.innerHTML = originalHtml;
@@ -2750,6 +2863,58 @@ window.sincronizarItbiFaltantes = async function() {
     }
 };
 
+// Executa um job de manutenção do admin mostrando o andamento ao lado do botão (como sincronizarDados)
+async function executarManutencao(url, btnId, statusId, mensagens) {
+    const btn = document.getElementById(btnId);
+    const status = document.getElementById(statusId);
+    
+    if (btn) btn.disabled = true;
+    if (status) status.textContent = 'Iniciando...';
+    
+    try {
+        const job = await executarJob(url, (progresso) => {
+            if (status) status.textContent = descreverProgressoJob(progresso);
+        });
+        if (job.status === 'concluido') {
+            if (status) status.textContent = 'Concluído!';
+            showAlert((job.resultado || {}).mensagem || mensagens.sucesso, 'success');
+        } else {
+            if (status) status.textContent = 'Erro';
+            showAlert(job.erro || mensagens.erro, 'error');
+        }
+    } catch (error) {
+        console.error(mensagens.erro + ':', error);
+        if (status) status.textContent = 'Erro';
+        showAlert(error.message || mensagens.erro, 'error');
+    }
+    
+    if (btn) btn.disabled = false;
+    
+    setTimeout(() => {
+        if (status) status.textContent = '';
+    }, 3000);
+}
+
+// Remover comissões canceladas/duplicadas (manutenção do admin)
+window.limparCancelados = async function() {
+    if (!confirm('Deseja remover as comissões canceladas e duplicadas?\n\nEsta ação não pode ser desfeita.')) {
+        return;
+    }
+    
+    await executarManutencao('/api/limpar-cancelados', 'btnLimparCancelados', 'limparCanceladosStatus',
+        { sucesso: 'Limpeza concluída!', erro: 'Erro na limpeza' });
+};
+
+// Reverter todas as comissões para Pendente (manutenção do admin)
+window.reverterStatusComissoes = async function() {
+    if (!confirm('Deseja reverter TODAS as comissões para o status Pendente?\n\nEsta ação não pode ser desfeita.')) {
+        return;
+    }
+    
+    await executarManutencao('/api/comissoes/reverter-status', 'btnReverterStatus', 'reverterStatusStatus',
+        { sucesso: 'Comissões revertidas!', erro: 'Erro ao reverter comissões' });
+};
+
 // ================================
 // COMISSÃO MANUAL
 // ================================
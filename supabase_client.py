@@ -0,0 +1,205 @@
+"""
+Cliente Supabase Compartilhado - Sistema de Comissões Young
+Um único cliente por processo (thread-safe), com pool de conexões HTTP keep-alive:
+as rotas, o AuthManager, a sincronização e os jobs reaproveitam as mesmas conexões
+em vez de montar um create_client (e um handshake TLS) a cada request.
+
+Uso: from supabase_client import get_supabase; supabase = get_supabase()
+
+Leituras completas de tabelas: fetch_all_keyset (paginação por chave, não por offset) e
+fetch_all_paginated (keyset em tabelas com id, offset em paralelo nas views).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List
+import httpx
+from supabase import Client, create_client
+from supabase.lib.client_options import SyncClientOptions
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Conexões simultâneas com o Supabase por processo (gunicorn: threads + sync paralela)
+SUPABASE_POOL_CONEXOES = int(os.getenv('SUPABASE_POOL_CONEXOES', 20))
+
+# Conexões ociosas mantidas abertas (keep-alive) e por quantos segundos
+SUPABASE_POOL_KEEPALIVE = int(os.getenv('SUPABASE_POOL_KEEPALIVE', 10))
+SUPABASE_KEEPALIVE_SEGUNDOS = float(os.getenv('SUPABASE_KEEPALIVE_SEGUNDOS', 30))
+
+# Timeout (segundos) de cada requisição ao Supabase
+SUPABASE_TIMEOUT = float(os.getenv('SUPABASE_TIMEOUT', 120))
+
+# Páginas buscadas em paralelo por fetch_all_paginated (por chamada)
+FETCH_PARALELO = int(os.getenv('FETCH_PARALELO', 4))
+
+# Ordem estável para as views do Sienge (contratos, ITBI, valor pago), que não têm id
+CHAVE_CONTRATO = ('building_id', 'numero_contrato')
+
+_clientes = {}
+_lock = threading.Lock()
+
+
+def criar_cliente() -> Client:
+    """Cria um cliente Supabase novo com o pool HTTP configurado acima."""
+    http = httpx.Client(
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_CONEXOES,
+            max_keepalive_connections=SUPABASE_POOL_KEEPALIVE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_SEGUNDOS
+        ),
+        follow_redirects=True,
+        http2=True
+    )
+    return create_client(
+        os.getenv('SUPABASE_URL'),
+        os.getenv('SUPABASE_KEY'),
+        options=SyncClientOptions(httpx_client=http)
+    )
+
+
+def get_supabase() -> Client:
+    """Cliente compartilhado do processo (criado na primeira chamada).
+    
+    Indexado pelo pid: um processo filho (fork do gunicorn) não herda as conexões
+    abertas do pai, cria o próprio pool.
+    """
+    pid = os.getpid()
+    cliente = _clientes.get(pid)
+    if cliente is None:
+        with _lock:
+            cliente = _clientes.get(pid)
+            if cliente is None:
+                cliente = _clientes[pid] = criar_cliente()
+    return cliente
+
+
+def _com_chave(columns: str, chave: str) -> str:
+    """Garante a coluna da chave no select (o cursor precisa dela)."""
+    if columns.strip() == '*' or chave in [c.strip() for c in columns.split(',')]:
+        return columns
+    return f"{columns},{chave}"
+
+
+def iter_keyset(supabase, table: str, columns: str = '*', batch_size: int = 1000, chave: str = 'id',
+                depois_de=None, ate=None, filtros: Callable = None) -> Iterator[List[Dict]]:
+    """Gera as páginas de uma tabela por keyset: order by chave, chave > última lida.
+    
+    Cada página custa O(página) no índice (offset relê tudo que pulou) e a varredura
+    não repete nem pula linhas se alguém inserir/apagar durante a leitura.
+    depois_de/ate limitam a faixa (depois_de < chave <= ate); filtros(query) -> query
+    aplica condições extras (eq, in_, ...).
+    """
+    columns = _com_chave(columns, chave)
+    ultimo = depois_de
+    while True:
+        query = supabase.table(table).select(columns)
+        if filtros:
+            query = filtros(query)
+        if ultimo is not None:
+            query = query.gt(chave, ultimo)
+        if ate is not None:
+            query = query.lte(chave, ate)
+        result = query.order(chave).limit(batch_size).execute()
+        rows = result.data or []
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        ultimo = rows[-1][chave]
+
+
+def _limite_chave(supabase, table: str, chave: str, desc: bool, filtros: Callable = None):
+    query = supabase.table(table).select(chave)
+    if filtros:
+        query = filtros(query)
+    result = query.order(chave, desc=desc).limit(1).execute()
+    return result.data[0][chave] if result.data else None
+
+
+def fetch_all_keyset(supabase, table: str, columns: str = '*', batch_size: int = 1000, chave: str = 'id',
+                     paralelo: int = 1, filtros: Callable = None) -> List[Dict]:
+    """Lê a tabela inteira por keyset (ver iter_keyset), em ordem de chave.
+    
+    paralelo > 1 (chave numérica): divide [menor, maior] em faixas e varre cada faixa
+    por keyset numa thread; o resultado continua em ordem.
+    """
+    if paralelo <= 1:
+        return [row for pagina in iter_keyset(supabase, table, columns, batch_size, chave, filtros=filtros)
+                for row in pagina]
+    
+    menor = _limite_chave(supabase, table, chave, False, filtros)
+    maior = _limite_chave(supabase, table, chave, True, filtros)
+    if menor is None:
+        return []
+    passo = max(1, -(-(maior - menor + 1) // paralelo))
+    # Faixas (depois_de, ate]: a primeira começa logo antes da menor chave, a última vai até o fim
+    limites = [menor - 1 + passo * i for i in range(paralelo)] + [None]
+    faixas = [(limites[i], limites[i + 1]) for i in range(paralelo) if limites[i] < maior]
+    faixas[-1] = (faixas[-1][0], None)
+    
+    def ler(faixa):
+        return [row for pagina in iter_keyset(supabase, table, columns, batch_size, chave,
+                                               depois_de=faixa[0], ate=faixa[1], filtros=filtros)
+                for row in pagina]
+    
+    with ThreadPoolExecutor(max_workers=len(faixas)) as executor:
+        return [row for parte in executor.map(ler, faixas) for row in parte]
+
+
+def fetch_all_paginated(supabase_client, table_name: str, columns: str = '*', batch_size: int = 1000,
+                        order_by: tuple = None, filtros=None) -> list:
+    """Busca todos os registros de uma tabela com paginação automática.
+    O Supabase tem limite de 1000 registros por query, então precisamos paginar.
+    
+    Tabelas com id: keyset (id > último lido), em FETCH_PARALELO faixas de id em paralelo —
+    custo constante por página e sem pular/repetir linhas se a sincronização gravar
+    durante a leitura.
+    
+    Views sem id (order_by informado): offset+limit, que funciona melhor que range().
+    A primeira página já traz o total (count='exact'); as demais são buscadas em
+    paralelo e devolvidas na ordem. order_by fixa a ordem das páginas — sem ela o
+    Postgres pode repetir/pular linhas entre offsets.
+    
+    filtros(query) -> query aplica condições no banco (eq, in_, ilike, ...): só as linhas
+    que passam atravessam a rede.
+    """
+    if order_by is None:
+        return fetch_all_keyset(supabase_client, table_name, columns, batch_size, paralelo=FETCH_PARALELO,
+                                filtros=filtros)
+    
+    def pagina(offset, count=None):
+        query = supabase_client.table(table_name).select(columns, count=count)
+        if filtros:
+            query = filtros(query)
+        for coluna in order_by:
+            query = query.order(coluna)
+        return query.limit(batch_size).offset(offset).execute()
+    
+    primeira = pagina(0, count='exact')
+    all_records = list(primeira.data or [])
+    if len(all_records) < batch_size:
+        return all_records
+    
+    if primeira.count is None:
+        # Sem total: segue página a página
+        offset = batch_size
+        while True:
+            result = pagina(offset)
+            if not result.data:
+                break
+            all_records.extend(result.data)
+            if len(result.data) < batch_size:
+                break
+            offset += batch_size
+        return all_records
+    
+    offsets = range(batch_size, primeira.count, batch_size)
+    if offsets:
+        with ThreadPoolExecutor(max_workers=min(FETCH_PARALELO, len(offsets))) as executor:
+            for result in executor.map(pagina, offsets):
+                all_records.extend(result.data or [])
+    
+    return all_records
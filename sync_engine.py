@@ -0,0 +1,612 @@
+"""
+Motor de Sincronização de Comissões - Sistema de Comissões Young
+Pipeline único Sienge → Supabase usado por todos os pontos de entrada
+(scheduler.py, /api/sincronizar, executar_sync_completo.py,
+sincronizacao_agendada.py e sincronizar_comissoes.py):
+
+    buscar → normalizar → comparar → gravar → enriquecer
+
+Cada estágio é um método de ComissoesSyncEngine; normalizar e log podem ser
+trocados no construtor e os demais estágios sobrescritos numa subclasse.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from typing import Callable, List, Dict, Optional
+from sienge_client import sienge_client
+from supabase_client import fetch_all_keyset
+from sync_lock import LeasePerdido
+
+
+# Linhas por chamada nas gravações em lote
+TAMANHO_LOTE_ESCRITA = int(os.getenv('SYNC_TAMANHO_LOTE', 500))
+
+# Sincronização incremental: a cada N horas cada empresa é relida por inteiro (reconciliação)
+RECONCILIACAO_HORAS = float(os.getenv('SYNC_RECONCILIACAO_HORAS', 24))
+
+# Checkpoints de uma sincronização interrompida mais antigos que isso são ignorados
+CHECKPOINT_VALIDADE_HORAS = float(os.getenv('SYNC_CHECKPOINT_HORAS', 6))
+
+
+def valor_mudou(atual, novo) -> bool:
+    """Compara valores monetários vindos do banco (str/num/None) e do Sienge."""
+    if atual is None or novo is None:
+        return atual is not novo
+    try:
+        return abs(float(atual) - float(novo)) > 0.005
+    except (TypeError, ValueError):
+        return str(atual) != str(novo)
+
+
+def _commission_id(commission: Dict) -> Optional[int]:
+    sienge_id = commission.get('commissionID') or commission.get('id') or commission.get('commissionId')
+    try:
+        return int(sienge_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _mais_antigo_que(momento, horas: float) -> bool:
+    """True se o timestamp ISO (do banco) é mais antigo que N horas — ou ausente/inválido."""
+    if not momento:
+        return True
+    try:
+        momento_dt = datetime.fromisoformat(str(momento).replace('Z', '+00:00'))
+        if momento_dt.tzinfo is None:
+            momento_dt = momento_dt.replace(tzinfo=timezone.utc)
+    except ValueError:
+        return True
+    return datetime.now(timezone.utc) - momento_dt > timedelta(hours=horas)
+
+
+def hash_comissao(data: Dict) -> str:
+    """Hash estável dos campos vindos do Sienge (ignora atualizado_em e colunas locais)."""
+    campos = {k: v for k, v in data.items() if k not in ('atualizado_em', 'sienge_hash', 'status_aprovacao', 'id')}
+    conteudo = json.dumps(campos, sort_keys=True, default=str)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+def normalizar_comissao(commission: Dict) -> Optional[Dict]:
+    """Converte uma comissão da API Sienge no registro de comissoes_sienge_comissoes."""
+    # Campos corretos da API Sienge (conforme documentação):
+    # commissionID, salesContractNumber, enterpriseID, brokerID, etc.
+    sienge_id = commission.get('commissionID') or commission.get('id') or commission.get('commissionId')
+    if not sienge_id:
+        print(f"[WARN] Comissão sem ID: {commission}")
+        return None
+
+    data = {
+        'sienge_id': sienge_id,
+        'numero_contrato': commission.get('salesContractNumber') or commission.get('contractNumber'),
+        'building_id': commission.get('enterpriseID') or commission.get('enterpriseId') or commission.get('buildingId'),
+        'company_id': commission.get('companyId'),
+        'broker_id': commission.get('brokerID') or commission.get('brokerId'),
+        'broker_nome': commission.get('brokerName'),
+        'customer_name': commission.get('customerName'),
+        'customer_situation_type': commission.get('customerSituationType'),
+        'enterprise_name': commission.get('enterpriseName') or commission.get('buildingName'),
+        'unit_name': commission.get('unitName'),
+        'commission_value': commission.get('value') or commission.get('commissionValue'),
+        'installment_status': commission.get('installmentStatus'),
+        'installment_percentage': commission.get('installmentPercentage'),
+        'commission_date': commission.get('dueDate') or commission.get('commissionDate') or commission.get('date'),
+        'atualizado_em': datetime.now().isoformat()
+    }
+    data['sienge_hash'] = hash_comissao(data)
+    return data
+
+
+class ComissoesSyncEngine:
+    """Sincroniza comissões do Sienge para o Supabase em estágios.
+    
+    IMPORTANTE: Usa sienge_id + broker_id como chave única, pois o Sienge
+    retorna múltiplas comissões com o mesmo commissionID para diferentes
+    corretores (comissão dividida).
+    """
+    
+    def __init__(self, supabase, sienge=None, normalizar: Callable[[Dict], Optional[Dict]] = None,
+                 log: Callable[[str], None] = None, progresso: Callable[[str, int, Optional[int]], None] = None):
+        self.supabase = supabase
+        self.sienge = sienge or sienge_client
+        self.normalizar = normalizar or normalizar_comissao
+        self.log = log or print
+        # progresso(fase, processados, total) — ex.: jobs.ProgressoJob
+        self.progresso = progresso or (lambda fase, processados=0, total=None: None)
+    
+    # ==================== PIPELINE ====================
+    
+    def executar(self, building_id: int = None, incremental: bool = False, retomar: bool = True) -> Dict:
+        """Pipeline completo: comissões e, em seguida, enriquecimento de baseValue.
+        
+        O baseValue só é buscado para as comissões novas/alteradas nesta execução
+        (e as que ainda não têm valor).
+        """
+        resultados = {'comissoes': self.sincronizar_comissoes(building_id, incremental=incremental, retomar=retomar)}
+        alterados = resultados['comissoes'].pop('alterados', [])
+        resultados['base_value'] = self.enriquecer(sienge_ids=alterados)
+        return resultados
+    
+    def sincronizar_comissoes(self, building_id: int = None, incremental: bool = False, retomar: bool = True) -> Dict:
+        """Busca, compara e grava as comissões de todas as empresas (ou de um empreendimento).
+        
+        Gravação em lote: o mapa (sienge_id, broker_id) -> id do banco é carregado
+        uma vez, as comissões são separadas em novas/existentes em memória e
+        gravadas em blocos de TAMANHO_LOTE_ESCRITA linhas por requisição.
+        status_aprovacao só é definido nas novas ('Pendente'); nas existentes
+        a coluna não vai no payload e nunca é sobrescrita.
+        
+        Existentes cujo sienge_hash não mudou não são regravadas (nem disparam
+        triggers), então atualizado_em reflete a última mudança real no Sienge.
+        
+        incremental=True lê só as páginas novas de cada empresa a partir do cursor
+        salvo em comissoes_sync_estado (ver buscar_empresa). Limite: só comissões com
+        commissionID acima do cursor são vistas; status/valor alterados em comissões
+        já existentes só são pegos na reconciliação completa (RECONCILIACAO_HORAS).
+        
+        Checkpoints: na leitura completa, cada empresa é gravada página a página e
+        o offset já gravado fica em comissoes_sync_estado ('checkpoint:comissoes:...').
+        Se a execução cair no meio, a próxima (retomar=True) pula as empresas
+        concluídas e continua as demais do último checkpoint; retomar=False
+        descarta os checkpoints e recomeça do zero.
+        
+        Troca de commissionID: uma comissão sem correspondência por (sienge_id, broker_id)
+        que bata com uma linha pelo (numero_contrato, broker_id, building_id) reaproveita
+        essa linha (preservando status_aprovacao) — desde que o sienge_id antigo tenha
+        sumido da leitura completa da empresa. Nos demais casos é inserida como nova.
+        """
+        try:
+            ctx = self._novo_contexto()
+            
+            leituras = []
+            if building_id:
+                leitura = {'company_id': None, 'paginas': self.sienge.iter_commissions(building_id=building_id),
+                           'offset': 0, 'completa': False, 'checkpoint': False, 'retomada': False}
+                self._processar_leitura(leitura, ctx)
+            else:
+                usar_checkpoint = not incremental
+                if usar_checkpoint and not retomar:
+                    self._limpar_checkpoints()
+                
+                def processar_empresa(company_id):
+                    leitura = self.buscar_empresa(company_id, incremental, usar_checkpoint and retomar)
+                    self._processar_leitura(leitura, ctx)
+                    return leitura
+                
+                # Empresas são lidas em paralelo e cada página é gravada (com checkpoint) assim
+                # que chega; uma empresa com erro não impede que as outras gravem seu progresso
+                erro = None
+                with ThreadPoolExecutor(max_workers=max(1, len(self.sienge.all_company_ids))) as executor:
+                    futures = [executor.submit(processar_empresa, company_id) for company_id in self.sienge.all_company_ids]
+                    for future in as_completed(futures):
+                        try:
+                            leituras.append(future.result())
+                        except Exception as e:
+                            erro = erro or e
+                if erro:
+                    raise erro
+                
+                if usar_checkpoint:
+                    self._limpar_checkpoints()
+            
+            # Reconciliação: com TODAS as empresas lidas por inteiro nesta execução, detectar
+            # comissões que sumiram do Sienge (a remoção fica com limpar_comissoes_orfas.py)
+            resumo = ctx['resumo']
+            orfas = 0
+            if leituras and all(leitura['completa'] and not leitura['retomada'] for leitura in leituras):
+                orfas = sum(
+                    1 for sid in ctx['por_sienge_id']
+                    if sid not in resumo['recebidos'] and sid.isdigit() and int(sid) > 0
+                )
+                if orfas:
+                    self.log(f"[Sync] {orfas} comissoes nao existem mais no Sienge (ver limpar_comissoes_orfas.py)")
+            # Uma linha só conta como inalterada se nenhuma ocorrência dela mudou
+            inalteradas = resumo['inalteradas'] - resumo['atualizadas']
+            retomadas = sum(1 for leitura in leituras if leitura['retomada'])
+            modo = 'incremental' if incremental else 'completa'
+            self.log(f"[Sync] Comissoes ({modo}): {resumo['total']} recebidas | {resumo['novas']} novas | {len(resumo['atualizadas'])} atualizadas | {len(inalteradas)} inalteradas"
+                     + (f" | {resumo['rechaveadas']} com commissionID trocado" if resumo['rechaveadas'] else "")
+                     + (f" | {retomadas} empresas retomadas do checkpoint" if retomadas else ""))
+            
+            return {
+                'sucesso': True,
+                'total': resumo['total'],
+                'novos': resumo['novas'],
+                'atualizados': len(resumo['atualizadas']),
+                'inalterados': len(inalteradas),
+                'rechaveados': resumo['rechaveadas'],
+                'orfas': orfas,
+                'modo': modo,
+                'retomadas': retomadas,
+                'alterados': sorted(resumo['alterados'])
+            }
+        except LeasePerdido:
+            raise
+        except Exception as e:
+            self.log(f"Erro ao sincronizar comissões: {str(e)}")
+            return {'sucesso': False, 'erro': str(e)}
+    
+    def _novo_contexto(self) -> Dict:
+        """Estado de uma execução: mapas das linhas gravadas e contadores."""
+        ctx = {
+            'lock': threading.Lock(),
+            # company_id -> comissões esperadas nesta execução (para o progresso)
+            'esperadas': {},
+            'existentes': {},
+            'por_sienge_id': {},
+            'por_contrato': {},
+            'resumo': {
+                'total': 0,
+                'novas': 0,
+                'rechaveadas': 0,
+                'atualizadas': set(),
+                'inalteradas': set(),
+                'recebidos': set(),
+                # sienge_ids novos ou com valor alterado — alvo do enriquecimento de baseValue
+                'alterados': set()
+            }
+        }
+        colunas = 'id,sienge_id,broker_id,numero_contrato,building_id,commission_value,sienge_hash'
+        for row in self._select_all('comissoes_sienge_comissoes', colunas):
+            self._registrar_linha(row, ctx)
+        return ctx
+    
+    @staticmethod
+    def _registrar_linha(row: Dict, ctx: Dict):
+        ctx['existentes'].setdefault((str(row.get('sienge_id')), str(row.get('broker_id'))), []).append(row)
+        ctx['por_sienge_id'].setdefault(str(row.get('sienge_id')), []).append(row)
+        chave_contrato = (str(row.get('numero_contrato')), str(row.get('broker_id')), str(row.get('building_id')))
+        ctx['por_contrato'].setdefault(chave_contrato, []).append(row)
+    
+    @staticmethod
+    def _remover_linha(row: Dict, ctx: Dict):
+        for mapa, chave in (
+            (ctx['existentes'], (str(row.get('sienge_id')), str(row.get('broker_id')))),
+            (ctx['por_sienge_id'], str(row.get('sienge_id'))),
+            (ctx['por_contrato'], (str(row.get('numero_contrato')), str(row.get('broker_id')), str(row.get('building_id'))))
+        ):
+            linhas = [r for r in mapa.get(chave, []) if r['id'] != row['id']]
+            if linhas:
+                mapa[chave] = linhas
+            else:
+                mapa.pop(chave, None)
+    
+    def _processar_leitura(self, leitura: Dict, ctx: Dict):
+        """normalizar → comparar → gravar cada página assim que chega, com checkpoint após cada uma.
+        
+        As páginas vêm de um gerador (SiengeClient.iter_commissions), então a gravação
+        de uma página corre junto com a busca das seguintes e só uma janela de páginas
+        fica em memória. comparar/gravar rodam sob ctx['lock'] (mapas compartilhados
+        entre as empresas).
+        """
+        company_id = leitura['company_id']
+        if leitura.get('concluida'):
+            self.log(f"[Sync] Empresa {company_id}: ja concluida na execucao anterior (checkpoint)")
+            return
+        
+        offset = leitura['offset']
+        total = None
+        max_id = None if leitura['completa'] else leitura.get('max_id_anterior')
+        recebidos = set()
+        pendentes = []
+        # Offset da primeira página com troca de commissionID pendente: o checkpoint não passa
+        # dele até a empresa terminar, senão uma retomada perderia a pendência
+        pendente_desde = None
+        for pagina, total in leitura['paginas']:
+            dados = [d for d in (self.normalizar(c) for c in pagina) if d is not None]
+            ids = [_commission_id(c) for c in pagina if _commission_id(c) is not None]
+            if ids:
+                max_id = max([max_id] + ids if max_id is not None else ids)
+            with ctx['lock']:
+                novas, atualizacoes, rechaves = self.comparar(dados, ctx)
+                self.gravar(novas, atualizacoes, ctx)
+                if total is not None:
+                    ctx['esperadas'][company_id] = max(0, total - leitura['offset'])
+                esperadas = sum(ctx['esperadas'].values()) or None
+                self.progresso('comissoes', ctx['resumo']['total'], esperadas)
+            recebidos.update(str(d['sienge_id']) for d in dados)
+            if rechaves and pendente_desde is None:
+                pendente_desde = offset
+            pendentes.extend(rechaves)
+            offset += len(pagina)
+            if leitura['checkpoint']:
+                self._salvar_estado(
+                    f"checkpoint:comissoes:empresa:{company_id}",
+                    {'offset': offset if pendente_desde is None else pendente_desde, 'concluida': False},
+                    completa=False
+                )
+        
+        # Só uma leitura completa desde o offset 0 prova que o sienge_id antigo sumiu
+        confirmada = leitura['completa'] and not leitura['retomada'] and leitura['offset'] == 0
+        with ctx['lock']:
+            self._resolver_rechaves(pendentes, recebidos if confirmada else None, ctx)
+        
+        modo = 'retomada' if leitura['retomada'] else ('completa' if leitura['completa'] else 'incremental')
+        self.log(f"[Sienge] Empresa {company_id or '-'}: {offset - leitura['offset']} comissoes ({modo})")
+        if company_id is None:
+            return
+        # Cursor incremental só avança depois que a empresa inteira foi gravada
+        cursor = {'max_id': max_id, 'total': total if total is not None else offset}
+        self._salvar_estado(f"comissoes:empresa:{company_id}", cursor, leitura['completa'])
+        if leitura['checkpoint']:
+            self._salvar_estado(
+                f"checkpoint:comissoes:empresa:{company_id}",
+                {'offset': offset, 'concluida': True},
+                completa=False
+            )
+    
+    # ==================== ESTÁGIOS ====================
+    
+    def buscar_empresa(self, company_id: str, incremental: bool, retomar: bool = False) -> Dict:
+        """Prepara a leitura de uma empresa (completa ou incremental): onde começar e o gerador de páginas.
+        
+        Incremental: a partir do cursor {max_id, total}, lê do offset total - 1 página
+        até o fim (a página de sobreposição absorve exclusões que deslocam os offsets)
+        — pressupõe que o Sienge pagina em ordem crescente de commissionID. Se a
+        sobreposição não alcançar max_id, ou se a última leitura completa for mais
+        antiga que RECONCILIACAO_HORAS, relê a empresa inteira.
+        
+        Completa com retomar=True: começa do offset do checkpoint da empresa (se houver).
+        """
+        leitura = {'company_id': company_id, 'offset': 0, 'checkpoint': not incremental,
+                   'retomada': False, 'completa': True}
+        if retomar:
+            checkpoint = self._carregar_checkpoint(company_id)
+            if checkpoint.get('concluida'):
+                return dict(leitura, paginas=iter(()), retomada=True, concluida=True)
+            if checkpoint.get('offset'):
+                offset = int(checkpoint['offset'])
+                self.log(f"[Sienge] Empresa {company_id}: retomando do offset {offset}")
+                paginas = self.sienge.iter_commissions(company_id=company_id, start_offset=offset)
+                return dict(leitura, paginas=paginas, retomada=True, offset=offset)
+        
+        escopo = f"comissoes:empresa:{company_id}"
+        estado = self._carregar_estado(escopo) if incremental else None
+        cursor = (estado or {}).get('cursor') or {}
+        
+        if estado and cursor.get('max_id') is not None and not self._reconciliacao_vencida(estado):
+            offset = max(0, int(cursor.get('total') or 0) - self.sienge.page_size)
+            paginas = self.sienge.iter_commissions(company_id=company_id, start_offset=offset)
+            primeira = next(paginas)
+            ids = [_commission_id(c) for c in primeira[0] if _commission_id(c) is not None]
+            if offset == 0 or (ids and min(ids) <= cursor['max_id']):
+                return dict(leitura, paginas=chain([primeira], paginas), offset=offset,
+                            completa=offset == 0, max_id_anterior=cursor['max_id'])
+            paginas.close()
+            self.log(f"[Sync] Empresa {company_id}: cursor incremental inconsistente, relendo tudo")
+        
+        return dict(leitura, paginas=self.sienge.iter_commissions(company_id=company_id))
+    
+    def comparar(self, dados: List[Dict], ctx: Dict):
+        """Separa comissões normalizadas em novas, atualizações e possíveis trocas de commissionID.
+        
+        Retorna (novas, atualizacoes, rechaves): novas por (sienge_id, broker_id),
+        atualizações por id do banco e rechaves como [(data, linhas_do_contrato)].
+        """
+        resumo = ctx['resumo']
+        novas = {}
+        atualizacoes = {}
+        rechaves = []
+        for data in dados:
+            sienge_id = str(data['sienge_id'])
+            broker_id = data['broker_id']
+            resumo['recebidos'].add(sienge_id)
+            resumo['total'] += 1
+            
+            # Sem broker_id, vale para todas as linhas daquele commissionID
+            if broker_id:
+                linhas = ctx['existentes'].get((sienge_id, str(broker_id)), [])
+            else:
+                linhas = ctx['por_sienge_id'].get(sienge_id, [])
+            
+            if linhas:
+                for row in linhas:
+                    if row.get('sienge_hash') == data['sienge_hash']:
+                        resumo['inalteradas'].add(row['id'])
+                        continue
+                    if valor_mudou(row.get('commission_value'), data['commission_value']):
+                        resumo['alterados'].add(sienge_id)
+                    # Chave pelo id do banco: a mesma linha não pode aparecer duas vezes num upsert
+                    atualizacoes[row['id']] = dict(data, id=row['id'])
+                continue
+            
+            mesmo_contrato = []
+            if broker_id and data.get('numero_contrato'):
+                chave_contrato = (str(data['numero_contrato']), str(broker_id), str(data['building_id']))
+                mesmo_contrato = [
+                    row for row in ctx['por_contrato'].get(chave_contrato, [])
+                    if str(row.get('sienge_id')) != sienge_id
+                ]
+            if mesmo_contrato:
+                rechaves.append((data, mesmo_contrato))
+            else:
+                novas[(sienge_id, str(broker_id))] = dict(data, status_aprovacao='Pendente')
+            resumo['alterados'].add(sienge_id)
+        return list(novas.values()), list(atualizacoes.values()), rechaves
+    
+    def gravar(self, novas: List[Dict], atualizacoes: List[Dict], ctx: Dict):
+        """Grava novas (insert) e atualizações (upsert por id) e atualiza os mapas da execução."""
+        # As inseridas entram no mapa para que blocos seguintes as tratem como existentes
+        for row in self._gravar_em_lotes(novas, inserir=True):
+            self._registrar_linha(row, ctx)
+        self._gravar_em_lotes(atualizacoes, inserir=False)
+        ctx['resumo']['novas'] += len(novas)
+        ctx['resumo']['atualizadas'].update(a['id'] for a in atualizacoes)
+    
+    def _resolver_rechaves(self, pendentes: List, recebidos: Optional[set], ctx: Dict):
+        """Reaproveita a linha do mesmo contrato/corretor se o sienge_id antigo sumiu do Sienge.
+        
+        recebidos=None (leitura parcial) não permite confirmar: todas viram inserções.
+        """
+        if not pendentes:
+            return
+        novas = {}
+        atualizacoes = {}
+        usadas = set()
+        for data, linhas in pendentes:
+            sienge_id = str(data['sienge_id'])
+            chave = (sienge_id, str(data['broker_id']))
+            if chave in ctx['existentes']:
+                continue
+            antiga = None
+            if recebidos is not None:
+                antiga = next(
+                    (row for row in linhas if str(row.get('sienge_id')) not in recebidos and row['id'] not in usadas),
+                    None
+                )
+            if antiga is None:
+                novas[chave] = dict(data, status_aprovacao='Pendente')
+                continue
+            usadas.add(antiga['id'])
+            self.log(f"[Sync] Contrato {data['numero_contrato']} - sienge_id mudou de {antiga.get('sienge_id')} para {sienge_id}")
+            atualizacoes[antiga['id']] = dict(data, id=antiga['id'])
+            self._remover_linha(antiga, ctx)
+            self._registrar_linha(dict(antiga, sienge_id=sienge_id), ctx)
+        self.gravar(list(novas.values()), list(atualizacoes.values()), ctx)
+        ctx['resumo']['rechaveadas'] += len(atualizacoes)
+    
+    def enriquecer(self, sienge_ids=None, completo: bool = False) -> Dict:
+        """Enriquece comissões com o baseValue (valor à vista) do detalhe no Sienge.
+        
+        Só busca o detalhe das comissões que precisam: sienge_ids informados
+        (novas/alteradas na sincronização) e as que ainda não têm valor_comissao.
+        completo=True refaz todas. Os detalhes são buscados em paralelo (sob o
+        rate limiter do SiengeClient) e gravados em lotes via RPC
+        comissoes_atualizar_base_value; valores iguais ao já gravado não são regravados.
+        """
+        try:
+            alvos = {str(sid) for sid in (sienge_ids or [])}
+            comissoes = self._select_all('comissoes_sienge_comissoes', 'id,sienge_id,valor_comissao')
+            
+            # Comissões manuais têm sienge_id negativo e não existem no Sienge
+            candidatas = [
+                c for c in comissoes
+                if c.get('sienge_id') and int(c['sienge_id']) > 0
+                and (completo or c.get('valor_comissao') is None or str(c['sienge_id']) in alvos)
+            ]
+            # Um mesmo commissionID pode ter várias linhas (um por corretor): busca uma vez só
+            ids_sienge = sorted({int(c['sienge_id']) for c in candidatas})
+            self.log(f"[BaseValue] {len(ids_sienge)} comissoes para buscar detalhe ({len(comissoes)} no banco)")
+            
+            erros = 0
+            base_values = {}
+            
+            def buscar(sid):
+                try:
+                    detalhe = self.sienge.get_commission_details(sid)
+                    return sid, (detalhe or {}).get('baseValue'), None
+                except Exception as e:
+                    return sid, None, e
+            
+            self.progresso('base_value', 0, len(ids_sienge))
+            with ThreadPoolExecutor(max_workers=self.sienge.max_workers) as executor:
+                for feitos, (sid, base_value, erro) in enumerate(executor.map(buscar, ids_sienge), 1):
+                    self.progresso('base_value', feitos, len(ids_sienge))
+                    if erro is not None or base_value is None:
+                        erros += 1
+                        if erros <= 5:
+                            self.log(f"[BaseValue] Comissao {sid}: {erro or 'baseValue nao encontrado'}")
+                        continue
+                    base_values[sid] = base_value
+            
+            agora = datetime.now().isoformat()
+            lote = [
+                {'id': c['id'], 'valor_comissao': base_values[int(c['sienge_id'])], 'atualizado_em': agora}
+                for c in candidatas
+                if int(c['sienge_id']) in base_values
+                and valor_mudou(c.get('valor_comissao'), base_values[int(c['sienge_id'])])
+            ]
+            
+            atualizados = 0
+            for i in range(0, len(lote), TAMANHO_LOTE_ESCRITA):
+                chunk = lote[i:i + TAMANHO_LOTE_ESCRITA]
+                result = self.supabase.rpc('comissoes_atualizar_base_value', {'payload': chunk}).execute()
+                atualizados += result.data if isinstance(result.data, int) else len(chunk)
+            
+            self.log(f"[BaseValue] {len(base_values)} detalhes | {atualizados} atualizados | {erros} erros")
+            return {
+                'sucesso': True,
+                'total': len(ids_sienge),
+                'sincronizados': atualizados,
+                'erros': erros
+            }
+        except LeasePerdido:
+            raise
+        except Exception as e:
+            self.log(f"Erro ao sincronizar baseValue: {str(e)}")
+            return {'sucesso': False, 'erro': str(e)}
+    
+    # ==================== ESTADO / SUPABASE ====================
+    
+    def _limpar_checkpoints(self):
+        """Remove os checkpoints de comissões (execução concluída ou --restart)."""
+        try:
+            self.supabase.table('comissoes_sync_estado')\
+                .delete()\
+                .like('escopo', 'checkpoint:comissoes:%')\
+                .execute()
+        except Exception as e:
+            self.log(f"[Sync] Erro ao limpar checkpoints: {str(e)}")
+    
+    def _carregar_checkpoint(self, company_id: str) -> Dict:
+        """Checkpoint válido de uma empresa ({offset, concluida}) ou {} se não houver/estiver vencido."""
+        estado = self._carregar_estado(f"checkpoint:comissoes:empresa:{company_id}")
+        if not estado or _mais_antigo_que(estado.get('atualizado_em'), CHECKPOINT_VALIDADE_HORAS):
+            return {}
+        return estado.get('cursor') or {}
+    
+    @staticmethod
+    def _reconciliacao_vencida(estado: Dict) -> bool:
+        """True se a última leitura completa é mais antiga que RECONCILIACAO_HORAS."""
+        return _mais_antigo_que(estado.get('ultima_sync_completa'), RECONCILIACAO_HORAS)
+    
+    def _carregar_estado(self, escopo: str) -> Optional[Dict]:
+        """Lê o estado persistido de um escopo de sincronização (ou None)."""
+        result = self.supabase.table('comissoes_sync_estado')\
+            .select('*')\
+            .eq('escopo', escopo)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+    
+    def _salvar_estado(self, escopo: str, cursor: Dict, completa: bool):
+        """Grava o cursor de um escopo; leituras completas também marcam a reconciliação."""
+        agora = datetime.now(timezone.utc).isoformat()
+        data = {'escopo': escopo, 'cursor': cursor, 'atualizado_em': agora}
+        if completa:
+            data['ultima_sync_completa'] = agora
+        try:
+            self.supabase.table('comissoes_sync_estado').upsert(data, on_conflict='escopo').execute()
+        except Exception as e:
+            self.log(f"[Sync] Erro ao salvar estado {escopo}: {str(e)}")
+    
+    def _gravar_em_lotes(self, linhas: List[Dict], inserir: bool) -> List[Dict]:
+        """Grava comissões em blocos: insert (novas) ou upsert por id (existentes).
+        
+        Retorna as linhas devolvidas pelo banco (com id).
+        
+        No upsert, default_to_null=False faz colunas ausentes do payload (ex.:
+        status_aprovacao) usarem o DEFAULT no INSERT implícito em vez de NULL;
+        no UPDATE do conflito só as colunas enviadas são alteradas.
+        """
+        gravadas = []
+        for i in range(0, len(linhas), TAMANHO_LOTE_ESCRITA):
+            chunk = linhas[i:i + TAMANHO_LOTE_ESCRITA]
+            tabela = self.supabase.table('comissoes_sienge_comissoes')
+            if inserir:
+                result = tabela.insert(chunk).execute()
+            else:
+                result = tabela.upsert(chunk, on_conflict='id', default_to_null=False).execute()
+            gravadas.extend(result.data or [])
+        return gravadas
+    
+    def _select_all(self, table: str, columns: str, batch_size: int = 1000) -> List[Dict]:
+        """Lê todas as linhas de uma tabela (o Supabase limita 1000 por query).
+        
+        Keyset por id: a leitura é consistente mesmo com outro processo gravando.
+        """
+        return fetch_all_keyset(self.supabase, table, columns, batch_size)
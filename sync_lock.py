@@ -0,0 +1,141 @@
+"""
+Lock de Sincronização - Sistema de Comissões Young
+Lease entre processos (tabela comissoes_sync_lock no Supabase) que impede duas
+sincronizações com o Sienge ao mesmo tempo: scheduler, tarefa do Windows,
+scripts avulsos e a fila de jobs da API adquirem o mesmo lease.
+
+O dono renova o lease numa thread de heartbeat; se o processo morrer sem
+liberar, o lease expira sozinho depois de SYNC_LOCK_TTL segundos.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Validade (segundos) do lease sem heartbeat; o dono renova a cada 1/3 disso
+SYNC_LOCK_TTL = int(os.getenv('SYNC_LOCK_TTL', 300))
+
+LOCK_SINCRONIZACAO = 'sincronizacao'
+
+
+class SyncEmAndamento(Exception):
+    """Já existe uma sincronização rodando; dono descreve quem está com o lease."""
+    
+    def __init__(self, dono: Dict):
+        self.dono = dono or {}
+        super().__init__(f"Sincronização já em andamento por {self.dono.get('dono', 'outro processo')}"
+                         f" (job {self.dono.get('job_id') or '-'})")
+
+
+class LeasePerdido(Exception):
+    """O lease expirou ou foi tomado durante a sincronização: outro processo pode já estar
+    sincronizando, então quem o perdeu precisa parar de gravar."""
+
+
+class LeaseSync:
+    """Lease da sincronização no Supabase, com heartbeat em background.
+    
+    Uso:
+        with LeaseSync(supabase, origem='scheduler') as lease:   # SyncEmAndamento se ocupado
+            ...
+    """
+    
+    def __init__(self, supabase, origem: str = None, nome: str = LOCK_SINCRONIZACAO, ttl: int = SYNC_LOCK_TTL):
+        self.supabase = supabase
+        self.nome = nome
+        self.ttl = ttl
+        # host:pid:origem:aleatório — identifica o dono nos logs e evita colisão entre processos
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{origem or 'sync'}:{uuid.uuid4().hex[:8]}"
+        self.adquirido = False
+        self.perdido = False
+        self.atual: Optional[Dict] = None
+        self._parar = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._ultima_renovacao = 0.0
+    
+    def adquirir(self, job_id: int = None) -> bool:
+        """Tenta adquirir o lease. Se ocupado, self.atual descreve o dono e retorna False."""
+        self.atual = self.supabase.rpc('comissoes_sync_lock_adquirir', {
+            'p_nome': self.nome,
+            'p_dono': self.dono,
+            'p_ttl_segundos': self.ttl,
+            'p_job_id': job_id
+        }).execute().data or {}
+        self.adquirido = bool(self.atual.get('adquirido'))
+        if self.adquirido:
+            self.perdido = False
+            self._ultima_renovacao = time.monotonic()
+            self._parar.clear()
+            self._heartbeat = threading.Thread(target=self._renovar_periodicamente, daemon=True,
+                                               name=f"lease-{self.nome}")
+            self._heartbeat.start()
+        return self.adquirido
+    
+    def renovar(self, job_id: int = None) -> bool:
+        """Estende o lease (e vincula o job, se informado). False = lease perdido."""
+        ok = bool(self.supabase.rpc('comissoes_sync_lock_renovar', {
+            'p_nome': self.nome,
+            'p_dono': self.dono,
+            'p_ttl_segundos': self.ttl,
+            'p_job_id': job_id
+        }).execute().data)
+        if ok:
+            self._ultima_renovacao = time.monotonic()
+        else:
+            self._marcar_perdido('expirou sem heartbeat?')
+        return ok
+    
+    def _marcar_perdido(self, motivo: str):
+        if not self.perdido:
+            self.perdido = True
+            print(f"[Lock] ATENÇÃO: lease '{self.nome}' perdido por {self.dono} ({motivo})")
+    
+    def verificar(self):
+        """Levanta LeasePerdido se o lease foi perdido — chamar entre lotes de escrita."""
+        if self.perdido:
+            raise LeasePerdido(f"Lease '{self.nome}' perdido por {self.dono}: sincronização interrompida "
+                               f"para não concorrer com outro processo")
+    
+    def liberar(self):
+        """Para o heartbeat e libera o lease (se ainda for o dono)."""
+        self._parar.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
+        if self.adquirido:
+            try:
+                self.supabase.rpc('comissoes_sync_lock_liberar', {'p_nome': self.nome, 'p_dono': self.dono}).execute()
+            except Exception as e:
+                # Sem liberar, o lease expira sozinho em SYNC_LOCK_TTL segundos
+                print(f"[Lock] Erro ao liberar lease '{self.nome}': {str(e)}")
+            self.adquirido = False
+    
+    def _renovar_periodicamente(self):
+        while not self._parar.wait(self.ttl / 3):
+            try:
+                self.renovar()
+            except Exception as e:
+                print(f"[Lock] Erro no heartbeat do lease '{self.nome}': {str(e)}")
+                # Sem renovar por um TTL inteiro o lease já expirou no banco
+                if time.monotonic() - self._ultima_renovacao >= self.ttl:
+                    self._marcar_perdido(f"heartbeat falhando há mais de {self.ttl}s")
+    
+    def __enter__(self):
+        if not self.adquirir():
+            raise SyncEmAndamento(self.atual)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.liberar()
+        return False
+
+
+def lease_atual(supabase, nome: str = LOCK_SINCRONIZACAO) -> Optional[Dict]:
+    """Dono atual do lease (None se livre ou expirado)."""
+    return supabase.rpc('comissoes_sync_lock_atual', {'p_nome': nome}).execute().data or None
@@ -3,28 +3,28 @@ Sincronização Sienge → Supabase - Sistema de Comissões Young
 Sincroniza dados do Sienge para o banco Supabase
 """
 
-import os
 from datetime import datetime
 from typing import List, Dict, Optional
-from supabase import create_client
 from dotenv import load_dotenv
 from sienge_client import sienge_client
+from supabase_client import get_supabase
+from cache import TOPICOS, barramento
+from gatilho_estado import recalcular_estado
+from sync_engine import ComissoesSyncEngine
 
 load_dotenv()
 
 
 VALID_BUILDING_IDS = {'2003', '2004', '2005', '2007', '2009', '2010', '2011', '2014', '2019'}
 
-
 class SiengeSupabaseSync:
     """Sincroniza dados do Sienge para Supabase"""
     
-    def __init__(self):
-        self.supabase = create_client(
-            os.getenv('SUPABASE_URL'),
-            os.getenv('SUPABASE_KEY')
-        )
+    def __init__(self, supabase=None):
+        # Cliente compartilhado do processo (pool keep-alive); injetável para scripts/testes
+        self.supabase = supabase or get_supabase()
         self.sienge = sienge_client
+        self.engine = ComissoesSyncEngine(self.supabase, self.sienge)
     
     def sync_empreendimentos(self) -> dict:
         """Sincroniza empreendimentos do Sienge"""
@@ -81,78 +81,28 @@ class SiengeSupabaseSync:
             print(f"Erro ao sincronizar corretores: {str(e)}")
             return {'sucesso': False, 'erro': str(e)}
     
-    def sync_comissoes(self, building_id: int = None) -> dict:
-        """Sincroniza comissões do Sienge de todas as empresas.
+    def sync_comissoes(self, building_id: int = None, incremental: bool = False, retomar: bool = True) -> dict:
+        """Sincroniza comissões do Sienge de todas as empresas (ver ComissoesSyncEngine)."""
+        return self.engine.sincronizar_comissoes(building_id, incremental=incremental, retomar=retomar)
+    
+    def sync_base_value(self, sienge_ids=None, completo: bool = False) -> dict:
+        """Enriquece comissões com o baseValue (valor à vista) do detalhe no Sienge."""
+        return self.engine.enriquecer(sienge_ids=sienge_ids, completo=completo)
+    
+    def sync_all(self, building_id: int = None, incremental: bool = False, retomar: bool = True,
+                 progresso=None) -> dict:
+        """Executa sincronização completa (ou incremental das comissões).
         
-        IMPORTANTE: Usa sienge_id + broker_id como chave única, pois o Sienge
-        retorna múltiplas comissões com o mesmo commissionID para diferentes
-        corretores (comissão dividida).
+        retomar=True continua uma sincronização de comissões interrompida a partir
+        dos checkpoints; retomar=False recomeça do zero. progresso(fase, processados,
+        total) recebe o andamento (ex.: jobs.ProgressoJob).
         """
-        try:
-            if building_id:
-                commissions = self.sienge.get_all_commissions_paginated(building_id=building_id)
-            else:
-                commissions = self.sienge.get_commissions_all_companies()
-            count = 0
-            
-            for commission in commissions:
-                # Campos corretos da API Sienge (conforme documentação):
-                # commissionID, salesContractNumber, enterpriseID, brokerID, etc.
-                sienge_id = commission.get('commissionID') or commission.get('id')
-                broker_id = commission.get('brokerID') or commission.get('brokerId')
-                
-                if not sienge_id:
-                    print(f"[WARN] Comissão sem ID: {commission}")
-                    continue
-                
-                data = {
-                    'sienge_id': sienge_id,
-                    'numero_contrato': commission.get('salesContractNumber') or commission.get('contractNumber'),
-                    'building_id': commission.get('enterpriseID') or commission.get('buildingId'),
-                    'company_id': commission.get('companyId'),
-                    'broker_id': broker_id,
-                    'broker_nome': commission.get('brokerName'),
-                    'customer_name': commission.get('customerName'),
-                    'customer_situation_type': commission.get('customerSituationType'),
-                    'enterprise_name': commission.get('enterpriseName') or commission.get('buildingName'),
-                    'unit_name': commission.get('unitName'),
-                    'commission_value': commission.get('value') or commission.get('commissionValue'),
-                    'installment_status': commission.get('installmentStatus'),
-                    'installment_percentage': commission.get('installmentPercentage'),
-                    'commission_date': commission.get('dueDate') or commission.get('commissionDate') or commission.get('date'),
-                    'atualizado_em': datetime.now().isoformat()
-                }
-                
-                # Verificar se a comissão já existe usando sienge_id + broker_id como chave única
-                # (um mesmo commissionID pode ter múltiplos corretores)
-                query = self.supabase.table('comissoes_sienge_comissoes').select('id, status_aprovacao').eq('sienge_id', sienge_id)
-                if broker_id:
-                    query = query.eq('broker_id', broker_id)
-                existing = query.execute()
-                
-                if existing.data and len(existing.data) > 0:
-                    # Comissão existe - atualizar sem mudar status_aprovacao
-                    update_query = self.supabase.table('comissoes_sienge_comissoes').update(data).eq('sienge_id', sienge_id)
-                    if broker_id:
-                        update_query = update_query.eq('broker_id', broker_id)
-                    update_query.execute()
-                else:
-                    # Comissão nova - inserir com status_aprovacao = Pendente
-                    data['status_aprovacao'] = 'Pendente'
-                    self.supabase.table('comissoes_sienge_comissoes').insert(data).execute()
-                
-                count += 1
-            
-            return {'sucesso': True, 'total': count}
-        except Exception as e:
-            print(f"Erro ao sincronizar comissões: {str(e)}")
-            return {'sucesso': False, 'erro': str(e)}
-    
-    def sync_all(self, building_id: int = None) -> dict:
-        """Executa sincronização completa"""
         resultados = {}
+        if progresso:
+            self.engine.progresso = progresso
         
         print("Sincronizando empreendimentos...")
+        self.engine.progresso('empreendimentos')
         resultados['empreendimentos'] = self.sync_empreendimentos()
 
         # NOTA: contratos, ITBI e valor pago agora são VIEWS no banco
@@ -162,14 +112,29 @@ class SiengeSupabaseSync:
         # deste fluxo. Os dados manuais ficam nas tabelas *_manual.
 
         print("Sincronizando corretores...")
+        self.engine.progresso('corretores')
         resultados['corretores'] = self.sync_corretores(building_id)
 
-        print("Sincronizando comissões...")
-        resultados['comissoes'] = self.sync_comissoes(building_id)
+        # Comissões + baseValue das novas/alteradas (+ as que ainda não têm valor)
+        print("Sincronizando comissões e baseValue (valor à vista)...")
+        resultados.update(self.engine.executar(building_id, incremental=incremental, retomar=retomar))
 
         # Registrar última sincronização
         self.registrar_sincronizacao(resultados)
         
+        # Contratos/ITBI/valor pago/comissões mudaram: invalida o cache em todos os processos
+        # (a sincronização costuma rodar no scheduler, não nos workers da API)
+        barramento.publicar(self.supabase, *TOPICOS)
+        
+        # Estado materializado do gatilho: recalcula tudo e regrava só o que mudou
+        print("Atualizando estado do gatilho...")
+        self.engine.progresso('gatilho_estado')
+        try:
+            resultados['gatilho_estado'] = recalcular_estado(self.supabase)
+        except Exception as e:
+            print(f"Erro ao atualizar estado do gatilho: {str(e)}")
+            resultados['gatilho_estado'] = {'sucesso': False, 'erro': str(e)}
+        
         return resultados
     
     def registrar_sincronizacao(self, resultados: dict):